@@ -0,0 +1,502 @@
+"""
+A minimal SNMP agent answering GET, GETNEXT and GETBULK requests for
+SNMPHANDLER-MIB out of an OidStore.
+
+The agent runs its own UDP listener thread. The module publishes a new
+MapSnapshot, holding a new store, whenever the maps change, so a request
+always sees a consistent view without any locking.
+
+Requests are decoded with pyasn1 but responses are assembled by hand from the
+varbinds the store encoded when it was built, so answering a walk does not
+encode anything but a few headers. Pollers repeat the same requests, so the
+encoded responses are also kept in a ResponseCache for the current snapshot
+generation and a repeated request only costs a lookup and a new request ID.
+SNMPv3 requests are checked and answered through the Usm of usm.py, the
+response PDU coming from the same code and cache.
+
+With agent_workers set, requests are served by a WorkerPool of separate
+processes instead, all bound to the listener port with SO_REUSEPORT and
+reading the store from a memory-mapped snapshot file, so polling load stays
+off the mgr interpreter.
+"""
+from collections import OrderedDict
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+
+from pyasn1.codec.ber import decoder
+from pysnmp.proto import api
+
+import ber
+from ber import COUNTER64, NULL, NO_SUCH_INSTANCE, END_OF_MIB_VIEW, \
+    NO_ERROR, NO_SUCH_NAME, GEN_ERR, GET_REQUEST, GET_NEXT_REQUEST, \
+    GET_BULK_REQUEST
+from oidstore import OidStore
+from snapshot import EMPTY_SNAPSHOT
+from usm import SNMP_VERSION_3
+
+#
+# Upper bound on the size of the varbinds in a response so that the answer
+# still fits in a UDP datagram along with the message headers
+#
+MAX_VARBINDS_SIZE = 65000
+
+#
+# Not exported by every Python 2 build, this is the Linux value
+#
+SO_REUSEPORT = getattr(socket, 'SO_REUSEPORT', 15)
+
+
+def open_listener(addr, port, reuse_port=False):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
+    sock.bind((addr, int(port)))
+    return sock
+
+
+def request_type(pMod, reqPDU):
+    if reqPDU.isSameTypeWith(pMod.GetRequestPDU()):
+        return GET_REQUEST
+    elif reqPDU.isSameTypeWith(pMod.GetNextRequestPDU()):
+        return GET_NEXT_REQUEST
+    elif pMod is not api.protoModules[api.protoVersion1] and \
+            reqPDU.isSameTypeWith(pMod.GetBulkRequestPDU()):
+        return GET_BULK_REQUEST
+    return None
+
+
+#
+# Resolve the request varbinds against the store.
+# Returns (errorStatus, errorIndex, encoded varbinds) where the varbinds are
+# bytes or memoryview slices of the store buffer.
+#
+def respond(store, v1, pduType, oids, nonRepeaters=0, maxRepetitions=0):
+    if pduType == GET_REQUEST:
+        varBinds = []
+        for errorIndex, oid in enumerate(oids, 1):
+            i = store.index(oid)
+            if i < 0 or (v1 and store.item(i)[1][0] == COUNTER64):
+                if v1:
+                    return _v1_error(NO_SUCH_NAME, errorIndex, oids)
+                varBinds.append(ber.encode_varbind(oid, NO_SUCH_INSTANCE))
+            else:
+                varBinds.append(store.varbinds(i, i + 1))
+        return NO_ERROR, 0, varBinds
+
+    elif pduType == GET_NEXT_REQUEST:
+        varBinds = []
+        for errorIndex, oid in enumerate(oids, 1):
+            i = _next_index(store, oid, v1)
+            if i is None:
+                if v1:
+                    return _v1_error(NO_SUCH_NAME, errorIndex, oids)
+                varBinds.append(ber.encode_varbind(oid, END_OF_MIB_VIEW))
+            else:
+                varBinds.append(store.varbinds(i, i + 1))
+        return NO_ERROR, 0, varBinds
+
+    elif pduType == GET_BULK_REQUEST:
+        nonRepeaters = max(0, min(nonRepeaters, len(oids)))
+        maxRepetitions = max(0, maxRepetitions)
+        varBinds = []
+        budget = MAX_VARBINDS_SIZE
+        for oid in oids[:nonRepeaters]:
+            i = _next_index(store, oid, False)
+            if i is None:
+                chunk = ber.encode_varbind(oid, END_OF_MIB_VIEW)
+            else:
+                chunk = store.varbinds(i, i + 1)
+            varBinds.append(chunk)
+            budget -= len(chunk)
+
+        repeaters = oids[nonRepeaters:]
+        if len(repeaters) == 1:
+            #
+            # A walk: the answer is one contiguous slice of the store
+            #
+            i = store.index_after(repeaters[0])
+            j = store.span(i, maxRepetitions, budget)
+            if j > i:
+                varBinds.append(store.varbinds(i, j))
+            if j - i < maxRepetitions and j == len(store):
+                last = store.item(j - 1)[0] if j > i else repeaters[0]
+                varBinds.append(ber.encode_varbind(last, END_OF_MIB_VIEW))
+        elif repeaters:
+            positions = [store.index_after(oid) for oid in repeaters]
+            lastOids = list(repeaters)
+            for r in range(maxRepetitions):
+                row = []
+                for c, i in enumerate(positions):
+                    if i < len(store):
+                        row.append(store.varbinds(i, i + 1))
+                        lastOids[c] = store.item(i)[0]
+                        positions[c] = i + 1
+                    else:
+                        row.append(ber.encode_varbind(lastOids[c], END_OF_MIB_VIEW))
+                size = sum(len(chunk) for chunk in row)
+                if size > budget:
+                    break
+                budget -= size
+                varBinds.extend(row)
+                if all(i >= len(store) for i in positions):
+                    break
+        return NO_ERROR, 0, varBinds
+
+    return GEN_ERR, 0, [ber.encode_varbind(oid, NULL) for oid in oids]
+
+
+def _next_index(store, oid, v1):
+    #
+    # SNMPv1 has no Counter64, such objects are skipped on GETNEXT
+    #
+    i = store.index_after(oid)
+    while i < len(store):
+        if not (v1 and store.item(i)[1][0] == COUNTER64):
+            return i
+        i += 1
+    return None
+
+
+def _v1_error(errorStatus, errorIndex, oids):
+    return errorStatus, errorIndex, [ber.encode_varbind(oid, NULL) for oid in oids]
+
+
+class ResponseCache(object):
+    """
+    LRU of encoded responses keyed by the request without its request ID
+    (see ber.split_request), which covers the version, community, PDU type,
+    OIDs, non-repeaters and max-repetitions. Entries are only valid for one
+    snapshot generation, the cache empties itself when it changes.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, generation, key):
+        if generation != self.generation:
+            self.entries.clear()
+            self.generation = generation
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries[key] = entry
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': self.size,
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+        }
+
+
+class SnmpAgent(object):
+    def __init__(self, log, community='public', cache_size=1024, usm=None):
+        self.log = log
+        self.community = community
+        self.usm = usm
+        store = OidStore()
+        store.encode()
+        self.snapshot = EMPTY_SNAPSHOT._replace(store=store)
+        self.cache = ResponseCache(cache_size) if cache_size > 0 else None
+        self.sock = None
+        self.thread = None
+        self.run = False
+        self.address = None
+
+    def publish(self, snapshot):
+        self.snapshot = snapshot
+
+    def flush(self):
+        """
+        Nothing to write, the listener thread answers from the snapshot
+        """
+        return self
+
+    def current(self):
+        """
+        The store to answer from and its snapshot generation
+        """
+        snapshot = self.snapshot
+        return snapshot.store, snapshot.generation
+
+    def start(self, addr, port, reuse_port=False):
+        self.sock = open_listener(addr, port, reuse_port)
+        self.sock.settimeout(1.0)
+        self.address = '{0}:{1}'.format(addr, port)
+        self.run = True
+        self.thread = threading.Thread(target=self._serve, name='snmp-agent')
+        self.thread.daemon = True
+        self.thread.start()
+        self.log.info("SNMP agent listening on {0}:{1}".format(addr, port))
+
+    def stop(self):
+        self.run = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def check(self):
+        return self
+
+    def stats(self):
+        return {
+            'address': self.address,
+            'workers': 0,
+            'generation': self.snapshot.generation,
+            'cache': self.cache.stats() if self.cache is not None else None,
+            'usm': self.usm_stats(),
+        }
+
+    def usm_stats(self):
+        if self.usm is None:
+            return None
+        return dict(('.'.join(str(i) for i in oid), count)
+                    for oid, count in self.usm.stats.items())
+
+    def _serve(self):
+        while self.run:
+            self.serve_once()
+
+    #
+    # Wait up to the socket timeout for one request and answer it
+    #
+    def serve_once(self):
+        try:
+            wholeMsg, peer = self.sock.recvfrom(65535)
+        except socket.timeout:
+            return
+        except socket.error as e:
+            self.log.error("SNMP agent receive failed: {0}".format(e))
+            return
+        try:
+            response = self.handle(wholeMsg)
+        except Exception as e:
+            self.log.debug("SNMP agent dropped request from {0}: {1}".format(peer, e))
+            return
+        if response is not None:
+            self.sock.sendto(response, peer)
+
+    #
+    # Decode one request and return the encoded response, or None when the
+    # request must be silently dropped (bad version or community)
+    #
+    def handle(self, wholeMsg):
+        store, generation = self.current()
+        if self.usm is not None and ber.message_version(wholeMsg) == SNMP_VERSION_3:
+            return self.usm.handle(wholeMsg, lambda pdu: self.answer(store, generation, pdu))
+
+        request = None
+        if self.cache is not None:
+            request = ber.split_request(wholeMsg)
+            if request is not None:
+                entry = self.cache.get(generation, request[0])
+                if entry is not None:
+                    return ber.encode_response(entry[0], request[1], entry[1])
+
+        msgVer = api.decodeMessageVersion(wholeMsg)
+        if msgVer not in api.protoModules:
+            return None
+        pMod = api.protoModules[msgVer]
+        reqMsg, wholeMsg = decoder.decode(wholeMsg, asn1Spec=pMod.Message())
+        if str(pMod.apiMessage.getCommunity(reqMsg)) != self.community:
+            return None
+
+        reqPDU = pMod.apiMessage.getPDU(reqMsg)
+        pduType = request_type(pMod, reqPDU)
+        requestId = int(pMod.apiPDU.getRequestID(reqPDU))
+        oids = [tuple(oid) for oid, val in pMod.apiPDU.getVarBinds(reqPDU)]
+        nonRepeaters = maxRepetitions = 0
+        if pduType == GET_BULK_REQUEST:
+            nonRepeaters = int(pMod.apiBulkPDU.getNonRepeaters(reqPDU))
+            maxRepetitions = int(pMod.apiBulkPDU.getMaxRepetitions(reqPDU))
+
+        errorStatus, errorIndex, varBinds = respond(
+            store, msgVer == api.protoVersion1, pduType, oids,
+            nonRepeaters, maxRepetitions)
+        head = ber.encode_integer(msgVer) + ber.encode_octets(self.community)
+        tail = ber.encode_pdu_tail(errorStatus, errorIndex, varBinds)
+        if request is not None:
+            self.cache.put(request[0], (head, tail))
+        return ber.encode_response(head, requestId, tail)
+
+    #
+    # PDU tail of the response to a request PDU decoded by ber.decode_pdu,
+    # answered as SNMPv2c
+    #
+    def answer(self, store, generation, pdu):
+        pduType, requestId, nonRepeaters, maxRepetitions, oids, key = pdu
+        if pduType not in (GET_REQUEST, GET_NEXT_REQUEST, GET_BULK_REQUEST):
+            raise ValueError("Unsupported PDU type {0:#x}".format(pduType))
+        key = b'\x03' + key
+        if self.cache is not None:
+            tail = self.cache.get(generation, key)
+            if tail is not None:
+                return tail
+        if pduType != GET_BULK_REQUEST:
+            nonRepeaters = maxRepetitions = 0
+        errorStatus, errorIndex, varBinds = respond(
+            store, False, pduType, oids, nonRepeaters, maxRepetitions)
+        tail = ber.encode_pdu_tail(errorStatus, errorIndex, varBinds)
+        if self.cache is not None:
+            self.cache.put(key, tail)
+        return tail
+
+
+class WorkerPool(object):
+    """
+    Runs agentworker.py processes sharing the listener port. The module
+    publishes snapshots to it like to the in-process agent, the store of
+    each one is dumped to the snapshot file the workers map.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agentworker.py')
+
+    def __init__(self, log, community, workers, path, python, cache_size=1024,
+                 usm_config=None):
+        self.log = log
+        self.community = community
+        self.cache_size = cache_size
+        self.usm_config = usm_config
+        self.workers = workers
+        self.path = path
+        self.python = python
+        store = OidStore()
+        store.encode()
+        self.snapshot = EMPTY_SNAPSHOT._replace(store=store)
+        self.procs = []
+        self.addr = None
+        self.port = None
+        self._lock = threading.Lock()
+        self._pending = None
+        self._dumped = None
+
+    #
+    # Called under the lock of the snapshots, so it only takes note of the
+    # newest snapshot, flush writes it once the lock is released
+    #
+    def publish(self, snapshot):
+        with self._lock:
+            if self._pending is None or snapshot.generation > self._pending.generation:
+                self._pending = snapshot
+
+    #
+    # The workers cannot compute the lazy columns, so every dump computes them
+    # all. A generation already dumped is not dumped again, and the columns
+    # whose views did not change since the last dump are taken over from its
+    # store rather than computed again, which keeps the PG map from being
+    # fetched for the perf counters or pool stats alone. The dump runs in the
+    # publishing thread, but without any lock, only the rename of the file is
+    # done under the lock so an older generation never replaces a newer one
+    #
+    def flush(self):
+        with self._lock:
+            snapshot, self._pending = self._pending, None
+            if snapshot is None or (self._dumped is not None and
+                                    snapshot.generation <= self._dumped):
+                return self
+            previous = self.snapshot
+        snapshot.store.share_computed(previous.store)
+        tmp = snapshot.store.dump_aside(self.path, snapshot.generation)
+        with self._lock:
+            if self._dumped is not None and snapshot.generation <= self._dumped:
+                os.unlink(tmp)
+                return self
+            os.rename(tmp, self.path)
+            self._dumped = snapshot.generation
+            self.snapshot = snapshot
+        return self
+
+    def start(self, addr, port):
+        # Fail here rather than in the workers if the address is unusable
+        open_listener(addr, port, reuse_port=True).close()
+        self.addr = addr
+        self.port = port
+        if not os.path.exists(self.path):
+            self.publish(self.snapshot)
+            self.flush()
+        self.procs = [self._spawn() for i in range(self.workers)]
+        self.log.info("SNMP agent listening on {0}:{1} with {2} workers".format(
+            addr, port, self.workers))
+
+    #
+    # The SNMPv3 configuration holds the passphrases of the users, it is
+    # written to the standard input of the worker rather than put in its
+    # environment, which other users may read from /proc
+    #
+    def _spawn(self):
+        env = dict(os.environ)
+        env['SNMPHANDLER_COMMUNITY'] = self.community
+        env['SNMPHANDLER_CACHE_SIZE'] = str(self.cache_size)
+        proc = subprocess.Popen([self.python, self.script, self.path,
+                                 self.addr, str(self.port)], env=env, stdin=subprocess.PIPE)
+        try:
+            if self.usm_config is not None:
+                proc.stdin.write(self.usm_config.encode('utf-8'))
+            proc.stdin.close()
+        except (IOError, OSError) as e:
+            # Died already, check restarts it
+            self.log.error("Cannot configure SNMP agent worker {0}: {1}".format(proc.pid, e))
+        return proc
+
+    def check(self):
+        """
+        Restart the workers which died
+        """
+        for i, proc in enumerate(self.procs):
+            if proc.poll() is not None:
+                self.log.error("SNMP agent worker {0} exited with {1}, restarting".format(
+                    proc.pid, proc.returncode))
+                self.procs[i] = self._spawn()
+        return self
+
+    def stats(self):
+        """
+        Each worker has its own response cache and logs its statistics
+        """
+        return {
+            'address': '{0}:{1}'.format(self.addr, self.port),
+            'workers': self.workers,
+            'alive': sum(1 for proc in self.procs if proc.poll() is None),
+            'generation': self.snapshot.generation,
+            'cache': None,
+        }
+
+    def stop(self):
+        for proc in self.procs:
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGTERM)
+        for proc in self.procs:
+            proc.wait()
+        self.procs = []
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def default_python():
+    if 'python' in os.path.basename(sys.executable or ''):
+        return sys.executable
+    return '/usr/bin/python'
@@ -0,0 +1,91 @@
+"""
+SNMP agent worker process.
+
+Started by agent.WorkerPool when agent_workers is set:
+
+    agentworker.py <snapshot file> <address> <port>
+
+with the community in the SNMPHANDLER_COMMUNITY environment variable. Every
+worker binds the listener port with SO_REUSEPORT so the kernel spreads the
+requests across them, and answers from the memory-mapped snapshot the module
+rewrites on every map change. The worker exits when the mgr goes away.
+The response cache size comes from SNMPHANDLER_CACHE_SIZE, the SNMPv3 engine
+and users are read from the standard input (see Usm.config), which is empty
+when there are none, and the cache statistics are logged every STATS_INTERVAL
+seconds.
+"""
+import os
+import sys
+
+#
+# This directory holds a types.py which would shadow the standard library
+# module of the same name, only look here after everything else.
+#
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path = [p for p in sys.path if os.path.abspath(p or '.') != here] + [here]
+
+import json
+import logging
+import signal
+import time
+
+from agent import SnmpAgent, open_listener
+from oidstore import MappedStore
+from usm import Usm
+
+STATS_INTERVAL = 300
+
+
+class WorkerAgent(SnmpAgent):
+    def __init__(self, log, community, path, cache_size, usm=None):
+        super(WorkerAgent, self).__init__(log, community, cache_size, usm)
+        self.path = path
+        self.store = self._map()
+
+    def _map(self):
+        while True:
+            try:
+                return MappedStore(self.path)
+            except (IOError, OSError):
+                time.sleep(0.1)
+
+    def current(self):
+        if self.store.changed():
+            self.store = self._map()
+            self.log.debug("Mapped snapshot generation {0}".format(self.store.generation))
+        return self.store, self.store.generation
+
+    def serve_forever(self, addr, port):
+        parent = os.getppid()
+        self.sock = open_listener(addr, port, reuse_port=True)
+        self.sock.settimeout(1.0)
+        self.run = True
+        logged = time.time()
+        while self.run and os.getppid() == parent:
+            self.serve_once()
+            if self.cache is not None and time.time() - logged > STATS_INTERVAL:
+                self.log.warning("Response cache {0}".format(self.cache.stats()))
+                logged = time.time()
+
+
+def main(argv):
+    path, addr, port = argv[1:4]
+    logging.basicConfig(format='snmphandler worker %(process)d: %(message)s')
+    log = logging.getLogger('snmphandler')
+    usm = None
+    usm_config = sys.stdin.read()
+    if usm_config:
+        usm = Usm.from_config(json.loads(usm_config))
+    agent = WorkerAgent(log, os.environ.get('SNMPHANDLER_COMMUNITY', 'public'), path,
+                        int(os.environ.get('SNMPHANDLER_CACHE_SIZE', '1024')), usm)
+
+    def stop(signum, frame):
+        agent.run = False
+    signal.signal(signal.SIGTERM, stop)
+
+    agent.serve_forever(addr, int(port))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,305 @@
+"""
+Just enough BER to build SNMP messages by hand.
+
+The agent answers from varbinds encoded once per map epoch. Wrapping them in
+a response only needs the few TLV headers below, which is much cheaper than
+rebuilding pyasn1 objects for every request.
+"""
+import socket
+import struct
+
+#
+# SNMP syntaxes. Agent values are (syntax, raw) tuples keyed by these tags.
+#
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_IDENTIFIER = 0x06
+SEQUENCE = 0x30
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIMETICKS = 0x43
+COUNTER64 = 0x46
+
+#
+# PDU tags
+#
+GET_REQUEST = 0xa0
+GET_NEXT_REQUEST = 0xa1
+GET_RESPONSE = 0xa2
+SET_REQUEST = 0xa3
+TRAP_V1 = 0xa4
+GET_BULK_REQUEST = 0xa5
+INFORM_REQUEST = 0xa6
+TRAP_V2 = 0xa7
+REPORT = 0xa8
+
+#
+# SNMPv2 exception values
+#
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+#
+# Error status
+#
+NO_ERROR = 0
+TOO_BIG = 1
+NO_SUCH_NAME = 2
+GEN_ERR = 5
+
+UNSIGNED_SYNTAXES = (COUNTER32, GAUGE32, TIMETICKS, COUNTER64)
+
+
+def encode_length(length):
+    if length < 0x80:
+        return struct.pack('B', length)
+    octets = bytearray()
+    while length:
+        octets.insert(0, length & 0xff)
+        length >>= 8
+    return struct.pack('B', 0x80 | len(octets)) + bytes(octets)
+
+
+def tlv(tag, payload):
+    return struct.pack('B', tag) + encode_length(len(payload)) + bytes(payload)
+
+
+def header(tag, length):
+    """
+    Tag and length of a constructed value whose payload is sent separately
+    """
+    return struct.pack('B', tag) + encode_length(length)
+
+
+def encode_integer(value, tag=INTEGER):
+    value = int(value)
+    octets = bytearray()
+    while True:
+        octets.insert(0, value & 0xff)
+        value >>= 8
+        if (value == 0 and not octets[0] & 0x80) or \
+                (value == -1 and octets[0] & 0x80):
+            break
+    return tlv(tag, octets)
+
+
+def encode_unsigned(value, tag):
+    value = int(value)
+    octets = bytearray()
+    while True:
+        octets.insert(0, value & 0xff)
+        value >>= 8
+        if value == 0:
+            break
+    if octets[0] & 0x80:
+        octets.insert(0, 0)
+    return tlv(tag, octets)
+
+
+def encode_octets(value, tag=OCTET_STRING):
+    if not isinstance(value, (bytes, bytearray)):
+        value = value.encode('utf-8')
+    return tlv(tag, value)
+
+
+def encode_oid(oid):
+    octets = bytearray([oid[0] * 40 + oid[1]])
+    for sub in oid[2:]:
+        chunk = bytearray([sub & 0x7f])
+        sub >>= 7
+        while sub:
+            chunk.insert(0, 0x80 | (sub & 0x7f))
+            sub >>= 7
+        octets += chunk
+    return tlv(OBJECT_IDENTIFIER, octets)
+
+
+def encode_value(syntax, raw):
+    if syntax == INTEGER:
+        return encode_integer(raw)
+    elif syntax == OCTET_STRING:
+        return encode_octets(raw)
+    elif syntax == IP_ADDRESS:
+        return tlv(IP_ADDRESS, socket.inet_aton(raw))
+    elif syntax in UNSIGNED_SYNTAXES:
+        return encode_unsigned(raw, syntax)
+    elif syntax == OBJECT_IDENTIFIER:
+        return encode_oid(raw)
+    elif syntax in (NULL, NO_SUCH_OBJECT, NO_SUCH_INSTANCE, END_OF_MIB_VIEW):
+        return tlv(syntax, b'')
+    raise ValueError("Unsupported syntax {0}".format(syntax))
+
+
+def encode_varbind(oid, syntax, raw=None):
+    return tlv(SEQUENCE, encode_oid(oid) + encode_value(syntax, raw))
+
+
+def encode_pdu_tail(error_status, error_index, varbinds):
+    """
+    Everything in a PDU after the request ID, around already encoded
+    varbinds (bytes or memoryview)
+    """
+    length = 0
+    for chunk in varbinds:
+        length += len(chunk)
+    tail = bytearray(encode_integer(error_status))
+    tail += encode_integer(error_index)
+    tail += header(SEQUENCE, length)
+    for chunk in varbinds:
+        tail += chunk
+    return bytes(tail)
+
+
+def encode_pdu(tag, request_id, error_status, error_index, varbinds):
+    body = encode_integer(request_id) + encode_pdu_tail(error_status, error_index, varbinds)
+    return header(tag, len(body)) + body
+
+
+def encode_message(version, community, pdu):
+    """
+    Wrap a PDU in a SNMPv1/v2c message
+    """
+    body = encode_integer(version) + encode_octets(community)
+    message = bytearray(header(SEQUENCE, len(body) + len(pdu)))
+    message += body
+    message += pdu
+    return bytes(message)
+
+
+def encode_response(head, request_id, tail):
+    """
+    Assemble a SNMPv1/v2c response from the encoded version and community
+    (head) and the PDU tail, patching in the request ID
+    """
+    body = encode_integer(request_id) + tail
+    pdu = header(GET_RESPONSE, len(body)) + body
+    return header(SEQUENCE, len(head) + len(pdu)) + head + pdu
+
+
+def decode_length(data, pos):
+    """
+    Decode the length at data[pos], returns (length, position of the value)
+    """
+    first = data[pos]
+    if first < 0x80:
+        return first, pos + 1
+    count = first & 0x7f
+    length = 0
+    for octet in data[pos + 1:pos + 1 + count]:
+        length = (length << 8) | octet
+    return length, pos + 1 + count
+
+
+def decode_integer(data):
+    value = 0
+    for octet in data:
+        value = (value << 8) | octet
+    if data and data[0] & 0x80:
+        value -= 1 << (8 * len(data))
+    return value
+
+
+def decode_tlv(data, pos):
+    """
+    Decode the TLV at data[pos], returns (tag, start, end) of its value
+    """
+    tag = data[pos]
+    length, start = decode_length(data, pos + 1)
+    end = start + length
+    if end > len(data):
+        raise ValueError("Truncated value at {0}".format(pos))
+    return tag, start, end
+
+
+def decode_oid(data):
+    oid = list(divmod(data[0], 40)) if data[0] < 80 else [2, data[0] - 80]
+    sub = 0
+    for octet in data[1:]:
+        sub = (sub << 7) | (octet & 0x7f)
+        if not octet & 0x80:
+            oid.append(sub)
+            sub = 0
+    return tuple(oid)
+
+
+def message_version(msg):
+    """
+    Version of a SNMP message or None if it does not look like one
+    """
+    data = bytearray(msg[:8])
+    try:
+        if data[0] != SEQUENCE:
+            return None
+        length, pos = decode_length(data, 1)
+        if data[pos] != INTEGER or data[pos + 1] != 1:
+            return None
+        return data[pos + 2]
+    except IndexError:
+        return None
+
+
+def decode_pdu(data, pos=0):
+    """
+    Decode the request PDU at data[pos] (a bytearray).
+
+    Returns (tag, request ID, error status or non-repeaters, error index or
+    max-repetitions, OIDs, key) where the key identifies the request without
+    its request ID like the one of split_request.
+    """
+    tag, start, end = decode_tlv(data, pos)
+    _, id_start, id_end = decode_tlv(data, start)
+    _, a_start, a_end = decode_tlv(data, id_end)
+    _, b_start, b_end = decode_tlv(data, a_end)
+    _, vb_start, vb_end = decode_tlv(data, b_end)
+    oids = []
+    vb = vb_start
+    while vb < vb_end:
+        _, oid_pos, vb = decode_tlv(data, vb)
+        _, oid_start, oid_end = decode_tlv(data, oid_pos)
+        oids.append(decode_oid(data[oid_start:oid_end]))
+    key = bytes(data[pos:pos + 1]) + bytes(data[id_end:end])
+    return (tag, decode_integer(data[id_start:id_end]), decode_integer(data[a_start:a_end]),
+            decode_integer(data[b_start:b_end]), oids, key)
+
+
+def split_request(msg):
+    """
+    Split a SNMPv1/v2c GET, GETNEXT or GETBULK request into a key identifying
+    the request without its request ID, and the request ID.
+
+    Two requests with the same key only differ by their request ID and get
+    the same response. Returns None for anything else, such requests must go
+    through the full decoder.
+    """
+    data = bytearray(msg)
+    try:
+        if data[0] != SEQUENCE:
+            return None
+        length, start = decode_length(data, 1)
+        if data[start] != INTEGER:
+            return None
+        length, pos = decode_length(data, start + 1)
+        if length != 1 or data[pos] not in (0, 1):
+            return None
+        pos += length
+        if data[pos] != OCTET_STRING:
+            return None
+        length, pos = decode_length(data, pos + 1)
+        pos += length
+        tag = data[pos]
+        if tag not in (GET_REQUEST, GET_NEXT_REQUEST, GET_BULK_REQUEST):
+            return None
+        length, id_pos = decode_length(data, pos + 1)
+        if data[id_pos] != INTEGER:
+            return None
+        length, id_value = decode_length(data, id_pos + 1)
+        end = id_value + length
+        if end > len(data):
+            return None
+    except IndexError:
+        return None
+    key = bytes(data[start:pos + 1]) + bytes(data[end:])
+    return key, decode_integer(data[id_value:end])
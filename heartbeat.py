@@ -0,0 +1,62 @@
+"""
+Heartbeat notification for dead-man's-switch monitoring.
+
+A quiet healthy cluster sends no trap, and neither does a dead mgr. A
+clusterHeartbeat sent every heartbeat_interval seconds tells them apart: it
+carries a sequence number counting up from 1, so a lost heartbeat shows as a
+gap, the statusDetail of the cluster and the uptime of the module.
+
+Heartbeats go through a Notifier, which encodes everything but those values
+once, so even a 1 second interval costs next to nothing.
+"""
+import time
+
+import ber
+from ber import INTEGER, COUNTER32, TIMETICKS
+from mibtables import STATUS_DETAIL, HEARTBEAT_SEQUENCE, HEARTBEAT_UPTIME
+
+UINT32_MASK = 0xffffffff
+
+
+class Heartbeat(object):
+    def __init__(self, notifier):
+        self.notifier = notifier
+        self.sequence = 0
+        self.sent = 0
+        self.errors = 0
+        self._status_detail = ber.encode_oid(STATUS_DETAIL)
+        self._sequence = ber.encode_oid(HEARTBEAT_SEQUENCE)
+        self._uptime = ber.encode_oid(HEARTBEAT_UPTIME)
+
+    def varbinds(self, status_detail, now):
+        """
+        The varbinds of the next heartbeat, with the next sequence number
+        """
+        self.sequence = (self.sequence + 1) & UINT32_MASK
+        notifier = self.notifier
+        return [
+            notifier.varbind(self._status_detail, ber.encode_integer(status_detail, INTEGER)),
+            notifier.varbind(self._sequence, ber.encode_unsigned(self.sequence, COUNTER32)),
+            notifier.varbind(self._uptime, ber.encode_unsigned(notifier.uptime(now), TIMETICKS)),
+        ]
+
+    def encode(self, status_detail, now=None):
+        now = now if now is not None else time.time()
+        return self.notifier.encode('clusterHeartbeat', self.varbinds(status_detail, now), now)
+
+    def send(self, status_detail):
+        try:
+            self.notifier.send('clusterHeartbeat', self.varbinds(status_detail, time.time()))
+        except Exception:
+            self.errors += 1
+            raise
+        self.sent += 1
+        return self.sequence
+
+    def stats(self):
+        return {
+            'sequence': self.sequence,
+            'sent': self.sent,
+            'errors': self.errors,
+            'last_duration': self.notifier.last_duration,
+        }
@@ -0,0 +1,61 @@
+"""
+Host inventory of the cluster, tracked by fingerprint.
+
+Every list_servers() entry is reduced to a fingerprint of its hostname,
+Ceph version and sorted services. Comparing fingerprints tells which hosts
+were added, removed or changed without comparing the entries themselves,
+and get_server() is only called for the hosts which are new or changed, so a
+cycle over an unchanged cluster costs one list_servers() call.
+"""
+from collections import namedtuple
+
+
+class InventoryChanges(namedtuple('InventoryChanges', ['added', 'removed', 'changed'])):
+    """
+    Sorted hostnames added, removed and changed by an inventory update
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        parts = []
+        for name, hosts in zip(self._fields, self):
+            if hosts:
+                parts.append("{0} {1}".format(name, ','.join(hosts)))
+        return '; '.join(parts)
+
+
+def fingerprint(server):
+    """
+    Fingerprint of a list_servers() entry
+    """
+    services = tuple(sorted((s.get('type', ''), str(s.get('id', '')))
+                            for s in server.get('services') or []))
+    return hash((server.get('hostname'), server.get('ceph_version'), services))
+
+
+class Inventory(object):
+    def __init__(self):
+        # Fingerprint and get_server() details by hostname
+        self.fingerprints = {}
+        self.servers = {}
+        self.updates = 0
+
+    def update(self, servers, get_server):
+        """
+        Update the inventory from list_servers() entries, fetching the
+        details of the new and changed hosts with get_server(hostname)
+        """
+        fingerprints = dict((server['hostname'], fingerprint(server)) for server in servers)
+        added, changed = [], []
+        for hostname, value in fingerprints.items():
+            previous = self.fingerprints.get(hostname)
+            if previous == value:
+                continue
+            (added if previous is None else changed).append(hostname)
+            self.servers[hostname] = get_server(hostname)
+        removed = [hostname for hostname in self.fingerprints if hostname not in fingerprints]
+        for hostname in removed:
+            self.servers.pop(hostname, None)
+        self.fingerprints = fingerprints
+        self.updates += 1
+        return InventoryChanges(sorted(added), sorted(removed), sorted(changed))
@@ -0,0 +1,68 @@
+"""
+SNMPHANDLER-MIB in the pysnmp form, and by OID for snmptrap.
+
+mibs/SNMPHANDLER-MIB.py is what pysmi compiles SNMPHANDLER-MIB.txt into,
+regenerated with tests/mibbuild.py whenever the MIB changes. Loading it
+needs neither the MIB compiler nor any network access: the MIB builder only
+looks into mibs/ and into the MIBs pysnmp ships, which hold SNMPv2-SMI,
+SNMPv2-TC, SNMPv2-CONF, SNMPv2-MIB and SNMP-FRAMEWORK-MIB, everything
+SNMPHANDLER-MIB imports.
+
+snmptrap is given the traps and objects of SNMPHANDLER-MIB by OID and run
+with -m "", so it loads no MIB at all instead of parsing SNMPHANDLER-MIB.txt
+and every default MIB of net-snmp for each trap.
+"""
+import os
+
+from pysnmp.smi import builder, view
+
+from mibtables import FS_ID, STATUS_DETAIL, STATUS_MSG, NOTIFICATION_SEQUENCE, CLUSTER_TRAPS
+from notification import CLUSTER_TRAP_IDS, ENTERPRISE_SPECIFIC, v1_trap
+
+MIB_NAME = 'SNMPHANDLER-MIB'
+MIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mibs')
+
+
+def oid_text(oid):
+    return '.' + '.'.join(str(n) for n in oid)
+
+#
+# The trap and object names snmptrap used to resolve through the MIB, the
+# objects without their .0 instance as snmptrap resolved them
+#
+SNMPTRAP_OIDS = dict((name, oid_text(CLUSTER_TRAPS + (trap,)))
+                     for name, trap in CLUSTER_TRAP_IDS.items())
+SNMPTRAP_OIDS.update({
+    'fsId': oid_text(FS_ID[:-1]),
+    'statusDetail': oid_text(STATUS_DETAIL[:-1]),
+    'statusMsg': oid_text(STATUS_MSG[:-1]),
+    'notificationSequence': oid_text(NOTIFICATION_SEQUENCE[:-1]),
+})
+
+
+def snmptrap_v1(name, agent):
+    """
+    The enterprise, agent, generic trap, specific trap and uptime arguments
+    of snmptrap -v 1 for the trap named name, the SNMPv1 trap the Notifier
+    sends
+    """
+    enterprise, specific = v1_trap(CLUSTER_TRAPS + (CLUSTER_TRAP_IDS[name],))
+    return '{0} {1} {2} {3} 0'.format(oid_text(enterprise), agent, ENTERPRISE_SPECIFIC, specific)
+
+
+def mib_builder(*names):
+    """
+    A MibBuilder with SNMPHANDLER-MIB, or the MIBs named, loaded from mibs/
+    """
+    loaded = builder.MibBuilder()
+    loaded.addMibSources(builder.DirMibSource(MIB_DIR))
+    loaded.loadModules(*(names or (MIB_NAME,)))
+    return loaded
+
+
+def mib_view(loaded=None):
+    """
+    The MibViewController resolving the names of the MIBs loaded, of
+    SNMPHANDLER-MIB by default
+    """
+    return view.MibViewController(loaded if loaded is not None else mib_builder())
@@ -0,0 +1,285 @@
+#
+# PySNMP MIB module SNMPHANDLER-MIB (http://snmplabs.com/pysmi)
+# ASN.1 source file:///root/package/SNMPHANDLER-MIB.txt
+# Produced by pysmi-0.3.4 at Mon Oct 19 20:12:44 2026
+# On host vm platform Linux version 6.18.44-fc-v139 by user root
+# Using Python version 3.11.7 (main, Oct  2 2025, 21:14:28) [GCC 12.2.0]
+#
+OctetString, Integer, ObjectIdentifier = mibBuilder.importSymbols("ASN1", "OctetString", "Integer", "ObjectIdentifier")
+NamedValues, = mibBuilder.importSymbols("ASN1-ENUMERATION", "NamedValues")
+ValueRangeConstraint, SingleValueConstraint, ValueSizeConstraint, ConstraintsIntersection, ConstraintsUnion = mibBuilder.importSymbols("ASN1-REFINEMENT", "ValueRangeConstraint", "SingleValueConstraint", "ValueSizeConstraint", "ConstraintsIntersection", "ConstraintsUnion")
+SnmpAdminString, = mibBuilder.importSymbols("SNMP-FRAMEWORK-MIB", "SnmpAdminString")
+ObjectGroup, ModuleCompliance, NotificationGroup = mibBuilder.importSymbols("SNMPv2-CONF", "ObjectGroup", "ModuleCompliance", "NotificationGroup")
+snmpTraps, = mibBuilder.importSymbols("SNMPv2-MIB", "snmpTraps")
+enterprises, ObjectIdentity, NotificationType, iso, Integer32, mib_2, Unsigned32, MibIdentifier, Counter64, Gauge32, MibScalar, MibTable, MibTableRow, MibTableColumn, TimeTicks, IpAddress, Bits, ModuleIdentity, Counter32 = mibBuilder.importSymbols("SNMPv2-SMI", "enterprises", "ObjectIdentity", "NotificationType", "iso", "Integer32", "mib-2", "Unsigned32", "MibIdentifier", "Counter64", "Gauge32", "MibScalar", "MibTable", "MibTableRow", "MibTableColumn", "TimeTicks", "IpAddress", "Bits", "ModuleIdentity", "Counter32")
+DisplayString, TextualConvention = mibBuilder.importSymbols("SNMPv2-TC", "DisplayString", "TextualConvention")
+cephSnmpHandler = ModuleIdentity((1, 3, 6, 1, 4, 1, 50495))
+cephSnmpHandler.setRevisions(('2019-03-01 00:00',))
+if mibBuilder.loadTexts: cephSnmpHandler.setLastUpdated('201903010000Z')
+if mibBuilder.loadTexts: cephSnmpHandler.setOrganization('www.ceph.com')
+clusterInfo = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 1))
+clusterStatus = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 2))
+monMap = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 3))
+osdMap = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 4))
+mdsMap = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 5))
+mgrMap = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 6))
+svcMap = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 7))
+poolMap = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 8))
+pgMap = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 9))
+clusterTraps = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 10))
+snmpMonMapTable = MibTable((1, 3, 6, 1, 4, 1, 50495, 3, 1), )
+if mibBuilder.loadTexts: snmpMonMapTable.setStatus('current')
+snmpMonMapEntry = MibTableRow((1, 3, 6, 1, 4, 1, 50495, 3, 1, 1), ).setIndexNames((1, "SNMPHANDLER-MIB", "snmpMonIndex"))
+if mibBuilder.loadTexts: snmpMonMapEntry.setStatus('current')
+snmpMonIndex = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 3, 1, 1, 1), IpAddress())
+if mibBuilder.loadTexts: snmpMonIndex.setStatus('current')
+snmpMonName = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 3, 1, 1, 2), OctetString()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpMonName.setStatus('current')
+snmpMonRank = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 3, 1, 1, 3), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpMonRank.setStatus('current')
+snmpMonPort = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 3, 1, 1, 4), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpMonPort.setStatus('current')
+snmpMonStatus = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 3, 1, 1, 5), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("monIn", 0), ("monOut", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpMonStatus.setStatus('current')
+snmpOsdMapTable = MibTable((1, 3, 6, 1, 4, 1, 50495, 4, 1), )
+if mibBuilder.loadTexts: snmpOsdMapTable.setStatus('current')
+snmpOsdMapEntry = MibTableRow((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1), ).setIndexNames((1, "SNMPHANDLER-MIB", "snmpOsdIndex"))
+if mibBuilder.loadTexts: snmpOsdMapEntry.setStatus('current')
+snmpOsdIndex = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 1), Integer32().subtype(subtypeSpec=ValueRangeConstraint(0, 1048576)))
+if mibBuilder.loadTexts: snmpOsdIndex.setStatus('current')
+snmpOsdUuid = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 2), OctetString()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdUuid.setStatus('current')
+snmpOsdHost = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 3), OctetString()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdHost.setStatus('current')
+snmpOsdInOut = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 4), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("osdOut", 0), ("osdIn", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdInOut.setStatus('current')
+snmpOsdUpDown = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 5), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("osdDown", 0), ("osdUp", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdUpDown.setStatus('current')
+snmpOsdPublic = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 6), IpAddress()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdPublic.setStatus('current')
+snmpOsdPublicPort = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 7), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdPublicPort.setStatus('current')
+snmpOsdCluster = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 8), IpAddress()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdCluster.setStatus('current')
+snmpOsdClusterPort = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 9), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdClusterPort.setStatus('current')
+snmpOsdClass = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 10), OctetString()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdClass.setStatus('current')
+snmpOsdReweightIntegral = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 11), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdReweightIntegral.setStatus('current')
+snmpOsdReweightDecimal = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 12), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdReweightDecimal.setStatus('current')
+snmpOsdSize = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 13), Counter64()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdSize.setStatus('current')
+snmpOsdUsed = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 14), Counter64()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdUsed.setStatus('current')
+snmpOsdFree = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 15), Counter64()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdFree.setStatus('current')
+snmpOsdPgTotal = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 16), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdPgTotal.setStatus('current')
+snmpOsdPgPrimary = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 17), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdPgPrimary.setStatus('current')
+snmpOsdBackend = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 18), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1, 2))).clone(namedValues=NamedValues(("osdFileStore", 0), ("osdBlueStore", 1), ("osdUnknownStore", 2)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdBackend.setStatus('current')
+snmpOsdReadIops = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 19), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdReadIops.setStatus('current')
+snmpOsdWriteIops = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 20), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdWriteIops.setStatus('current')
+snmpOsdWriteRate = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 21), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdWriteRate.setStatus('current')
+snmpOsdReadRate = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 22), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdReadRate.setStatus('current')
+snmpOsdReadLatency = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 23), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdReadLatency.setStatus('current')
+snmpOsdWriteLatency = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 4, 1, 1, 24), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpOsdWriteLatency.setStatus('current')
+snmpMgrMapTable = MibTable((1, 3, 6, 1, 4, 1, 50495, 6, 1), )
+if mibBuilder.loadTexts: snmpMgrMapTable.setStatus('current')
+snmpMgrMapEntry = MibTableRow((1, 3, 6, 1, 4, 1, 50495, 6, 1, 1), ).setIndexNames((1, "SNMPHANDLER-MIB", "snmpMgrIndex"))
+if mibBuilder.loadTexts: snmpMgrMapEntry.setStatus('current')
+snmpMgrIndex = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 6, 1, 1, 1), OctetString().subtype(subtypeSpec=ValueSizeConstraint(1, 128)))
+if mibBuilder.loadTexts: snmpMgrIndex.setStatus('current')
+snmpMgrAddress = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 6, 1, 1, 2), IpAddress()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpMgrAddress.setStatus('current')
+snmpMgrPort = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 6, 1, 1, 3), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpMgrPort.setStatus('current')
+snmpMgrActive = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 6, 1, 1, 4), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("mgrStandby", 0), ("mgrActive", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpMgrActive.setStatus('current')
+snmpSvcMapTable = MibTable((1, 3, 6, 1, 4, 1, 50495, 7, 1), )
+if mibBuilder.loadTexts: snmpSvcMapTable.setStatus('current')
+snmpSvcMapEntry = MibTableRow((1, 3, 6, 1, 4, 1, 50495, 7, 1, 1), ).setIndexNames((1, "SNMPHANDLER-MIB", "snmpSvcIndex"))
+if mibBuilder.loadTexts: snmpSvcMapEntry.setStatus('current')
+snmpSvcIndex = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 7, 1, 1, 1), OctetString().subtype(subtypeSpec=ValueSizeConstraint(1, 128)))
+if mibBuilder.loadTexts: snmpSvcIndex.setStatus('current')
+snmpSvcNode = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 7, 1, 1, 2), OctetString().subtype(subtypeSpec=ValueSizeConstraint(1, 128))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpSvcNode.setStatus('current')
+snmpSvcAddress = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 7, 1, 1, 3), IpAddress()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpSvcAddress.setStatus('current')
+snmpSvcPort = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 7, 1, 1, 4), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpSvcPort.setStatus('current')
+snmpSvcVersion = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 7, 1, 1, 5), OctetString()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpSvcVersion.setStatus('current')
+snmpSvcDistro = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 7, 1, 1, 6), OctetString()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpSvcDistro.setStatus('current')
+snmpPoolMapTable = MibTable((1, 3, 6, 1, 4, 1, 50495, 8, 1), )
+if mibBuilder.loadTexts: snmpPoolMapTable.setStatus('current')
+snmpPoolMapEntry = MibTableRow((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1), ).setIndexNames((1, "SNMPHANDLER-MIB", "snmpPoolIndex"))
+if mibBuilder.loadTexts: snmpPoolMapEntry.setStatus('current')
+snmpPoolIndex = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 1), Integer32().subtype(subtypeSpec=ValueRangeConstraint(0, 1048576)))
+if mibBuilder.loadTexts: snmpPoolIndex.setStatus('current')
+snmpPoolName = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 2), OctetString()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolName.setStatus('current')
+snmpPoolType = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 3), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("poolReplicated", 0), ("poolErasure", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolType.setStatus('current')
+snmpPoolSize = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 4), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolSize.setStatus('current')
+snmpPoolMinSize = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 5), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolMinSize.setStatus('current')
+snmpPoolCrushRule = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 6), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolCrushRule.setStatus('current')
+snmpPoolPG = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 7), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolPG.setStatus('current')
+snmpPoolPGP = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 8), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolPGP.setStatus('current')
+snmpPoolScrub = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 9), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("poolScrubYes", 0), ("poolScrubNo", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolScrub.setStatus('current')
+snmpPoolDeepScrub = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 10), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("poolDeepScrubYes", 0), ("poolDeepScrubNo", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolDeepScrub.setStatus('current')
+snmpPoolSizeChange = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 11), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("poolSizeChangeYes", 0), ("poolSizeChangeNo", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolSizeChange.setStatus('current')
+snmpPoolDelete = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 12), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("poolDeleteYes", 0), ("poolDeleteNo", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolDelete.setStatus('current')
+snmpPoolCompress = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 13), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1))).clone(namedValues=NamedValues(("poolCompressedYes", 0), ("poolCompressedNo", 1)))).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolCompress.setStatus('current')
+snmpPoolApplication = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 14), OctetString()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolApplication.setStatus('current')
+snmpPoolStored = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 15), Counter64()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolStored.setStatus('current')
+snmpPoolObjects = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 16), Counter64()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolObjects.setStatus('current')
+snmpPoolReadOps = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 17), Counter64()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolReadOps.setStatus('current')
+snmpPoolWriteOps = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 18), Counter64()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolWriteOps.setStatus('current')
+snmpPoolReadBytes = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 19), Counter64()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolReadBytes.setStatus('current')
+snmpPoolWriteBytes = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 20), Counter64()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolWriteBytes.setStatus('current')
+snmpPoolStoredRate = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 21), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolStoredRate.setStatus('current')
+snmpPoolObjectsRate = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 22), Integer32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolObjectsRate.setStatus('current')
+snmpPoolReadIops = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 23), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolReadIops.setStatus('current')
+snmpPoolWriteIops = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 24), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolWriteIops.setStatus('current')
+snmpPoolReadRate = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 25), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolReadRate.setStatus('current')
+snmpPoolWriteRate = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 8, 1, 1, 26), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPoolWriteRate.setStatus('current')
+pgTotal = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 1), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgTotal.setStatus('current')
+pgActive = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 2), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgActive.setStatus('current')
+pgClean = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 3), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgClean.setStatus('current')
+pgDegraded = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 4), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgDegraded.setStatus('current')
+pgMisplaced = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 5), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgMisplaced.setStatus('current')
+pgUndersized = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 6), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgUndersized.setStatus('current')
+pgPeering = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 7), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgPeering.setStatus('current')
+pgStale = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 8), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgStale.setStatus('current')
+pgDown = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 9), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgDown.setStatus('current')
+pgInconsistent = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 10), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgInconsistent.setStatus('current')
+pgRecovering = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 11), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgRecovering.setStatus('current')
+pgBackfilling = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 12), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgBackfilling.setStatus('current')
+pgInactive = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 13), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgInactive.setStatus('current')
+pgInactiveSeconds = MibScalar((1, 3, 6, 1, 4, 1, 50495, 9, 14), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pgInactiveSeconds.setStatus('current')
+snmpPgPoolTable = MibTable((1, 3, 6, 1, 4, 1, 50495, 9, 20), )
+if mibBuilder.loadTexts: snmpPgPoolTable.setStatus('current')
+snmpPgPoolEntry = MibTableRow((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1), ).setIndexNames((1, "SNMPHANDLER-MIB", "snmpPgPoolIndex"))
+if mibBuilder.loadTexts: snmpPgPoolEntry.setStatus('current')
+snmpPgPoolIndex = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 1), Integer32().subtype(subtypeSpec=ValueRangeConstraint(0, 1048576)))
+if mibBuilder.loadTexts: snmpPgPoolIndex.setStatus('current')
+snmpPgPoolTotal = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 2), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolTotal.setStatus('current')
+snmpPgPoolActive = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 3), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolActive.setStatus('current')
+snmpPgPoolClean = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 4), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolClean.setStatus('current')
+snmpPgPoolDegraded = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 5), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolDegraded.setStatus('current')
+snmpPgPoolMisplaced = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 6), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolMisplaced.setStatus('current')
+snmpPgPoolUndersized = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 7), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolUndersized.setStatus('current')
+snmpPgPoolPeering = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 8), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolPeering.setStatus('current')
+snmpPgPoolStale = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 9), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolStale.setStatus('current')
+snmpPgPoolDown = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 10), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolDown.setStatus('current')
+snmpPgPoolInconsistent = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 11), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolInconsistent.setStatus('current')
+snmpPgPoolRecovering = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 12), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolRecovering.setStatus('current')
+snmpPgPoolBackfilling = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 13), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolBackfilling.setStatus('current')
+snmpPgPoolInactive = MibTableColumn((1, 3, 6, 1, 4, 1, 50495, 9, 20, 1, 14), Gauge32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: snmpPgPoolInactive.setStatus('current')
+clusterConformance = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 11))
+clusterGroups = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 11, 1))
+clusterCompliances = MibIdentifier((1, 3, 6, 1, 4, 1, 50495, 11, 2))
+clusterCompliance3 = ModuleCompliance((1, 3, 6, 1, 4, 1, 50495, 11, 2, 1)).setObjects(("SNMPHANDLER-MIB", "clusterGeneralInformationGroup"), ("SNMPHANDLER-MIB", "clusterStatusNotificationsGroup"))
+
+if getattr(mibBuilder, 'version', (0, 0, 0)) > (4, 4, 0):
+    clusterCompliance3 = clusterCompliance3.setStatus('current')
+clusterGeneralInformationGroup = ObjectGroup((1, 3, 6, 1, 4, 1, 50495, 11, 1, 1)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"), ("SNMPHANDLER-MIB", "heartbeatSequence"), ("SNMPHANDLER-MIB", "heartbeatUptime"), ("SNMPHANDLER-MIB", "notificationSequence"))
+if getattr(mibBuilder, 'version', (0, 0, 0)) > (4, 4, 0):
+    clusterGeneralInformationGroup = clusterGeneralInformationGroup.setStatus('current')
+clusterStatusNotificationsGroup = NotificationGroup((1, 3, 6, 1, 4, 1, 50495, 11, 1, 2)).setObjects(("SNMPHANDLER-MIB", "clusterOk"), ("SNMPHANDLER-MIB", "clusterWarn"), ("SNMPHANDLER-MIB", "clusterError"), ("SNMPHANDLER-MIB", "clusterCheck"), ("SNMPHANDLER-MIB", "poolFullForecast"), ("SNMPHANDLER-MIB", "osdUtilizationOutliers"), ("SNMPHANDLER-MIB", "osdLatencyHigh"), ("SNMPHANDLER-MIB", "pgDegradedPersist"), ("SNMPHANDLER-MIB", "hostInventoryChanged"), ("SNMPHANDLER-MIB", "clusterHeartbeat"))
+if getattr(mibBuilder, 'version', (0, 0, 0)) > (4, 4, 0):
+    clusterStatusNotificationsGroup = clusterStatusNotificationsGroup.setStatus('current')
+fsId = MibScalar((1, 3, 6, 1, 4, 1, 50495, 1, 1), OctetString()).setMaxAccess("readwrite")
+if mibBuilder.loadTexts: fsId.setStatus('current')
+statusDetail = MibScalar((1, 3, 6, 1, 4, 1, 50495, 2, 1), Integer32().subtype(subtypeSpec=ConstraintsUnion(SingleValueConstraint(0, 1, 2, 3))).clone(namedValues=NamedValues(("healthOk", 0), ("healthWarn", 1), ("healthError", 2), ("healthUnknown", 3)))).setMaxAccess("readwrite")
+if mibBuilder.loadTexts: statusDetail.setStatus('current')
+statusMsg = MibScalar((1, 3, 6, 1, 4, 1, 50495, 2, 2), OctetString()).setMaxAccess("readwrite")
+if mibBuilder.loadTexts: statusMsg.setStatus('current')
+heartbeatSequence = MibScalar((1, 3, 6, 1, 4, 1, 50495, 2, 3), Counter32()).setMaxAccess("accessiblefornotify")
+if mibBuilder.loadTexts: heartbeatSequence.setStatus('current')
+heartbeatUptime = MibScalar((1, 3, 6, 1, 4, 1, 50495, 2, 4), TimeTicks()).setMaxAccess("accessiblefornotify")
+if mibBuilder.loadTexts: heartbeatUptime.setStatus('current')
+notificationSequence = MibScalar((1, 3, 6, 1, 4, 1, 50495, 2, 5), Counter32()).setMaxAccess("accessiblefornotify")
+if mibBuilder.loadTexts: notificationSequence.setStatus('current')
+clusterOk = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 1)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"))
+if mibBuilder.loadTexts: clusterOk.setStatus('current')
+clusterWarn = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 2)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"))
+if mibBuilder.loadTexts: clusterWarn.setStatus('current')
+clusterError = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 3)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"))
+if mibBuilder.loadTexts: clusterError.setStatus('current')
+clusterCheck = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 4)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"))
+if mibBuilder.loadTexts: clusterCheck.setStatus('current')
+poolFullForecast = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 5)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"))
+if mibBuilder.loadTexts: poolFullForecast.setStatus('current')
+osdUtilizationOutliers = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 6)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"))
+if mibBuilder.loadTexts: osdUtilizationOutliers.setStatus('current')
+osdLatencyHigh = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 7)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"))
+if mibBuilder.loadTexts: osdLatencyHigh.setStatus('current')
+pgDegradedPersist = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 8)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"))
+if mibBuilder.loadTexts: pgDegradedPersist.setStatus('current')
+hostInventoryChanged = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 9)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "statusMsg"))
+if mibBuilder.loadTexts: hostInventoryChanged.setStatus('current')
+clusterHeartbeat = NotificationType((1, 3, 6, 1, 4, 1, 50495, 10, 10)).setObjects(("SNMPHANDLER-MIB", "fsId"), ("SNMPHANDLER-MIB", "statusDetail"), ("SNMPHANDLER-MIB", "heartbeatSequence"), ("SNMPHANDLER-MIB", "heartbeatUptime"))
+if mibBuilder.loadTexts: clusterHeartbeat.setStatus('current')
+mibBuilder.exportSymbols("SNMPHANDLER-MIB", pgDown=pgDown, clusterOk=clusterOk, snmpPgPoolActive=snmpPgPoolActive, snmpOsdClass=snmpOsdClass, clusterGroups=clusterGroups, snmpOsdWriteIops=snmpOsdWriteIops, snmpMonMapTable=snmpMonMapTable, snmpMonPort=snmpMonPort, snmpPgPoolRecovering=snmpPgPoolRecovering, snmpOsdHost=snmpOsdHost, snmpOsdReadRate=snmpOsdReadRate, snmpPoolWriteBytes=snmpPoolWriteBytes, snmpPgPoolInconsistent=snmpPgPoolInconsistent, pgDegradedPersist=pgDegradedPersist, snmpPoolStored=snmpPoolStored, snmpPgPoolDown=snmpPgPoolDown, poolMap=poolMap, snmpSvcIndex=snmpSvcIndex, snmpPoolPG=snmpPoolPG, snmpSvcPort=snmpSvcPort, pgActive=pgActive, snmpPgPoolMisplaced=snmpPgPoolMisplaced, pgUndersized=pgUndersized, pgDegraded=pgDegraded, mdsMap=mdsMap, snmpOsdWriteRate=snmpOsdWriteRate, poolFullForecast=poolFullForecast, hostInventoryChanged=hostInventoryChanged, snmpSvcAddress=snmpSvcAddress, clusterTraps=clusterTraps, snmpPoolWriteOps=snmpPoolWriteOps, pgInactive=pgInactive, snmpPoolIndex=snmpPoolIndex, osdUtilizationOutliers=osdUtilizationOutliers, snmpPoolName=snmpPoolName, snmpPoolReadIops=snmpPoolReadIops, pgBackfilling=pgBackfilling, snmpOsdPgTotal=snmpOsdPgTotal, snmpPoolDeepScrub=snmpPoolDeepScrub, snmpMgrIndex=snmpMgrIndex, snmpPoolWriteRate=snmpPoolWriteRate, snmpPoolReadOps=snmpPoolReadOps, snmpSvcMapTable=snmpSvcMapTable, notificationSequence=notificationSequence, clusterWarn=clusterWarn, snmpMgrActive=snmpMgrActive, snmpOsdBackend=snmpOsdBackend, snmpMonIndex=snmpMonIndex, monMap=monMap, snmpPgPoolInactive=snmpPgPoolInactive, snmpSvcVersion=snmpSvcVersion, snmpOsdWriteLatency=snmpOsdWriteLatency, snmpOsdReadLatency=snmpOsdReadLatency, snmpPoolReadRate=snmpPoolReadRate, snmpPgPoolClean=snmpPgPoolClean, snmpPoolDelete=snmpPoolDelete, snmpMonName=snmpMonName, snmpPoolCompress=snmpPoolCompress, snmpPoolObjectsRate=snmpPoolObjectsRate, pgStale=pgStale, snmpPoolSize=snmpPoolSize, snmpOsdReweightDecimal=snmpOsdReweightDecimal, snmpSvcMapEntry=snmpSvcMapEntry, snmpPoolMapEntry=snmpPoolMapEntry, svcMap=svcMap, heartbeatSequence=heartbeatSequence, clusterCompliance3=clusterCompliance3, osdMap=osdMap, snmpPoolCrushRule=snmpPoolCrushRule, snmpPoolType=snmpPoolType, snmpOsdClusterPort=snmpOsdClusterPort, mgrMap=mgrMap, snmpOsdUuid=snmpOsdUuid, clusterGeneralInformationGroup=clusterGeneralInformationGroup, snmpMgrMapTable=snmpMgrMapTable, clusterStatusNotificationsGroup=clusterStatusNotificationsGroup, pgClean=pgClean, clusterStatus=clusterStatus, snmpOsdCluster=snmpOsdCluster, snmpPgPoolTotal=snmpPgPoolTotal, snmpOsdUsed=snmpOsdUsed, pgInconsistent=pgInconsistent, snmpPoolReadBytes=snmpPoolReadBytes, snmpOsdPublicPort=snmpOsdPublicPort, clusterInfo=clusterInfo, snmpSvcNode=snmpSvcNode, snmpOsdSize=snmpOsdSize, snmpOsdMapTable=snmpOsdMapTable, fsId=fsId, clusterConformance=clusterConformance, snmpPoolWriteIops=snmpPoolWriteIops, snmpOsdReadIops=snmpOsdReadIops, snmpPgPoolTable=snmpPgPoolTable, snmpPgPoolBackfilling=snmpPgPoolBackfilling, snmpOsdReweightIntegral=snmpOsdReweightIntegral, snmpMgrMapEntry=snmpMgrMapEntry, snmpPgPoolStale=snmpPgPoolStale, snmpPoolScrub=snmpPoolScrub, snmpOsdPublic=snmpOsdPublic, clusterCheck=clusterCheck, clusterHeartbeat=clusterHeartbeat, snmpPgPoolDegraded=snmpPgPoolDegraded, snmpOsdFree=snmpOsdFree, snmpPoolObjects=snmpPoolObjects, pgTotal=pgTotal, osdLatencyHigh=osdLatencyHigh, snmpPgPoolPeering=snmpPgPoolPeering, snmpMgrPort=snmpMgrPort, snmpPoolSizeChange=snmpPoolSizeChange, snmpPoolMapTable=snmpPoolMapTable, pgMisplaced=pgMisplaced, snmpPgPoolIndex=snmpPgPoolIndex, snmpMonRank=snmpMonRank, clusterCompliances=clusterCompliances, snmpPoolStoredRate=snmpPoolStoredRate, pgRecovering=pgRecovering, clusterError=clusterError, cephSnmpHandler=cephSnmpHandler, snmpOsdInOut=snmpOsdInOut, snmpPgPoolEntry=snmpPgPoolEntry, snmpPgPoolUndersized=snmpPgPoolUndersized, snmpSvcDistro=snmpSvcDistro, snmpMgrAddress=snmpMgrAddress, PYSNMP_MODULE_ID=cephSnmpHandler, statusDetail=statusDetail, snmpOsdMapEntry=snmpOsdMapEntry, pgPeering=pgPeering, heartbeatUptime=heartbeatUptime, snmpMonStatus=snmpMonStatus, snmpOsdIndex=snmpOsdIndex, snmpOsdPgPrimary=snmpOsdPgPrimary, snmpPoolApplication=snmpPoolApplication, snmpPoolMinSize=snmpPoolMinSize, statusMsg=statusMsg, snmpPoolPGP=snmpPoolPGP, pgInactiveSeconds=pgInactiveSeconds, snmpOsdUpDown=snmpOsdUpDown, pgMap=pgMap, snmpMonMapEntry=snmpMonMapEntry)
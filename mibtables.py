@@ -0,0 +1,434 @@
+"""
+Layout of SNMPHANDLER-MIB as served by the agent and the builders turning the
+cluster maps into (OID, value) pairs.
+
+Values are (syntax, raw) tuples. The syntax is the BER tag of the SNMP type
+so the agent can encode a value without another lookup.
+
+The OSD space and placement group columns come from the PG map, which is much
+more expensive to fetch than the maps, and the pool counters and rates from
+the pool stats and PG counters computed from the PG summaries, and the OSD
+performance columns from the perf counters sampled on the serve loop. They
+are lazy columns of the
+store: computed from the MapSnapshot the store was built for, only when a
+request reaches them. A snapshot with new stats but the same maps gets a
+store sharing all the rest (see OidStore.with_source). Every compute
+function names the snapshot view it reads in its view attribute, so a store
+can take over the columns computed by the previous one when that view did not
+change (see OidStore.share_computed).
+"""
+import socket
+import struct
+
+from ber import INTEGER, OCTET_STRING, IP_ADDRESS, COUNTER64, GAUGE32
+from oidstore import OidStore, LAZY, pack_oid
+from pgstats import PG_COUNTERS
+
+#
+# SNMPHANDLER-MIB layout (see SNMPHANDLER-MIB.txt)
+#
+CEPH_SNMP_HANDLER = (1, 3, 6, 1, 4, 1, 50495)
+FS_ID = CEPH_SNMP_HANDLER + (1, 1, 0)
+STATUS_DETAIL = CEPH_SNMP_HANDLER + (2, 1, 0)
+STATUS_MSG = CEPH_SNMP_HANDLER + (2, 2, 0)
+HEARTBEAT_SEQUENCE = CEPH_SNMP_HANDLER + (2, 3, 0)
+HEARTBEAT_UPTIME = CEPH_SNMP_HANDLER + (2, 4, 0)
+NOTIFICATION_SEQUENCE = CEPH_SNMP_HANDLER + (2, 5, 0)
+MON_MAP_ENTRY = CEPH_SNMP_HANDLER + (3, 1, 1)
+OSD_MAP_ENTRY = CEPH_SNMP_HANDLER + (4, 1, 1)
+POOL_MAP_ENTRY = CEPH_SNMP_HANDLER + (8, 1, 1)
+PG_MAP = CEPH_SNMP_HANDLER + (9,)
+PG_POOL_ENTRY = PG_MAP + (20, 1)
+CLUSTER_TRAPS = CEPH_SNMP_HANDLER + (10,)
+
+HEALTH_DETAIL = {'HEALTH_OK': 0, 'HEALTH_WARN': 1, 'HEALTH_ERR': 2}
+HEALTH_UNKNOWN = 3
+
+POOL_TYPE_REPLICATED = 1
+POOL_TYPE_ERASURE = 3
+
+OSD_BACKENDS = {'filestore': 0, 'bluestore': 1}
+OSD_BACKEND_UNKNOWN = 2
+
+INTEGER32_MAX = 2 ** 31 - 1
+GAUGE32_MAX = 2 ** 32 - 1
+
+
+def split_addr(addr):
+    """
+    Turn a Ceph entity address into (ip, port).
+
+    Handles the legacy '10.0.1.105:6789/0' form as well as address vectors
+    such as '[v2:10.0.1.105:3300/0,v1:10.0.1.105:6789/0]', preferring the
+    v1 entry. Anything that is not IPv4 is reported as 0.0.0.0.
+    """
+    if not addr:
+        return '0.0.0.0', 0
+    addr = addr.strip('[]')
+    candidates = addr.split(',')
+    chosen = candidates[0]
+    for candidate in candidates:
+        if candidate.startswith('v1:'):
+            chosen = candidate
+            break
+    if chosen[:3] in ('v1:', 'v2:'):
+        chosen = chosen[3:]
+    chosen = chosen.split('/', 1)[0]
+    ip, _, port = chosen.rpartition(':')
+    try:
+        socket.inet_aton(ip)
+        port = int(port)
+    except (socket.error, ValueError):
+        return '0.0.0.0', 0
+    return ip, port
+
+
+def ip_index(ip):
+    return tuple(int(x) for x in ip.split('.'))
+
+
+def build_cluster_scalars(fsid, health):
+    if health is None:
+        detail = HEALTH_UNKNOWN
+        msg = 'Cluster status not retrieved yet'
+    else:
+        detail = HEALTH_DETAIL.get(health['status'], HEALTH_UNKNOWN)
+        checks = health.get('checks') or []
+        if isinstance(checks, dict):
+            checks = list(checks.values())
+        msg = health['status']
+        if checks:
+            msg = checks[0]['summary']['message']
+    return [
+        (FS_ID, (OCTET_STRING, fsid)),
+        (STATUS_DETAIL, (INTEGER, detail)),
+        (STATUS_MSG, (OCTET_STRING, msg)),
+    ]
+
+
+def build_mon_table(mon_map, mon_status=None):
+    if mon_map is None:
+        return []
+    quorum = None
+    if mon_status is not None:
+        quorum = set(mon_status.get('quorum', []))
+
+    rows = []
+    for mon in mon_map['mons']:
+        ip, port = split_addr(mon.get('public_addr') or mon.get('addr'))
+        in_quorum = quorum is None or mon['rank'] in quorum
+        rows.append((ip_index(ip), [
+            (2, (OCTET_STRING, mon['name'])),
+            (3, (INTEGER, mon['rank'])),
+            (4, (INTEGER, port)),
+            (5, (INTEGER, 0 if in_quorum else 1)),
+        ]))
+    return _table_items(MON_MAP_ENTRY, rows)
+
+
+def osd_hosts(osd_map):
+    """
+    OSD ID to host name, from the host buckets of the OSD tree
+    """
+    hosts = {}
+    for node in osd_map['tree']['nodes']:
+        if node.get('type') == 'host':
+            for child in node.get('children', []):
+                hosts[child] = node['name']
+    return hosts
+
+
+def osd_stats_column(ids, stat):
+    """
+    Lazy column computing stat(osd_stats, osd_id) for the OSDs from the
+    OsdStats of the snapshot
+    """
+    def compute(snapshot):
+        osd_stats = None
+        if snapshot is not None and snapshot.osd_stats is not None:
+            osd_stats = snapshot.osd_stats.get()
+        if osd_stats is None or osd_stats.data is None:
+            return [0] * len(ids)
+        return [stat(osd_stats, osd_id) for osd_id in ids]
+    compute.view = 'osd_stats'
+    return compute
+
+
+def _osd_kb(field):
+    def stat(osd_stats, osd_id):
+        return osd_stats.stats_by_id.get(osd_id, {}).get(field, 0) * 1024
+    return stat
+
+
+def _osd_pgs(osd_stats, osd_id):
+    return osd_stats.pgs_by_id.get(
+        osd_id, osd_stats.stats_by_id.get(osd_id, {}).get('num_pgs', 0))
+
+
+def _osd_primaries(osd_stats, osd_id):
+    return osd_stats.primaries_by_id.get(osd_id, 0)
+
+
+def osd_perf_column(ids, field, latency=False):
+    """
+    Lazy column of the OsdPerf of the snapshot: a rate (read, write ops, bytes
+    in, out) or a latency (read, write) of every OSD, clamped to a Gauge32
+    """
+    def compute(snapshot):
+        osd_perf = snapshot.osd_perf if snapshot is not None else None
+        if osd_perf is None:
+            return [0] * len(ids)
+        values = osd_perf.latencies if latency else osd_perf.rates
+        cells = []
+        for osd_id in ids:
+            value = values.get(osd_id)
+            value = int(round(value[field])) if value is not None else 0
+            cells.append(min(max(value, 0), GAUGE32_MAX))
+        return cells
+    compute.view = 'osd_perf'
+    return compute
+
+
+def build_osd_table(osd_map):
+    """
+    Build snmpOsdMapTable from an OsdMap in a single pass.
+
+    Every map column is filled at once from osds_by_id, osd_metadata and the
+    OSD tree, then the table is laid out column after column, which is
+    already OID order, so it is returned as an OidStore built without
+    sorting. The space and PG columns (13 to 17) and the performance columns
+    (19 to 24) are lazy.
+    """
+    if osd_map is None or osd_map.data is None:
+        return OidStore()
+    osds = osd_map.osds_by_id
+    hosts = osd_hosts(osd_map.data)
+    nodes = osd_map.osd_tree_node_by_id
+    metadata = osd_map.data.get('osd_metadata') or {}
+
+    ids = sorted(osds)
+    uuid, host, inout, updown = [], [], [], []
+    public, public_port, cluster, cluster_port = [], [], [], []
+    device_class, integral, decimal, backend = [], [], [], []
+    for osd_id in ids:
+        osd = osds[osd_id]
+        meta = metadata.get(str(osd_id), {})
+        uuid.append(osd.get('uuid', ''))
+        host.append(hosts.get(osd_id, meta.get('hostname', '')))
+        inout.append(osd['in'])
+        updown.append(osd['up'])
+        ip, port = split_addr(osd.get('public_addr'))
+        public.append(ip)
+        public_port.append(port)
+        ip, port = split_addr(osd.get('cluster_addr'))
+        cluster.append(ip)
+        cluster_port.append(port)
+        device_class.append(nodes.get(osd_id, {}).get('device_class', ''))
+        weight = osd.get('weight', 0.0)
+        # The decimal portion is reported in 1/10000th
+        integral.append(int(weight))
+        decimal.append(int(round((weight - int(weight)) * 10000)))
+        backend.append(OSD_BACKENDS.get(meta.get('osd_objectstore'), OSD_BACKEND_UNKNOWN))
+
+    return _column_store(OSD_MAP_ENTRY, ids, [
+        (2, OCTET_STRING, uuid),
+        (3, OCTET_STRING, host),
+        (4, INTEGER, inout),
+        (5, INTEGER, updown),
+        (6, IP_ADDRESS, public),
+        (7, INTEGER, public_port),
+        (8, IP_ADDRESS, cluster),
+        (9, INTEGER, cluster_port),
+        (10, OCTET_STRING, device_class),
+        (11, INTEGER, integral),
+        (12, INTEGER, decimal),
+        (13, COUNTER64, osd_stats_column(ids, _osd_kb('kb'))),
+        (14, COUNTER64, osd_stats_column(ids, _osd_kb('kb_used'))),
+        (15, COUNTER64, osd_stats_column(ids, _osd_kb('kb_avail'))),
+        (16, INTEGER, osd_stats_column(ids, _osd_pgs)),
+        (17, INTEGER, osd_stats_column(ids, _osd_primaries)),
+        (18, INTEGER, backend),
+        (19, GAUGE32, osd_perf_column(ids, 0)),
+        (20, GAUGE32, osd_perf_column(ids, 1)),
+        (21, GAUGE32, osd_perf_column(ids, 2)),
+        (22, GAUGE32, osd_perf_column(ids, 3)),
+        (23, GAUGE32, osd_perf_column(ids, 0, True)),
+        (24, GAUGE32, osd_perf_column(ids, 1, True)),
+    ])
+
+
+def pool_stats_column(ids, field, rate=False, low=0, high=None):
+    """
+    Lazy column of the pool stats of the snapshot: the latest value of the
+    POOL_STATS field, or its rate per second clamped to [low, high]
+    """
+    def compute(snapshot):
+        pool_stats = snapshot.pool_stats if snapshot is not None else None
+        if pool_stats is None:
+            return [0] * len(ids)
+        values = pool_stats.rates if rate else pool_stats.counters
+        cells = []
+        for pool_id in ids:
+            value = values.get(pool_id)
+            value = value[field] if value is not None else 0
+            if rate:
+                value = min(max(int(round(value)), low), high)
+            cells.append(value)
+        return cells
+    compute.view = 'pool_stats'
+    return compute
+
+
+def build_pool_table(osd_map):
+    """
+    Build snmpPoolMapTable from an OsdMap in a single pass like the OSD
+    table. The stats counters and rates (columns 15 to 26) are lazy.
+    """
+    if osd_map is None or osd_map.data is None:
+        return OidStore()
+    pools = osd_map.pools_by_id
+    ids = sorted(pools)
+    name, erasure, size, min_size, crush_rule, pg, pgp = [], [], [], [], [], [], []
+    noscrub, nodeep_scrub, nosizechange, nodelete, compress, application = \
+        [], [], [], [], [], []
+    for pool_id in ids:
+        pool = pools[pool_id]
+        flags = pool.get('flags_names', '').split(',')
+        options = pool.get('options') or {}
+        compressed = options.get('compression_mode', 'none') not in ('none', '')
+        name.append(pool['pool_name'])
+        erasure.append(1 if pool['type'] == POOL_TYPE_ERASURE else 0)
+        size.append(pool['size'])
+        min_size.append(pool['min_size'])
+        crush_rule.append(pool.get('crush_rule', pool.get('crush_ruleset', 0)))
+        pg.append(pool['pg_num'])
+        pgp.append(pool['pg_placement_num'])
+        noscrub.append(1 if 'noscrub' in flags else 0)
+        nodeep_scrub.append(1 if 'nodeep-scrub' in flags else 0)
+        nosizechange.append(1 if 'nosizechange' in flags else 0)
+        nodelete.append(1 if 'nodelete' in flags else 0)
+        compress.append(0 if compressed else 1)
+        application.append(','.join(sorted(pool.get('application_metadata') or {})))
+
+    return _column_store(POOL_MAP_ENTRY, ids, [
+        (2, OCTET_STRING, name),
+        (3, INTEGER, erasure),
+        (4, INTEGER, size),
+        (5, INTEGER, min_size),
+        (6, INTEGER, crush_rule),
+        (7, INTEGER, pg),
+        (8, INTEGER, pgp),
+        (9, INTEGER, noscrub),
+        (10, INTEGER, nodeep_scrub),
+        (11, INTEGER, nosizechange),
+        (12, INTEGER, nodelete),
+        (13, INTEGER, compress),
+        (14, OCTET_STRING, application),
+        # Counters then rates of the POOL_STATS fields, in that order
+        (15, COUNTER64, pool_stats_column(ids, 0)),
+        (16, COUNTER64, pool_stats_column(ids, 1)),
+        (17, COUNTER64, pool_stats_column(ids, 2)),
+        (18, COUNTER64, pool_stats_column(ids, 3)),
+        (19, COUNTER64, pool_stats_column(ids, 4)),
+        (20, COUNTER64, pool_stats_column(ids, 5)),
+        (21, INTEGER, pool_stats_column(ids, 0, True, -INTEGER32_MAX, INTEGER32_MAX)),
+        (22, INTEGER, pool_stats_column(ids, 1, True, -INTEGER32_MAX, INTEGER32_MAX)),
+        (23, GAUGE32, pool_stats_column(ids, 2, True, 0, GAUGE32_MAX)),
+        (24, GAUGE32, pool_stats_column(ids, 3, True, 0, GAUGE32_MAX)),
+        (25, GAUGE32, pool_stats_column(ids, 4, True, 0, GAUGE32_MAX)),
+        (26, GAUGE32, pool_stats_column(ids, 5, True, 0, GAUGE32_MAX)),
+    ])
+
+
+def pg_counters_column(ids, field):
+    """
+    Lazy column of the PgCounters of the snapshot: a counter of the
+    cluster, when ids is None, or of the pools
+    """
+    def compute(snapshot):
+        pg_counters = snapshot.pg_counters if snapshot is not None else None
+        if pg_counters is None:
+            return [0] * (1 if ids is None else len(ids))
+        if ids is None:
+            if field is None:
+                return [min(int(pg_counters.inactive_seconds()), GAUGE32_MAX)]
+            return [pg_counters.counts[field]]
+        cells = []
+        for pool_id in ids:
+            counts = pg_counters.by_pool.get(pool_id)
+            cells.append(counts[field] if counts is not None else 0)
+        return cells
+    # The inactive time goes on without the counters changing
+    if ids is not None or field is not None:
+        compute.view = 'pg_counters'
+    return compute
+
+
+def build_pg_tables(osd_map):
+    """
+    Build the pgMap scalars, one per PG counter then the seconds PGs have been
+    inactive, and snmpPgPoolTable with the counters of every pool of the
+    OsdMap. All of them are lazy.
+    """
+    scalars = [(column + 1, GAUGE32, pg_counters_column(None, column))
+               for column in range(len(PG_COUNTERS))]
+    scalars.append((len(PG_COUNTERS) + 1, GAUGE32, pg_counters_column(None, None)))
+    stores = [_column_store(PG_MAP, [0], scalars)]
+    if osd_map is not None and osd_map.data is not None:
+        ids = sorted(osd_map.pools_by_id)
+        stores.append(_column_store(PG_POOL_ENTRY, ids, [
+            (column + 2, GAUGE32, pg_counters_column(ids, column))
+            for column in range(len(PG_COUNTERS))]))
+    return OidStore.join(stores)
+
+
+def _table_items(entry, rows):
+    """
+    Flatten (index, [(column, value)]) rows into (OID, value) pairs
+    """
+    items = []
+    for index, columns in rows:
+        for column, value in columns:
+            items.append((entry + (column,) + index, value))
+    return items
+
+
+def _column_store(entry, indices, columns):
+    """
+    Store of a table indexed by a single integer, from (column, syntax,
+    cells) in column order and the sorted indices of the rows. cells is a
+    list of raw values, or the compute function of a lazy column. The index
+    part of the keys is packed once for all the columns.
+    """
+    packed = [struct.pack('>I', index) for index in indices]
+    oids, keys, values, lazy = [], [], [], []
+    for column, syntax, cells in columns:
+        prefix = entry + (column,)
+        key = pack_oid(prefix)
+        if callable(cells):
+            lazy.append((len(oids), len(oids) + len(indices), cells))
+            cells = [LAZY] * len(indices)
+        oids.extend([prefix + (index,) for index in indices])
+        keys.extend([key + index for index in packed])
+        values.extend([(syntax, cell) for cell in cells])
+    return OidStore.from_sorted(oids, values, keys, lazy)
+
+
+def build_store(fsid, snapshot, previous=None):
+    """
+    Build and encode the agent view of the MIB from a MapSnapshot. Passing
+    the store this one replaces lets unchanged varbinds reuse their encoding.
+    """
+    def data(view):
+        return view.data if view is not None else None
+
+    items = build_cluster_scalars(fsid, data(snapshot.health))
+    items += build_mon_table(data(snapshot.mon_map), data(snapshot.mon_status))
+    store = OidStore.join([
+        OidStore(items),
+        build_osd_table(snapshot.osd_map),
+        build_pool_table(snapshot.osd_map),
+        build_pg_tables(snapshot.osd_map),
+    ]).with_source(snapshot)
+    store.encode(previous)
+    return store
@@ -29,16 +29,66 @@ import random
 import six
 import time
 from mgr_module import MgrModule, MgrStandbyModule, CommandResult
-from threading import Event
+from threading import Event, Thread
 from mgr_module import CRUSHMap
 
 from types import OsdMap, NotFound, Config, FsMap, MonMap, \
-    PgSummary, Health, MonStatus, ServiceMap
+    PgSummary, Health, MonStatus, ServiceMap, OsdStats
 
 from pysnmp.hlapi import *
 
+from agent import SnmpAgent, WorkerPool, default_python
+from mibtables import build_store
+from snapshot import SnapshotBuilder, Deferred
+from poolstats import PoolStatsRing
+from osdusage import OutlierDetector
+from perfstats import OsdPerfSampler
+from pgstats import PgSummaryCounter, Sustained
+from scheduler import Scheduler, Task
+from inventory import Inventory
+from watchdog import MonWatchdog
+from heartbeat import Heartbeat
+from notification import Notifier
+from mib import SNMPTRAP_OIDS, snmptrap_v1
+from notifystate import NotificationState, STORE_KEY
+from perf import PerfCounters, clock as perf_clock
+from profiler import Profiler
+from recorder import Recorder
+from usm import Usm, LEVELS
+
 import rados
 
+#
+# What the standby module prepares for the active one. Both run in the same
+# interpreter, so on failover the active module takes over the options, the
+# fsId, the notification state, the trap Notifier and the SNMP v3 users with
+# their localized keys the standby set up, and can send its first
+# notification right away.
+#
+_warm_state = {}
+WARM_OPTIONS = ('trap_addr', 'trap_port', 'trap_oid', 'trap_on_start', 'trap_on_shutdown',
+                'trap_using_tools', 'snmp_version', 'snmp_community', 'snmpv3_engine',
+                'snmpv3_user', 'snmpv3_pass', 'snmpv3_enc', 'snmpv3_level')
+
+def notification_config(module):
+    return (module.trap_addr, str(module.trap_port), module.snmp_version,
+            module.snmp_community, module.snmpv3_engine, module.snmpv3_user,
+            module.snmpv3_level, module.snmpv3_pass, module.snmpv3_enc)
+
+def usm_users(module):
+    return [{
+        'name': module.snmpv3_user,
+        'level': module.snmpv3_level,
+        'auth': module.snmpv3_pass,
+        'priv': module.snmpv3_enc,
+    }]
+
+def agent_address():
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except socket.error:
+        return '0.0.0.0'
+
 class StandbyModule(MgrStandbyModule):
     config = dict()
     #
@@ -101,7 +151,7 @@ class StandbyModule(MgrStandbyModule):
     snmp_community = 'public'
     snmpv3_engine = '0x8000000001020304'
     snmpv3_user = 'ceph'
-    snmpv3_auth = 'SHA:mypassword'
+    snmpv3_pass = 'SHA:mypassword'
     snmpv3_enc = 'AES:mypassword'
     snmpv3_level = 'noAuthNoPriv'
     #
@@ -117,15 +167,14 @@ class StandbyModule(MgrStandbyModule):
             __name__, _global_instance))
         self.event = Event()
 
-    def serve(self):
-        module = self
+    def load_options(self):
         self.trap_addr = self.get_localized_config('trap_addr', 'localhost')
         self.trap_port = self.get_localized_config('trap_port', '162')
         self.trap_oid = self.get_localized_config('trap_oid', '1.3.6.1.4.1.50495')
         self.sleep_interval = int(self.get_localized_config('sleep_interval', '30'))
         self.trap_on_start = int(self.get_localized_config('trap_on_start', '0'))
         self.trap_on_shutdown = int(self.get_localized_config('trap_on_shutdown', '0'))
-        self.trap_using_tools = self.get_localized_config('trap_using_tools', True)
+        self.trap_using_tools = int(self.get_localized_config('trap_using_tools', True))
         #
         # SNMP V1/V2C Parameters
         #
@@ -139,6 +188,10 @@ class StandbyModule(MgrStandbyModule):
         self.snmpv3_pass = self.get_localized_config('snmpv3_pass', 'SHA:cephpassword')
         self.snmpv3_enc = self.get_localized_config('snmpv3_enc', 'AES:cephpassword')
         self.snmpv3_level = self.get_localized_config('snmpv3_level', 'noAuthNoPriv')
+
+    def serve(self):
+        module = self
+        self.load_options()
         #
         self.log.error("Standby loaded parameters Destination = {0}".format(self.trap_addr))
         self.log.error("                          Port        = {0}".format(self.trap_port))
@@ -153,16 +206,19 @@ class StandbyModule(MgrStandbyModule):
         self.log.error("                          Security    = {0}".format(self.snmpv3_level))
         self.log.error("                          Use Tools   = {0}".format(self.trap_using_tools))
         self.log.info('Starting standby')
+        self.warm()
         if self.trap_on_start == True:
             timeofday = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
             trapstring = timeofday+" Ceph Manager SNMP Handler - Standby Starting"
             self.send_generic_trap(self.ceph_health_mapping['HEALTH_UNKNOWN'], trapstring)
 
         while self.run:
-            timeofday = time.strftime('%H%M', time.localtime())
             self.log.info('Sleeping for %d', self.sleep_interval)
             self.event.wait(self.sleep_interval)
             self.event.clear()
+            if self.run:
+                self.load_options()
+                self.warm()
 
     def shutdown(self):
         self.log.info('Stopping standby')
@@ -171,9 +227,44 @@ class StandbyModule(MgrStandbyModule):
             trapstring = timeofday+" Ceph Manager SNMP Handler - Standby Stopping"
             self.send_generic_trap(self.ceph_health_mapping['HEALTH_UNKNOWN'], trapstring)
 
+        _warm_state['stopped'] = time.time()
         self.run = False
         self.event.set()
 
+    #
+    # Get everything the active module needs ready while we wait: the
+    # options, the fsId and notification state saved by the active module,
+    # and the trap Notifier and SNMP v3 users built from them, which are
+    # only rebuilt when one of them changed
+    #
+    def warm(self):
+        state = _warm_state
+        state['options'] = dict((name, getattr(self, name)) for name in WARM_OPTIONS)
+        state['notifications'] = self.get_store(STORE_KEY)
+        self.fsId = self.get_store('fsid') or self.fsId
+        config = notification_config(self)
+        if state.get('config') == config and state.get('fsid') == self.fsId:
+            return state
+        start = time.time()
+        notifier = users = None
+        try:
+            if self.snmp_version == '3':
+                users = Usm.users_from_config({'engine': self.snmpv3_engine,
+                                               'users': usm_users(self)})
+            if self.fsId != 'N/A':
+                notifier = Notifier(self.trap_addr, self.trap_port, self.snmp_version,
+                                    self.snmp_community, self.fsId,
+                                    agent_addr=agent_address(), user=self.snmpv3_user,
+                                    level=LEVELS.get(self.snmpv3_level, 0))
+        except (ValueError, KeyError, socket.error) as e:
+            self.log.error("Cannot prepare the notifications for failover: {0}".format(e))
+        if state.get('notifier') is not None:
+            state['notifier'].close()
+        state.update(config=config, fsid=self.fsId, notifier=notifier, users=users)
+        self.log.info("Prepared the notifications for failover in {0:.1f} ms".format(
+            (time.time() - start) * 1000))
+        return state
+
     def get_fsid(self):
         if self.fsId == 'N/A':
            self.log.info("Cluster FSID has not been retrieved yet.")
@@ -195,28 +286,32 @@ class StandbyModule(MgrStandbyModule):
     # - 1 : Send a clusterWarn trap
     # - 2 : Send a clusterError trap
     # - 3 : Send a clusterCheck trap
+    # unless trapName names another trap of the MIB
     #
-    def send_generic_trap(self, statusDetail, statusMsg):
+    def send_generic_trap(self, statusDetail, statusMsg, trapName=None):
+        if trapName is None:
+            trapName = self.ceph_trap_mapping[statusDetail]
         self.log.debug("SNMP Version --> "+str(self.snmp_version))
         self.log.debug("statusDetail --> "+str(statusDetail))
         self.log.debug("statusMsg    --> "+str(statusMsg))
         if self.trap_using_tools == True:
            if self.snmp_version == '1':
-              commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' '+self.ceph_trap_mapping[statusDetail]+' '+socket.gethostname()+' 6 0 0 fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+              commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' '+snmptrap_v1(trapName, socket.gethostname())+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
            elif self.snmp_version == '2c':
-              commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+self.ceph_trap_mapping[statusDetail]+' fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+              commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+SNMPTRAP_OIDS[trapName]+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
            elif self.snmp_version == '3':
               if self.snmpv3_level == 'noAuthNoPriv':
-                 commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -l noAuthNoPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+self.ceph_trap_mapping[statusDetail]+' fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+                 commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -l noAuthNoPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+SNMPTRAP_OIDS[trapName]+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
               elif self.snmpv3_level == 'authNoPriv':
                  user_parms = self.snmpv3_pass.split(':', 1)
-                 commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -l authNoPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+self.ceph_trap_mapping[statusDetail]+' fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+                 commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -l authNoPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+SNMPTRAP_OIDS[trapName]+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
               elif self.snmpv3_level == 'authPriv':
                  user_parms = self.snmpv3_pass.split(':', 1)
                  enc_parms = self.snmpv3_enc.split(':', 1)
-                 commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -x '+enc_parms[0]+' -X '+enc_parms[1]+' -l authPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+self.ceph_trap_mapping[statusDetail]+' fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+                 commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -x '+enc_parms[0]+' -X '+enc_parms[1]+' -l authPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+SNMPTRAP_OIDS[trapName]+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
               else:
                  self.log.error("Invalid security level string: "+self.snmpv3_level)
+                 return self
            else:
               self.log.error("SNMP Version not supported --> "+str(self.snmp_version))
               return self
@@ -226,8 +321,15 @@ class StandbyModule(MgrStandbyModule):
            if code != 0:
               self.log.error("--> "+commandLine)
               self.log.error("--> Failed to send trap. RC={0}".format(code))
+        elif self.snmp_version == '3':
+           self.log.error("Only the active module sends SNMP v3 traps without the local tools")
+        elif _warm_state.get('notifier') is None:
+           self.log.error("No trap destination set up for {0}".format(trapName))
         else:
-           self.log.error("We only support sending traps using local tools for now")
+           try:
+              _warm_state['notifier'].send_trap(trapName, statusDetail, statusMsg)
+           except (ValueError, KeyError, socket.error) as e:
+              self.log.error("--> Failed to send trap {0}: {1}".format(trapName, e))
 
         return self
 
@@ -297,12 +399,66 @@ class Module(MgrModule):
     snmp_community = 'public'
     snmpv3_engine = '0x8000000001020304'
     snmpv3_user = 'ceph'
-    snmpv3_auth = 'SHA:mypassword'
+    snmpv3_pass = 'SHA:mypassword'
     snmpv3_enc = 'AES:mypassword'
     snmpv3_level = 'noAuthNoPriv'
     #
     # Available options are noAuthNoPriv|authNoPriv|authPriv
     #
+    #
+    # SNMP agent variables
+    # Number of worker processes serving requests, 0 serves them in the mgr
+    #
+    agent_workers = 0
+    agent_snapshot = ''
+    agent_python = ''
+    agent_cache_size = 1024
+    #
+    # Send a poolFullForecast trap when the usage trend of a pool projects
+    # it full within that many hours, 0 disables the forecast
+    #
+    pool_full_horizon = 48
+    #
+    # Send an osdUtilizationOutliers trap listing the worst osd_outlier_count
+    # OSDs when an OSD utilization goes osd_outlier_zscore standard
+    # deviations or osd_outlier_deviation points away from the mean of its
+    # device class, 0 disables either test
+    #
+    osd_outlier_zscore = 3.0
+    osd_outlier_deviation = 20.0
+    osd_outlier_count = 5
+    #
+    # Send an osdLatencyHigh trap when the average read or write latency of
+    # an OSD over the last interval goes past that many milliseconds, 0
+    # disables it
+    #
+    osd_latency_threshold = 0
+    #
+    # PG summaries are processed at most once every pg_summary_interval
+    # seconds, the latest one wins. Send a pgDegradedPersist trap when more
+    # than pg_degraded_threshold PGs stay degraded for pg_degraded_duration
+    # seconds, 0 disables it
+    #
+    pg_summary_interval = 1.0
+    pg_degraded_threshold = 0
+    pg_degraded_duration = 300
+    #
+    # Intervals of the serve loop tasks, the agent worker check runs every
+    # sleep_interval
+    #
+    stats_interval = 30
+    inventory_interval = 300
+    #
+    # Seconds between two Monitor connection checks while it is up and
+    # while it is down
+    #
+    mon_check_interval = 0.5
+    mon_check_degraded_interval = 0.1
+    #
+    # Send a clusterHeartbeat trap every heartbeat_interval seconds, 0
+    # disables it
+    #
+    heartbeat_interval = 0
 
     COMMANDS = [
         {
@@ -332,6 +488,29 @@ class Module(MgrModule):
             "cmd": "snmp listener_off ",
             "desc": "Turn off listening for SNMP get requests",
             "perm": "rw"
+        },
+        {
+            "cmd": "snmp listener_status ",
+            "desc": "Show the SNMP agent status and response cache statistics",
+            "perm": "r"
+        },
+        {
+            "cmd": "snmp perf ",
+            "desc": "Show the module counters and latency histograms as JSON",
+            "perm": "r"
+        },
+        {
+            "cmd": "snmp profile "
+                   "name=action,type=CephChoices,strings=start|stop|dump",
+            "desc": "Start or stop sampling the module threads, or dump the collapsed stacks",
+            "perm": "rw"
+        },
+        {
+            "cmd": "snmp record "
+                   "name=action,type=CephChoices,strings=start|stop|status "
+                   "name=path,type=CephString,req=false",
+            "desc": "Start or stop recording the notifications and mgr data to a capture file",
+            "perm": "rw"
         }
     ]
     MODULE_OPTIONS = [
@@ -344,7 +523,7 @@ class Module(MgrModule):
         { # Base OID to send as the trap OID: RFU
             "name": "trap_oid"
         },
-        { # Sleep time in the server loop: RFU default is 30
+        { # Seconds between two SNMP agent worker checks: default is 30
             "name": "sleep_interval"
         },
         { # Send a clusterCheck trap on startup default is False
@@ -376,6 +555,57 @@ class Module(MgrModule):
         },
         { # The SNMP v3 security setting: authPriv, authNoPriv, noAuthPriv, noAuthNoPriv default is noAuthNoPriv
             "name": "snmpv3_level"
+        },
+        { # Number of SNMP agent worker processes: default is 0 (answer from the mgr)
+            "name": "agent_workers"
+        },
+        { # Snapshot file shared with the agent workers: default is /var/run/ceph/snmphandler-{fsid}.snapshot
+            "name": "agent_snapshot"
+        },
+        { # Python interpreter running the agent workers: default is the one running the mgr or /usr/bin/python
+            "name": "agent_python"
+        },
+        { # Number of encoded responses the SNMP agent caches, 0 disables the cache: default is 1024
+            "name": "agent_cache_size"
+        },
+        { # Hours ahead a pool projected full triggers a poolFullForecast trap, 0 disables it: default is 48
+            "name": "pool_full_horizon"
+        },
+        { # Z-score in its device class making an OSD utilization an outlier, 0 disables it: default is 3
+            "name": "osd_outlier_zscore"
+        },
+        { # Points from the mean of its device class making an OSD utilization an outlier, 0 disables it: default is 20
+            "name": "osd_outlier_deviation"
+        },
+        { # Number of outlier OSDs listed in an osdUtilizationOutliers trap: default is 5
+            "name": "osd_outlier_count"
+        },
+        { # Milliseconds of average OSD read or write latency triggering an osdLatencyHigh trap, 0 disables it: default is 0
+            "name": "osd_latency_threshold"
+        },
+        { # Minimum seconds between two processed PG summaries: default is 1
+            "name": "pg_summary_interval"
+        },
+        { # Number of degraded PGs which must persist to trigger a pgDegradedPersist trap, 0 disables it: default is 0
+            "name": "pg_degraded_threshold"
+        },
+        { # Seconds the degraded PGs must persist to trigger a pgDegradedPersist trap: default is 300
+            "name": "pg_degraded_duration"
+        },
+        { # Seconds between two OSD perf counter samples: default is 30
+            "name": "stats_interval"
+        },
+        { # Seconds between two server inventories, skipped when no map changed: default is 300
+            "name": "inventory_interval"
+        },
+        { # Seconds between two Monitor connection checks while connected: default is 0.5
+            "name": "mon_check_interval"
+        },
+        { # Seconds between two Monitor connection checks while disconnected: default is 0.1
+            "name": "mon_check_degraded_interval"
+        },
+        { # Seconds between two clusterHeartbeat traps, 0 disables them: default is 0
+            "name": "heartbeat_interval"
         }
     ]
 
@@ -392,8 +622,59 @@ class Module(MgrModule):
 #        self._rados = None
 
         # A short history of pool df stats
-        self.pool_stats = defaultdict(lambda: defaultdict(
-            lambda: collections.deque(maxlen=10)))
+        self.pool_stats = PoolStatsRing()
+        # The pools a poolFullForecast trap was sent for
+        self.pools_filling = set()
+        # The OSD utilization outliers, set up by serve()
+        self.osd_outliers = None
+        # A short history of OSD perf counters and the OSDs reported slow
+        self.osd_perf = OsdPerfSampler()
+        self.osds_slow = set()
+        # PG summaries are flagged by notify and processed by their thread
+        self.pg_counter = PgSummaryCounter()
+        self.pg_degraded = None
+        self.pg_summary_pending = Event()
+        self.pg_summary_thread = None
+        self.pg_summaries = {'received': 0, 'processed': 0}
+
+        # The periodic tasks of the serve loop, set up by serve()
+        self.scheduler = None
+        # The hosts of the cluster
+        self.inventory = Inventory()
+        # The Monitor connection watchdog, set up by serve()
+        self.mon_watchdog = None
+        # The pre-encoded clusterHeartbeat trap, set up by serve()
+        self.heartbeat = None
+        # The SNMP v3 engine of the agent and of the notifications
+        self.usm = None
+        # The traps sent without the local tools, with the options they
+        # were built for
+        self.notifier = None
+        self.notifier_config = None
+        # Counters and latency histograms of the hot paths
+        self.perf = PerfCounters()
+        # Sampling profiler of the threads running the module code, idle
+        # until started with snmp profile start
+        self.profiler = Profiler(os.path.dirname(os.path.abspath(__file__)))
+        # Capture of the notifications and get() payloads, see snmp record
+        self.recorder = None
+        # PG summaries are flagged since then and not processed yet
+        self.pg_summary_since = None
+        # The last state and sequence number of the notifications, kept in
+        # the store so a restart or failover does not repeat them
+        self.notifications = NotificationState(lambda: self.get_store(STORE_KEY),
+                                               lambda data: self.set_store(STORE_KEY, data))
+        # What the standby module prepared, see take_over()
+        self.warm_users = None
+        self.handover = None
+        self.take_over()
+
+        # The map views shared with the agent and any other reader.
+        # Readers take self.snapshots.current() without locking.
+        self.snapshots = SnapshotBuilder()
+
+        # The SNMP agent when the listener is turned on
+        self.agent = None
 
 #    @property
 #    def rados(self):
@@ -410,22 +691,328 @@ class Module(MgrModule):
 #
 #        return self._rados
 
+    #
+    # Sample the df pool stats into the ring and return the PoolStats with
+    # the counters and rates of every pool
+    #
     def update_pool_stats(self):
         df = global_instance().get("df")
-        pool_stats = dict([(p['id'], p['stats']) for p in df['pools']])
+        self.pool_stats.sample([(p['id'], p['stats']) for p in df['pools']], time.time())
+        if self.pool_full_horizon > 0:
+            self.check_pool_forecast(df['pools'])
+        return self.pool_stats.current()
+    #
+    # Project the bytes_used trend of every pool onto its max_avail and
+    # send a poolFullForecast trap for the pools which fill up within
+    # pool_full_horizon hours. A pool is only reported again once its
+    # projection went past twice the horizon, so a trend hovering around
+    # the horizon does not repeat the trap on every sample.
+    #
+    def check_pool_forecast(self, pools):
+        horizon = self.pool_full_horizon * 3600.0
+        seconds = self.pool_stats.time_to_full(
+            [p['stats'].get('max_avail', 0) for p in pools]).tolist()
+        filling = set()
+        for pool, left in zip(pools, seconds):
+            if left < horizon:
+                filling.add(pool['id'])
+                if pool['id'] not in self.pools_filling:
+                    self.send_pool_forecast_trap(pool['name'], left)
+            elif left < 2 * horizon and pool['id'] in self.pools_filling:
+                filling.add(pool['id'])
+        self.pools_filling = filling
+        self.notifications.update('pools_filling', sorted(filling))
+
+    #
+    # Look for OSD utilization outliers in the OSD stats and send a single
+    # osdUtilizationOutliers trap listing the worst ones when an OSD became
+    # one. The OSD stats alone are much cheaper to get than the PG map.
+    #
+    def check_osd_outliers(self):
+        osd_stats = OsdStats(global_instance().get("osd_stats"))
+        worst = self.osd_outliers.check(self.snapshots.current().osd_map, osd_stats)
+        if worst:
+            self.send_osd_outliers_trap(worst, len(self.osd_outliers.outliers))
+
+    def send_osd_outliers_trap(self, worst, count):
+        trapstring = "Ceph Manager SNMP Handler - {0} OSD utilization outliers: {1}".format(
+            count, ', '.join([str(outlier) for outlier in worst]))
+        self.log.info(trapstring)
+        self.send_generic_trap(self.ceph_health_mapping['HEALTH_WARN'], trapstring,
+                               trapName='osdUtilizationOutliers')
+
+    #
+    # Sample the perf counters of every OSD in one call and publish their
+    # rates and latencies over the last interval
+    #
+    def update_osd_perf(self):
+        get_all_perf_counters = getattr(self, 'get_all_perf_counters', None)
+        if get_all_perf_counters is None:
+            return None
+        start = perf_clock()
+        perf_counters = get_all_perf_counters()
+        self.perf.observe('get.perf_counters', perf_clock() - start)
+        self.osd_perf.sample(perf_counters, time.time())
+        osd_perf = self.osd_perf.current()
+        if self.osd_latency_threshold > 0:
+            self.check_osd_latency(osd_perf)
+        return self.publish(osd_perf=osd_perf)
+    #
+    # Send one osdLatencyHigh trap listing the slowest OSDs when an OSD
+    # goes past osd_latency_threshold. An OSD reported slow is only cleared
+    # once back under 80% of the threshold.
+    #
+    def check_osd_latency(self, osd_perf):
+        threshold = self.osd_latency_threshold * 1000.0
+        slow = set()
+        for osd_id, latencies in osd_perf.latencies.items():
+            latency = max(latencies)
+            if latency > threshold or (latency > 0.8 * threshold and osd_id in self.osds_slow):
+                slow.add(osd_id)
+        new = slow - self.osds_slow
+        self.osds_slow = slow
+        self.notifications.update('osds_slow', sorted(slow))
+        if new:
+            worst = sorted(slow, key=lambda osd_id: -max(osd_perf.latencies[osd_id]))[:5]
+            trapstring = "Ceph Manager SNMP Handler - {0} OSDs above {1} ms: {2}".format(
+                len(slow), self.osd_latency_threshold, ', '.join([
+                    "osd.{0} read {1:.1f} ms write {2:.1f} ms".format(
+                        osd_id, osd_perf.latencies[osd_id][0] / 1000,
+                        osd_perf.latencies[osd_id][1] / 1000) for osd_id in worst]))
+            self.log.info(trapstring)
+            self.send_generic_trap(self.ceph_health_mapping['HEALTH_WARN'], trapstring,
+                                   trapName='osdLatencyHigh')
+
+    #
+    # The periodic tasks of the serve loop. The server inventory is only
+    # refreshed when one of the cluster maps changed. The Monitor connection
+    # is checked by its own watchdog thread. Heartbeats are not jittered so
+    # receivers can expect one every heartbeat_interval.
+    #
+    def build_scheduler(self):
+        scheduler = Scheduler(self.log)
+        scheduler.add(Task('inventory', self.update_inventory, self.inventory_interval,
+                           epoch=self.map_epochs), delay=1.0)
+        scheduler.add(Task('stats', self.sample_stats, self.stats_interval), delay=2.0)
+        scheduler.add(Task('agent', self.check_agent, self.sleep_interval), delay=3.0)
+        scheduler.add(Task('notifications', self.notifications.flush,
+                           self.notifications.delay, jitter=0.0))
+        if self.heartbeat is not None:
+            scheduler.add(Task('heartbeat', self.send_heartbeat, self.heartbeat_interval,
+                               jitter=0.0))
+        return scheduler
+
+    def map_epochs(self):
+        snapshot = self.snapshots.current()
+        epochs = []
+        for view in (snapshot.mon_map, snapshot.osd_map, snapshot.fs_map, snapshot.service_map):
+            data = view.data if view is not None else None
+            epochs.append(data.get('epoch') if isinstance(data, dict) else None)
+        return tuple(epochs)
+
+    def check_mon_connection(self):
+        self.mon_connection = bool(self.have_mon_connection())
+        return self.mon_connection
+    #
+    # Called once by the watchdog when the connection to the Monitors is
+    # lost, then once when it is back, whatever the length of the outage
+    #
+    def mon_connection_lost(self):
+        #
+        # To make sure we recheck the status of the cluster when
+        # the conmnection to the Monitors is restored to make sure
+        # we issue a new trap on the next map update.
+        #
+        self.clusterHealth = None
+        self.log.info("Lost connection to Monitors, detected within {0:.3f} seconds".format(
+            self.mon_watchdog.last_detection or 0.0))
+        self.send_unknown_trap()
+
+    def mon_connection_restored(self, outage):
+        self.log.info("Connection to Monitors restored after {0:.1f} seconds".format(outage))
+        timeofday = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+        trapstring = timeofday+" Ceph Manager SNMP Handler - Connection to Monitors restored after {0:.1f} seconds".format(outage)
+        self.send_generic_trap(self.ceph_health_mapping['HEALTH_UNKNOWN'], trapstring,
+                               trapName='clusterCheck')
+
+    #
+    # Only the hosts whose list_servers entry changed are fetched again, a
+    # hostInventoryChanged trap reports the changes after the first update
+    #
+    def update_inventory(self):
+        if not self.mon_connection:
+            return
+        first = self.inventory.updates == 0
+        changes = self.inventory.update(self.list_servers(), self.get_server)
+        if any(changes) and not first:
+            self.send_inventory_trap(changes)
+
+    def send_inventory_trap(self, changes):
+        trapstring = "Ceph Manager SNMP Handler - Hosts {0}".format(changes)
+        self.log.info(trapstring)
+        self.send_generic_trap(self.ceph_health_mapping['HEALTH_OK'], trapstring,
+                               trapName='hostInventoryChanged')
+
+    def sample_stats(self):
+        if self.mon_connection:
+            self.update_osd_perf()
+
+    def check_agent(self):
+        if self.agent is not None:
+            self.agent.check()
+
+    #
+    # Take over what the standby module prepared when we are activated by
+    # a failover. Options are read again by serve(), these only serve the
+    # notifications sent before it gets to them.
+    #
+    def take_over(self):
+        state = _warm_state
+        if 'stopped' not in state:
+            return
         now = time.time()
-        for pool_id, stats in pool_stats.items():
-            for stat_name, stat_val in stats.items():
-                self.pool_stats[pool_id][stat_name].appendleft((now, stat_val))
+        for name, value in state.get('options', {}).items():
+            setattr(self, name, value)
+        if state.get('fsid') and state['fsid'] != 'N/A':
+            self.fsId = state['fsid']
+        if state.get('notifier') is not None:
+            self.notifier = state['notifier']
+            self.notifier_config = state['config']
+            self.notifier.start = now
+            self.notifier.perf = self.perf
+        if state.get('users') is not None:
+            self.warm_users = (state['config'], state['users'])
+        if 'notifications' in state:
+            self.notifications.restore(state['notifications'])
+        self.handover = {'standby_stopped': state['stopped'], 'active_started': now}
+        self.log.info("Took over from the standby {0:.1f} ms after it stopped".format(
+            (now - state['stopped']) * 1000))
+        state.clear()
+
+    #
+    # The Notifier of the traps sent without the local tools, built again
+    # when the options it depends on changed. SNMP v3 traps share the engine
+    # of the agent.
+    #
+    def get_notifier(self):
+        config = notification_config(self)
+        if self.notifier is None or self.notifier_config != config:
+            if self.notifier is not None:
+                self.notifier.close()
+            self.notifier = None
+            self.notifier = Notifier(self.trap_addr, self.trap_port, self.snmp_version,
+                                     self.snmp_community, self.get_fsid(),
+                                     agent_addr=agent_address(), user=self.snmpv3_user,
+                                     level=LEVELS.get(self.snmpv3_level, 0))
+            self.notifier.perf = self.perf
+            self.notifier_config = config
+        if self.snmp_version == '3' and self.notifier.usm is None:
+            if self.usm is None:
+                self.usm = Usm.from_config(json.loads(self.usm_config()), self.localized_users())
+            self.notifier.usm = self.usm
+        return self.notifier
+
+    #
+    # The SNMP v3 users localized by the standby, if the options did not
+    # change since
+    #
+    def localized_users(self):
+        if self.warm_users is not None and self.warm_users[0] == notification_config(self):
+            return self.warm_users[1]
+        return None
+
+    def build_heartbeat(self):
+        return Heartbeat(self.get_notifier())
+
+    def send_heartbeat(self):
+        if self.clusterHealth is not None:
+            status = self.clusterHealth['status']
+        else:
+            status = self.notifications.get('health')
+        if status is None or not self.mon_connection:
+            status = 'HEALTH_UNKNOWN'
+        self.heartbeat.notifier = self.get_notifier()
+        self.heartbeat.send(self.ceph_health_mapping.get(status, self.ceph_health_mapping['HEALTH_UNKNOWN']))
+
+    #
+    # Process the PG summaries on their own thread with the latest one
+    # winning: notify only flags that a new one arrived, so the summaries
+    # received while one is processed, or within pg_summary_interval of it,
+    # collapse into a single pass over the latest
+    #
+    def pg_summary_loop(self):
+        while self.run:
+            if not self.pg_summary_pending.wait(1.0):
+                continue
+            self.pg_summary_pending.clear()
+            start = time.time()
+            since, self.pg_summary_since = self.pg_summary_since, None
+            if since is not None:
+                self.perf.observe('queue.pg_summary', perf_clock() - since)
+            probe = perf_clock()
+            try:
+                self.process_pg_summary()
+            except Exception as e:
+                self.log.error("Failed to process the PG summary: {0}".format(e))
+            self.perf.observe('process.pg_summary', perf_clock() - probe)
+            self.pg_summaries['processed'] += 1
+            time.sleep(max(0.0, self.pg_summary_interval - (time.time() - start)))
+
+    def process_pg_summary(self):
+        views = {'pool_stats': self.update_pool_stats(),
+                 'pg_counters': self.update_pg_counters()}
+        if self.osd_outliers is not None:
+            self.check_osd_outliers()
+        if self.agent is not None:
+            views['osd_stats'] = Deferred(self.process_osdstats)
+        return self.publish(**views)
+    #
+    # Count the PGs by state of the latest PG summary and check how long
+    # the degraded ones have been above pg_degraded_threshold
+    #
+    def update_pg_counters(self):
+        pg_counters = self.pg_counter.count(global_instance().get("pg_summary") or {}, time.time())
+        degraded = pg_counters.count('degraded')
+        if self.pg_degraded is not None and self.pg_degraded.update(degraded, pg_counters.stamp):
+            trapstring = "Ceph Manager SNMP Handler - {0} PGs degraded for more than {1} seconds".format(
+                degraded, self.pg_degraded_duration)
+            self.log.info(trapstring)
+            self.send_generic_trap(self.ceph_health_mapping['HEALTH_WARN'], trapstring,
+                                   trapName='pgDegradedPersist')
+        return pg_counters
+
+    def send_pool_forecast_trap(self, pool_name, seconds):
+        self.log.info("Pool {0} projected full in {1:.1f} hours".format(pool_name, seconds / 3600))
+        trapstring = "Ceph Manager SNMP Handler - Pool {0} projected full in {1:.1f} hours".format(
+            pool_name, seconds / 3600)
+        self.send_generic_trap(self.ceph_health_mapping['HEALTH_WARN'], trapstring,
+                               trapName='poolFullForecast')
 
     def get_fsid(self):
         if self.fsId == 'N/A':
            self.log.info("Cluster FSID has not been retrieved yet.")
            self.fsId = self.get('mon_map')['fsid']
            self.log.info("Cluster FSID discovered as {0}".format(self.fsId))
+           self.set_store('fsid', self.fsId)
         return self.fsId
 
+    #
+    # Every fetch from the mgr goes through here to be timed, and recorded
+    # while snmp record is on
+    #
+    def get(self, data_name):
+        start = perf_clock()
+        try:
+            data = super(Module, self).get(data_name)
+        finally:
+            self.perf.observe('get.' + data_name, perf_clock() - start)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.get(data_name, data)
+        return data
+
     def get_sync_object(self, object_type):
+        start = perf_clock()
         if object_type == OsdMap:
             data = self.get("osd_map")
 
@@ -449,6 +1036,9 @@ class Module(MgrModule):
             data = self.get("pg_summary")
             #self.log.debug("JSON: {0}".format(data))
             obj = PgSummary(data)
+        elif object_type == OsdStats:
+            data = self.get("pg_dump")
+            obj = OsdStats(data)
         elif object_type == Health:
             data = self.get("health")
             obj = Health(json.loads(data['json']))
@@ -461,6 +1051,7 @@ class Module(MgrModule):
         else:
             raise NotImplementedError(object_type)
 
+        self.perf.observe('sync.' + object_type.__name__, perf_clock() - start)
         return obj
     #
     # A function dedicated to sending a test trap to a custom
@@ -474,21 +1065,22 @@ class Module(MgrModule):
     def send_test_trap(self, toHost, toPort):
         if self.trap_using_tools == True:
            if self.snmp_version == '1':
-              commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+toHost+':'+str(toPort)+' clusterCheck '+socket.gethostname()+' 6 0 0 fsId s '+self.get_fsid()+' statusDetail i '+str(self.ceph_health_mapping['HEALTH_OK'])+' statusMsg s "Ceph Manager SNMP Handler - Test Trap SNMP v1"'
+              commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+toHost+':'+str(toPort)+' '+snmptrap_v1('clusterCheck', socket.gethostname())+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(self.ceph_health_mapping['HEALTH_OK'])+' '+SNMPTRAP_OIDS['statusMsg']+' s "Ceph Manager SNMP Handler - Test Trap SNMP v1"'
            elif self.snmp_version == '2c':
-              commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+toHost+':'+str(toPort)+' 0 clusterCheck fsId s '+self.get_fsid()+' statusDetail i '+str(self.ceph_health_mapping['HEALTH_OK'])+' statusMsg s "Ceph Manager SNMP Handler - Test Trap SNMP v2c"'
+              commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+toHost+':'+str(toPort)+' 0 '+SNMPTRAP_OIDS['clusterCheck']+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(self.ceph_health_mapping['HEALTH_OK'])+' '+SNMPTRAP_OIDS['statusMsg']+' s "Ceph Manager SNMP Handler - Test Trap SNMP v2c"'
            elif self.snmp_version == '3':
               if self.snmpv3_level == 'noAuthNoPriv':
-                 commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -l noAuthNoPriv -e '+self.snmpv3_engine+' '+toHost+':'+str(toPort)+' 0 clusterCheck fsId s '+self.get_fsid()+' statusDetail i '+str(self.ceph_health_mapping['HEALTH_OK'])+' statusMsg s "Ceph Manager SNMP Handler - Test Trap SNMP v3 noAuthNoPriv"'
+                 commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -l noAuthNoPriv -e '+self.snmpv3_engine+' '+toHost+':'+str(toPort)+' 0 '+SNMPTRAP_OIDS['clusterCheck']+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(self.ceph_health_mapping['HEALTH_OK'])+' '+SNMPTRAP_OIDS['statusMsg']+' s "Ceph Manager SNMP Handler - Test Trap SNMP v3 noAuthNoPriv"'
               elif self.snmpv3_level == 'authNoPriv':
                  user_parms = self.snmpv3_pass.split(':', 1)
-                 commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -l authNoPriv -e '+self.snmpv3_engine+' '+toHost+':'+str(toPort)+' 0 clusterCheck fsId s '+self.get_fsid()+' statusDetail i '+str(self.ceph_health_mapping['HEALTH_OK'])+' statusMsg s "Ceph Manager SNMP Handler - Test Trap SNMP v3 authNoPriv"'
+                 commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -l authNoPriv -e '+self.snmpv3_engine+' '+toHost+':'+str(toPort)+' 0 '+SNMPTRAP_OIDS['clusterCheck']+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(self.ceph_health_mapping['HEALTH_OK'])+' '+SNMPTRAP_OIDS['statusMsg']+' s "Ceph Manager SNMP Handler - Test Trap SNMP v3 authNoPriv"'
               elif self.snmpv3_level == 'authPriv':
                  user_parms = self.snmpv3_pass.split(':', 1)
                  enc_parms = self.snmpv3_enc.split(':', 1)
-                 commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -x '+enc_parms[0]+' -X '+enc_parms[1]+' -l authPriv -e '+self.snmpv3_engine+' '+toHost+':'+str(toPort)+' 0 clusterCheck fsId s '+self.get_fsid()+' statusDetail i '+str(self.ceph_health_mapping['HEALTH_OK'])+' statusMsg s "Ceph Manager SNMP Handler - Test Trap SNMP v3 authPriv"'
+                 commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -x '+enc_parms[0]+' -X '+enc_parms[1]+' -l authPriv -e '+self.snmpv3_engine+' '+toHost+':'+str(toPort)+' 0 '+SNMPTRAP_OIDS['clusterCheck']+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(self.ceph_health_mapping['HEALTH_OK'])+' '+SNMPTRAP_OIDS['statusMsg']+' s "Ceph Manager SNMP Handler - Test Trap SNMP v3 authPriv"'
               else:
                  self.log.error("Invalid security level string: "+self.snmpv3_level)
+                 return self
            else:
               self.log.error("SNMP Version not supported --> "+str(self.snmp_version))
               return self
@@ -506,9 +1098,9 @@ class Module(MgrModule):
     def send_check_trap(self, statusDetail, statusMsg):
         if self.trap_using_tools == True:
            if self.snmp_version == '1':
-              commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' clusterCheck '+socket.gethostname()+' 6 0 0 fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+              commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' '+snmptrap_v1('clusterCheck', socket.gethostname())+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
            elif self.snmp_version == '2c':
-              commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' 0 clusterCheck fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+              commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+SNMPTRAP_OIDS['clusterCheck']+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
            else:
               self.log.error("SNMP Version not supported --> "+str(self.snmp_version))
               return self
@@ -528,39 +1120,61 @@ class Module(MgrModule):
     # - 1 : Send a clusterWarn trap
     # - 2 : Send a clusterError trap
     # - 3 : Send a clusterCheck trap
+    # unless trapName names another trap of the MIB
     #
-    def send_generic_trap(self, statusDetail, statusMsg):
+    def send_generic_trap(self, statusDetail, statusMsg, trapName=None):
+        if trapName is None:
+            trapName = self.ceph_trap_mapping[statusDetail]
+        try:
+            sequence = self.notifications.next_sequence()
+        except Exception as e:
+            # The trap goes out all the same, numbered without a reservation
+            self.log.error("Cannot reserve notification sequence numbers: {0}".format(e))
+            sequence = self.notifications.next_unreserved()
+        self.perf.inc('traps.' + trapName)
         self.log.debug("SNMP Version --> "+str(self.snmp_version))
         self.log.debug("statusDetail --> "+str(statusDetail))
         self.log.debug("statusMsg    --> "+str(statusMsg))
         if self.trap_using_tools == True:
            if self.snmp_version == '1':
-              commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' '+self.ceph_trap_mapping[statusDetail]+' '+socket.gethostname()+' 6 0 0 fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+              commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' '+snmptrap_v1(trapName, socket.gethostname())+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
            elif self.snmp_version == '2c':
-              commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+self.ceph_trap_mapping[statusDetail]+' fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+              commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -c '+self.snmp_community+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+SNMPTRAP_OIDS[trapName]+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
            elif self.snmp_version == '3':
               if self.snmpv3_level == 'noAuthNoPriv':
-                 commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -l noAuthNoPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+self.ceph_trap_mapping[statusDetail]+' fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+                 commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -l noAuthNoPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+SNMPTRAP_OIDS[trapName]+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
               elif self.snmpv3_level == 'authNoPriv':
                  user_parms = self.snmpv3_pass.split(':', 1)
-                 commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -l authNoPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+self.ceph_trap_mapping[statusDetail]+' fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+                 commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -l authNoPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+SNMPTRAP_OIDS[trapName]+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
               elif self.snmpv3_level == 'authPriv':
                  user_parms = self.snmpv3_pass.split(':', 1)
                  enc_parms = self.snmpv3_enc.split(':', 1)
-                 commandLine = 'snmptrap -m +SNMPHANDLER-MIB -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -x '+enc_parms[0]+' -X '+enc_parms[1]+' -l authPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+self.ceph_trap_mapping[statusDetail]+' fsId s '+self.get_fsid()+' statusDetail i '+str(statusDetail)+' statusMsg s "'+statusMsg+'"'
+                 commandLine = 'snmptrap -m "" -v '+str(self.snmp_version)+' -u '+self.snmpv3_user+' -a '+user_parms[0]+' -A '+user_parms[1]+' -x '+enc_parms[0]+' -X '+enc_parms[1]+' -l authPriv -e '+self.snmpv3_engine+' '+self.trap_addr+':'+str(self.trap_port)+' 0 '+SNMPTRAP_OIDS[trapName]+' '+SNMPTRAP_OIDS['fsId']+' s '+self.get_fsid()+' '+SNMPTRAP_OIDS['statusDetail']+' i '+str(statusDetail)+' '+SNMPTRAP_OIDS['statusMsg']+' s "'+statusMsg+'"'
               else:
                  self.log.error("Invalid security level string: "+self.snmpv3_level)
+                 return self
            else:
               self.log.error("SNMP Version not supported --> "+str(self.snmp_version))
               return self
 
+           commandLine += ' '+SNMPTRAP_OIDS['notificationSequence']+' c '+str(sequence)
            self.log.debug("--> "+commandLine)
+           start = perf_clock()
            (code, raw) = commands.getstatusoutput(commandLine)
+           self.perf.observe('trap.snmptrap', perf_clock() - start)
            if code != 0:
               self.log.error("--> "+commandLine)
               self.log.error("--> Failed to send trap. RC={0}".format(code))
         else:
-           self.log.error("We only support sending traps using local tools for now")
+           try:
+              self.get_notifier().send_trap(trapName, statusDetail, statusMsg, sequence)
+           except (ValueError, KeyError, socket.error) as e:
+              self.log.error("--> Failed to send trap {0}: {1}".format(trapName, e))
+
+        if self.handover is not None and 'first_notification' not in self.handover:
+           self.handover['first_notification'] = time.time()
+           self.log.info("First notification {0:.1f} ms after the standby stopped".format(
+               (self.handover['first_notification'] - self.handover['standby_stopped']) * 1000))
 
         return self
     #
@@ -572,6 +1186,9 @@ class Module(MgrModule):
 
         timeofday = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
         trapstring = timeofday+" Ceph Manager SNMP Handler - Lost connection to Monitors"
+        # The receiver is left at unknown, the first health map after the
+        # outage finds it changed and sends its status again
+        self.notifications.update('health', 'HEALTH_UNKNOWN')
         self.send_generic_trap(zeDetail, trapstring)
 
         return self
@@ -604,82 +1221,156 @@ class Module(MgrModule):
     # and to detect changes correctly
     #
     def process_health(self):
+        start = perf_clock()
         firstRun = False
         health = global_instance().get_sync_object(Health).data
         # Transform the `checks` dict into a list for the convenience
         # of rendering from javascript.
         checks = []
-        for k, v in health['checks'].iteritems():
+        for k, v in health['checks'].items():
             v['type'] = k
             checks.append(v)
 
-        checks = sorted(checks, cmp=lambda a, b: a['severity'] > b['severity'])
+        checks = sorted(checks, key=lambda c: c['severity'])
 
         health['checks'] = checks
         if self.clusterHealth == None:
             self.clusterHealth = health
             firstRun = True
 
+        #
+        # On the first run the status is compared to the last one sent, by
+        # us before a restart or by the previous active module
+        #
         if firstRun == True:
-            self.log.debug("Cluster status discovered {0}".format(health['status']))
-            self.send_health_trap(health['status'])
+            if self.notifications.update('health', health['status']):
+                self.log.debug("Cluster status discovered {0}".format(health['status']))
+                self.send_health_trap(health['status'])
+            else:
+                self.log.debug("Cluster status RESUMED {0}".format(health['status']))
         else:
             if health['status'] != self.clusterHealth['status']: 
                 self.log.debug("Cluster status CHANGED {0}/{1}".format(health['status'], self.clusterHealth['status']))
+                self.notifications.update('health', health['status'])
                 self.send_health_trap(health['status'])
                 self.clusterHealth = health
             else:
                 self.log.debug("Cluster status REMAINED {0}/{1}".format(health['status'], self.clusterHealth['status']))
                 self.clusterHealth = health
 
+        self.perf.observe('process.health', perf_clock() - start)
         return health
 
     def process_osdmap(self):
-        osd_map = global_instance().get_sync_object(OsdMap).data
-        self.log.debug(str(osd_map))
+        osd_map = global_instance().get_sync_object(OsdMap)
+        self.log.debug(str(osd_map.data))
         return osd_map
 
+    def process_osdstats(self):
+        return global_instance().get_sync_object(OsdStats)
+
     def process_monmap(self):
-        mon_map = global_instance().get_sync_object(MonMap).data
-        self.log.debug(str(mon_map))
+        mon_map = global_instance().get_sync_object(MonMap)
+        self.log.debug(str(mon_map.data))
         return mon_map
 
     def process_fsmap(self):
-        fs_map = global_instance().get_sync_object(FsMap).data
-        self.log.debug(str(fs_map))
+        fs_map = global_instance().get_sync_object(FsMap)
+        self.log.debug(str(fs_map.data))
         return fs_map
 
     def process_monstatus(self):
-        mon_status = global_instance().get_sync_object(MonStatus).data
-        self.log.debug(str(mon_status))
+        mon_status = global_instance().get_sync_object(MonStatus)
+        self.log.debug(str(mon_status.data))
         return mon_status
 
     def process_svcmap(self):
-        svc_map = global_instance().get_sync_object(ServiceMap).data
-        self.log.debug(str(svc_map))
+        svc_map = global_instance().get_sync_object(ServiceMap)
+        self.log.debug(str(svc_map.data))
         return svc_map
+    #
+    # Publish a new snapshot generation with the given views replaced and
+    # hand it to the agent, which gets its store rebuilt along the way. The
+    # agent gets it under the lock of the snapshots, as publish runs in the
+    # notify thread, the serve loop and the tasks, and an older generation
+    # handed on last would replace a newer one
+    #
+    def publish(self, **views):
+        agent = self.agent
+        derive = None
+        if agent is not None:
+            derive = self.derive_agent_store
+            if views and set(views) <= set(['osd_stats', 'pool_stats', 'osd_perf', 'pg_counters']):
+                derive = self.refresh_agent_store
+        snapshot = self.snapshots.update(derive=derive,
+                                         publish=agent.publish if agent is not None else None,
+                                         **views)
+        if agent is not None:
+            agent.flush()
+        return snapshot
+
+    def derive_agent_store(self, snapshot, previous):
+        return {'store': build_store(self.get_fsid(), snapshot, previous=previous.store)}
+
+    #
+    # Only the stats or perf counters changed, the new store shares the encoded
+    # maps of the previous one and recomputes its lazy columns when polled
+    #
+    def refresh_agent_store(self, snapshot, previous):
+        if previous.store is None:
+            return self.derive_agent_store(snapshot, previous)
+        return {'store': previous.store.with_source(snapshot)}
+    #
+    # Fetch the views the snapshot does not hold yet, used when the agent
+    # starts before every map has been notified
+    #
+    def load_snapshot(self):
+        current = self.snapshots.current()
+        views = {}
+        if current.health is None:
+            views['health'] = self.get_sync_object(Health)
+        if current.mon_map is None:
+            views['mon_map'] = self.process_monmap()
+        if current.mon_status is None:
+            views['mon_status'] = self.process_monstatus()
+        if current.osd_map is None:
+            views['osd_map'] = self.process_osdmap()
+        if current.osd_stats is None:
+            views['osd_stats'] = Deferred(self.process_osdstats)
+        if current.pool_stats is None:
+            views['pool_stats'] = self.update_pool_stats()
+        if current.pg_counters is None:
+            views['pg_counters'] = self.update_pg_counters()
+        return self.publish(**views)
 
     def notify(self, notify_type, notify_val):
+        start = perf_clock()
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.notify(notify_type, notify_val)
         if notify_type == "pg_summary":
             #self.log.debug('Received notification : PG_SUMMARY')
-            #self.update_pool_stats()
-            pass
+            self.pg_summaries['received'] += 1
+            if self.pg_summary_since is None:
+                self.pg_summary_since = start
+            self.pg_summary_pending.set()
         elif notify_type == "osd_map":
-            ze_osdmap = self.process_osdmap()
+            self.publish(osd_map=self.process_osdmap())
         elif notify_type == "mon_map":
-            ze_monmap = self.process_monmap()
+            self.publish(mon_map=self.process_monmap())
         elif notify_type == "fs_map":
-            ze_fsmap = self.process_fsmap()
+            self.publish(fs_map=self.process_fsmap())
         elif notify_type == "mon_status":
-            ze_monstatus = self.process_monstatus()
+            self.publish(mon_status=self.process_monstatus())
         elif notify_type == "health":
-            ze_health = self.process_health()
+            self.publish(health=Health(self.process_health()))
         elif notify_type == "command":
             pass
         elif notify_type == "service_map":
-            ze_svcmap = self.process_svcmap()
+            self.publish(service_map=self.process_svcmap())
         else:
             pass
+        self.perf.observe('notify.' + notify_type, perf_clock() - start)
 
      
     def handle_trap_send(self, address):
@@ -705,13 +1396,114 @@ class Module(MgrModule):
 
     def handle_listener_on(self, address):
         self.log.info('Listener='+str(address['ip']))
+        parms = address['ip'].split(':', 1)
+        listen_addr = parms[0]
+        listen_port = parms[1] if len(parms) > 1 else '161'
+        if self.agent is not None:
+            self.agent.stop()
+        try:
+            usm_config = self.usm_config()
+            usm = Usm.from_config(json.loads(usm_config), self.localized_users())
+        except (ValueError, KeyError) as e:
+            self.log.error("SNMP agent will not answer SNMP v3 requests: {0}".format(e))
+            usm_config = usm = None
+        if usm is not None:
+            self.usm = usm
+            if self.notifier is not None and self.notifier.usm is not None:
+                self.notifier.usm = usm
+        if self.agent_workers > 0:
+            snapshot = self.agent_snapshot or \
+                '/var/run/ceph/snmphandler-{0}.snapshot'.format(self.get_fsid())
+            self.agent = WorkerPool(self.log, self.snmp_community, self.agent_workers,
+                                    snapshot, self.agent_python or default_python(),
+                                    self.agent_cache_size, usm_config)
+        else:
+            self.agent = SnmpAgent(self.log, self.snmp_community, self.agent_cache_size, usm)
+        try:
+            self.agent.start(listen_addr, listen_port)
+        except (socket.error, OSError) as e:
+            self.agent = None
+            return -errno.EADDRNOTAVAIL, "", "Cannot listen on " + str(address['ip']) + ": " + str(e) + "\n"
+        self.load_snapshot()
 
-        return 0, "", "Completed listener on command at " + str(address) + ".\n"
+        return 0, "", "Completed listener on command at " + str(listen_addr) + ":" + str(listen_port) + ".\n"
+
+    #
+    # SNMP v3 engine and user of the agent from the snmpv3_* options, the
+    # engine boots counter is kept in the KV store and bumped on every start
+    #
+    def usm_config(self):
+        boots = int(self.get_store('snmpv3_engine_boots') or 0) + 1
+        self.set_store('snmpv3_engine_boots', str(boots))
+        return Usm.config(self.snmpv3_engine, boots, time.time(), usm_users(self))
 
     def handle_listener_off(self):
+        if self.agent is not None:
+            self.agent.stop()
+            self.agent = None
 
         return 0, "", "Completed listener off command.\n"
 
+    def handle_listener_status(self):
+        agent = self.agent
+        if agent is None:
+            status = {'listening': False}
+        else:
+            status = agent.stats()
+            status['listening'] = True
+
+        return 0, json.dumps(status, indent=2), ""
+
+    #
+    # The perf counters along with the statistics the other parts of the
+    # module keep on their own
+    #
+    def handle_perf(self):
+        report = self.perf.dump()
+        report['pg_summaries'] = dict(self.pg_summaries)
+        report['notifications'] = self.notifications.stats()
+        report['handover'] = self.handover
+        for name, part in (('scheduler', self.scheduler), ('mon_watchdog', self.mon_watchdog),
+                           ('notifier', self.notifier), ('heartbeat', self.heartbeat)):
+            report[name] = part.stats() if part is not None else None
+
+        return 0, json.dumps(report, indent=2, sort_keys=True), ""
+
+    def handle_profile(self, cmd):
+        profiler = self.profiler
+        if cmd['action'] == 'start':
+            if not profiler.start():
+                return -errno.EBUSY, "", "The profiler is already running.\n"
+            return 0, "", "Profiler started, sampling every {0} seconds.\n".format(profiler.interval)
+        if cmd['action'] == 'stop':
+            if not profiler.stop():
+                return -errno.EINVAL, "", "The profiler is not running.\n"
+        stats = profiler.stats()
+        status = "{0} samples in {1:.1f} seconds, {2} stacks, {3} dropped, {4:.3f} seconds sampling.\n".format(
+            stats['samples'], stats['elapsed'], stats['stacks'], stats['dropped'], stats['sample_time'])
+        if cmd['action'] == 'dump':
+            return 0, profiler.dump(), status
+        return 0, "", "Profiler stopped, " + status
+
+    def handle_record(self, cmd):
+        recorder = self.recorder
+        if cmd['action'] == 'start':
+            if recorder is not None:
+                return -errno.EBUSY, "", "Already recording to " + recorder.path + ".\n"
+            path = cmd.get('path') or '/var/log/ceph/snmphandler-{0}-{1}.capture.gz'.format(
+                self.get_fsid(), time.strftime('%Y%m%d-%H%M%S'))
+            try:
+                self.recorder = Recorder(path, self.get_fsid())
+            except (IOError, OSError) as e:
+                return -errno.EIO, "", "Cannot record to " + path + ": " + str(e) + "\n"
+            return 0, "", "Recording to " + path + ".\n"
+        if recorder is None:
+            return 0, json.dumps({'recording': False}), ""
+        if cmd['action'] == 'stop':
+            self.recorder = None
+            recorder.close()
+        return 0, json.dumps(recorder.stats(), indent=2), ""
+
     def handle_command(self, cmd):
         self.log.debug("Handling command: '%s'" % str(cmd))
 
@@ -725,6 +1517,14 @@ class Module(MgrModule):
             return self.handle_listener_on(cmd)
         elif cmd['prefix'] == "snmp listener_off":
             return self.handle_listener_off()
+        elif cmd['prefix'] == "snmp listener_status":
+            return self.handle_listener_status()
+        elif cmd['prefix'] == "snmp perf":
+            return self.handle_perf()
+        elif cmd['prefix'] == "snmp profile":
+            return self.handle_profile(cmd)
+        elif cmd['prefix'] == "snmp record":
+            return self.handle_record(cmd)
         else:
             return (-errno.EINVAL, '',
                     "Command not found '{0}'".format(cmd['prefix']))
@@ -741,6 +1541,16 @@ class Module(MgrModule):
             trapstring = timeofday+" Ceph Manager SNMP Handler - Active Stopping"
             self.send_generic_trap(self.ceph_health_mapping['HEALTH_UNKNOWN'], trapstring)
 
+        if self.agent is not None:
+            self.agent.stop()
+        if self.mon_watchdog is not None:
+            self.mon_watchdog.stop()
+        self.profiler.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.notifier is not None:
+            self.notifier.close()
+        self.notifications.flush(force=True)
         self.run = False
         self.event.set()
 
@@ -772,6 +1582,44 @@ class Module(MgrModule):
         self.snmpv3_enc = self.get_localized_config('snmpv3_enc', 'AES:cephpassword')
         self.snmpv3_level = self.get_localized_config('snmpv3_level', 'noAuthNoPriv')
         #
+        # SNMP agent Parameters
+        #
+        self.agent_workers = int(self.get_localized_config('agent_workers', '0'))
+        self.agent_snapshot = self.get_localized_config('agent_snapshot', '')
+        self.agent_python = self.get_localized_config('agent_python', '')
+        self.agent_cache_size = int(self.get_localized_config('agent_cache_size', '1024'))
+        #
+        # Pool full forecast Parameters
+        #
+        self.pool_full_horizon = float(self.get_localized_config('pool_full_horizon', '48'))
+        #
+        # OSD utilization outliers Parameters
+        #
+        self.osd_outlier_zscore = float(self.get_localized_config('osd_outlier_zscore', '3'))
+        self.osd_outlier_deviation = float(self.get_localized_config('osd_outlier_deviation', '20'))
+        self.osd_outlier_count = int(self.get_localized_config('osd_outlier_count', '5'))
+        self.osd_latency_threshold = float(self.get_localized_config('osd_latency_threshold', '0'))
+        #
+        # PG summary Parameters
+        #
+        self.pg_summary_interval = float(self.get_localized_config('pg_summary_interval', '1'))
+        self.pg_degraded_threshold = int(self.get_localized_config('pg_degraded_threshold', '0'))
+        self.pg_degraded_duration = float(self.get_localized_config('pg_degraded_duration', '300'))
+        if self.pg_degraded_threshold > 0:
+            self.pg_degraded = Sustained(self.pg_degraded_threshold, self.pg_degraded_duration)
+        #
+        # Serve loop task Parameters
+        #
+        self.stats_interval = float(self.get_localized_config('stats_interval', '30'))
+        self.inventory_interval = float(self.get_localized_config('inventory_interval', '300'))
+        self.mon_check_interval = float(self.get_localized_config('mon_check_interval', '0.5'))
+        self.mon_check_degraded_interval = float(self.get_localized_config('mon_check_degraded_interval', '0.1'))
+        self.heartbeat_interval = float(self.get_localized_config('heartbeat_interval', '0'))
+        if self.osd_outlier_zscore > 0 or self.osd_outlier_deviation > 0:
+            self.osd_outliers = OutlierDetector(self.osd_outlier_zscore,
+                                                self.osd_outlier_deviation,
+                                                self.osd_outlier_count)
+        #
         self.log.error("Active loaded parameters  Destination = {0}".format(self.trap_addr))
         self.log.error("                          Port        = {0}".format(self.trap_port))
         self.log.error("                          OID         = {0}".format(self.trap_oid))
@@ -784,37 +1632,32 @@ class Module(MgrModule):
         self.log.error("                          Enc         = {0}".format(self.snmpv3_enc))
         self.log.error("                          Security    = {0}".format(self.snmpv3_level))
         self.log.error("                          Use Tools   = {0}".format(self.trap_using_tools))
+        self.log.error("                          Heartbeat   = {0}".format(self.heartbeat_interval))
 
         if self.trap_on_start == True:
             timeofday = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
             trapstring = timeofday+" Ceph Manager SNMP Handler - Active Starting"
             self.send_generic_trap(self.ceph_health_mapping['HEALTH_UNKNOWN'], trapstring)
 
-        while self.run:
-            if (self.have_mon_connection()):
-                self.mon_connection = True
-                servers = self.list_servers()
-                for server in servers:
-                    self.get_server(server['hostname'])
-                    self.log.error(str(server['hostname']))
-            else:
-                #
-                # To make sure we recheck the status of the cluster when
-                # the conmnection to the Monitors is restored to make sure
-                # we issue a new trap on the next map update.
-                #
-                self.clusterHealth = None
-                # 
-                # And remember we lost the connection for future enhancements
-                #
-                self.mon_connection = False
-                self.send_unknown_trap()
-            self.log.info('Ceph Mon Connection is %d', self.mon_connection)
-            timeofday = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
-            trapstring = timeofday+" Ceph Manager SNMP Handler - Wake up time"
-            self.log.debug('Sleeping for %d', self.sleep_interval)
-            self.event.wait(self.sleep_interval)
-            self.log.debug("Sending trap to '%s'" % self.trap_addr+':'+self.trap_port)
-            #self.send_generic_trap(self.ceph_health_mapping['HEALTH_UNKNOWN'], trapstring)
+        self.pools_filling = set(self.notifications.get('pools_filling', []))
+        self.osds_slow = set(self.notifications.get('osds_slow', []))
+
+        self.pg_summary_thread = Thread(target=self.pg_summary_loop, name='snmp-pg-summary')
+        self.pg_summary_thread.daemon = True
+        self.pg_summary_thread.start()
+
+        self.mon_watchdog = MonWatchdog(self.log, self.check_mon_connection,
+                                        self.mon_connection_lost,
+                                        self.mon_connection_restored,
+                                        self.mon_check_interval,
+                                        self.mon_check_degraded_interval)
+        self.mon_watchdog.start()
+
+        if self.heartbeat_interval > 0:
+            try:
+                self.heartbeat = self.build_heartbeat()
+            except (ValueError, KeyError, socket.error) as e:
+                self.log.error("Cannot send heartbeats: {0}".format(e))
 
-            self.event.clear()            
+        self.scheduler = self.build_scheduler()
+        self.scheduler.run(self.event, lambda: self.run)
@@ -0,0 +1,189 @@
+"""
+SNMP notifications encoded by hand and sent straight to the trap receiver.
+
+A Notifier is set up once for a destination and the SNMP parameters: the
+destination is resolved and its socket opened, the version, community, OIDs
+and fsId varbind are encoded, and the SNMP v3 keys are localized by the Usm.
+Sending a notification then only encodes its own values and the length
+headers around them and does one sendto(), no snmptrap command is run and no
+MIB is loaded. This is what lets a standby module hand a ready Notifier over
+to the active one.
+"""
+import socket
+import time
+
+import ber
+from ber import SEQUENCE, INTEGER, OCTET_STRING, OBJECT_IDENTIFIER, IP_ADDRESS, \
+    COUNTER32, TIMETICKS, TRAP_V1, TRAP_V2
+from perf import clock
+from mibtables import FS_ID, STATUS_DETAIL, STATUS_MSG, NOTIFICATION_SEQUENCE, CLUSTER_TRAPS
+
+SYS_UP_TIME = (1, 3, 6, 1, 2, 1, 1, 3, 0)
+SNMP_TRAP_OID = (1, 3, 6, 1, 6, 3, 1, 1, 4, 1, 0)
+
+#
+# The notifications of SNMPHANDLER-MIB under clusterTraps
+#
+CLUSTER_TRAP_IDS = {
+    'clusterOk': 1,
+    'clusterWarn': 2,
+    'clusterError': 3,
+    'clusterCheck': 4,
+    'poolFullForecast': 5,
+    'osdUtilizationOutliers': 6,
+    'osdLatencyHigh': 7,
+    'pgDegradedPersist': 8,
+    'hostInventoryChanged': 9,
+    'clusterHeartbeat': 10,
+}
+
+SNMP_VERSIONS = {'1': 0, '2c': 1, '3': 3}
+ENTERPRISE_SPECIFIC = 6
+UINT32_MASK = 0xffffffff
+INT32_MASK = 0x7fffffff
+
+
+def v1_trap(notification):
+    """
+    The enterprise and specific trap of the SNMPv1 trap for the notification
+    OID, mapped as in RFC 2576 section 3.2 (and RFC 3584 since)
+    """
+    if notification[-2] == 0:
+        return notification[:-2], notification[-1]
+    return notification[:-1], notification[-1]
+
+
+class Notifier(object):
+    """
+    Notifications of SNMPHANDLER-MIB to (addr, port).
+
+    SNMP v3 notifications are secured for user with usm, the engine of the
+    module, which is the authoritative engine of the notifications it sends.
+    It can be set after the Notifier is built, as it changes on every start
+    of the agent.
+    """
+
+    def __init__(self, addr, port, version, community, fsid, start=None,
+                 agent_addr='0.0.0.0', usm=None, user=None, level=0):
+        if version not in SNMP_VERSIONS:
+            raise ValueError("SNMP Version not supported --> {0}".format(version))
+        family, _, _, _, self.dest = socket.getaddrinfo(addr, int(port), 0, socket.SOCK_DGRAM)[0]
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.version = version
+        self.usm = usm
+        if user is not None and not isinstance(user, bytes):
+            user = user.encode('utf-8')
+        self.user = user or b''
+        self.level = level
+        self.start = start if start is not None else time.time()
+        self.request_id = 0
+        self.sent = 0
+        self.errors = 0
+        self.last_duration = 0.0
+        # PerfCounters timing the encoding and sending, if any
+        self.perf = None
+
+        # The constant parts of every message
+        self._head = ber.encode_integer(SNMP_VERSIONS[version]) + ber.encode_octets(community)
+        self._fsid = ber.encode_varbind(FS_ID, OCTET_STRING, fsid)
+        self._sys_up_time = ber.encode_oid(SYS_UP_TIME)
+        self._status_detail = ber.encode_oid(STATUS_DETAIL)
+        self._status_msg = ber.encode_oid(STATUS_MSG)
+        self._notification_sequence = ber.encode_oid(NOTIFICATION_SEQUENCE)
+        self._agent_addr = ber.tlv(IP_ADDRESS, socket.inet_aton(agent_addr))
+        # snmpTrapOID varbind of SNMPv2, or enterprise, agent address,
+        # generic and specific trap of SNMPv1
+        self._trap_heads = {}
+        for name, trap in CLUSTER_TRAP_IDS.items():
+            if version == '1':
+                enterprise, specific = v1_trap(CLUSTER_TRAPS + (trap,))
+                self._trap_heads[name] = ber.encode_oid(enterprise) + self._agent_addr + \
+                    ber.encode_integer(ENTERPRISE_SPECIFIC) + ber.encode_integer(specific)
+            else:
+                self._trap_heads[name] = ber.encode_varbind(
+                    SNMP_TRAP_OID, OBJECT_IDENTIFIER, CLUSTER_TRAPS + (trap,))
+
+    def uptime(self, now):
+        """
+        Hundredths of seconds since start, as TimeTicks
+        """
+        return int((now - self.start) * 100) & UINT32_MASK
+
+    def varbind(self, oid, value):
+        """
+        A varbind of an OID encoded with ber.encode_oid
+        """
+        return ber.tlv(SEQUENCE, oid + value)
+
+    def encode(self, trap, varbinds, now=None):
+        """
+        The message of the trap notification named trap, with the fsId
+        varbind followed by the encoded varbinds
+        """
+        self.request_id = (self.request_id + 1) & INT32_MASK
+        ticks = ber.encode_unsigned(self.uptime(now if now is not None else time.time()), TIMETICKS)
+        varbinds = [self._fsid] + varbinds
+        if self.version == '1':
+            body = b''.join(varbinds)
+            body = self._trap_heads[trap] + ticks + ber.header(SEQUENCE, len(body)) + body
+            pdu = ber.header(TRAP_V1, len(body)) + body
+            return ber.header(SEQUENCE, len(self._head) + len(pdu)) + self._head + pdu
+
+        varbinds[0:0] = [self.varbind(self._sys_up_time, ticks), self._trap_heads[trap]]
+        tail = ber.encode_pdu_tail(0, 0, varbinds)
+        if self.version == '3':
+            if self.usm is None:
+                raise ValueError("SNMP v3 notifications need the engine of the module")
+            return self.usm.encode(self.request_id, self.level, self.user, b'', TRAP_V2,
+                                   self.request_id, tail)
+        body = ber.encode_integer(self.request_id) + tail
+        pdu = ber.header(TRAP_V2, len(body)) + body
+        return ber.header(SEQUENCE, len(self._head) + len(pdu)) + self._head + pdu
+
+    def send(self, trap, varbinds):
+        start = clock()
+        try:
+            message = self.encode(trap, varbinds)
+            encoded = clock()
+            self.sock.sendto(message, self.dest)
+        except (socket.error, OSError, ValueError):
+            self.errors += 1
+            raise
+        finally:
+            self.last_duration = clock() - start
+        if self.perf is not None:
+            self.perf.observe('trap.encode', encoded - start)
+            self.perf.observe('trap.send', start + self.last_duration - encoded)
+        self.sent += 1
+        return self.request_id
+
+    def trap_varbinds(self, status_detail, status_msg, sequence=None):
+        """
+        The statusDetail and statusMsg varbinds, and the notificationSequence
+        one when given
+        """
+        varbinds = [
+            self.varbind(self._status_detail, ber.encode_integer(status_detail, INTEGER)),
+            self.varbind(self._status_msg, ber.encode_octets(status_msg, OCTET_STRING)),
+        ]
+        if sequence is not None:
+            varbinds.append(self.varbind(self._notification_sequence,
+                                         ber.encode_unsigned(sequence, COUNTER32)))
+        return varbinds
+
+    def send_trap(self, trap, status_detail, status_msg, sequence=None):
+        """
+        Send one of the traps with fsId, statusDetail and statusMsg, and the
+        notificationSequence when given
+        """
+        return self.send(trap, self.trap_varbinds(status_detail, status_msg, sequence))
+
+    def close(self):
+        self.sock.close()
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'errors': self.errors,
+            'last_duration': self.last_duration,
+        }
@@ -0,0 +1,185 @@
+"""
+Last emitted state of the notifications, kept in the mgr KV store.
+
+Every notification key (the cluster health, the pools projected full, ...)
+keeps the value its last trap reported, and every trap the module sends gets
+the next number of a single sequence. A new active module, after a restart
+or a failover, reads them once and only sends the traps whose value changed
+since, numbered after the last one its predecessor sent.
+
+Writes are batched: changes only mark the state dirty and flush() saves it
+once it has been dirty for delay seconds, or right away on shutdown, so a
+burst of traps costs a single write of a few hundred bytes. The sequence
+numbers cannot wait for that write: they are handed out of blocks of reserve
+numbers, the end of each block being saved before its first number is handed
+out. A module which stops without saving its last numbers leaves the block
+end in the store, and its successor starts after it.
+"""
+import json
+import threading
+import time
+
+STORE_KEY = 'notification_state'
+UINT32_MASK = 0xffffffff
+RESERVE = 100
+
+
+def parse(data):
+    """
+    The values and the sequence number to go on from of saved data
+    """
+    if data:
+        try:
+            saved = json.loads(data)
+            values = dict(saved.get('values') or {})
+            sequence = int(saved.get('reserved', saved.get('sequence')) or 0)
+            return values, sequence
+        except (ValueError, TypeError, AttributeError):
+            pass
+    return {}, 0
+
+
+def later(a, b):
+    """
+    The later of two sequence numbers, which wrap around at 2^32
+    """
+    return b if 0 < ((b - a) & UINT32_MASK) < 0x80000000 else a
+
+
+class NotificationState(object):
+    def __init__(self, load, save, delay=1.0, clock=time.time, reserve=RESERVE):
+        # load() returns what save(data) was given last, or None
+        self._load = load
+        self._save = save
+        self.delay = delay
+        self.clock = clock
+        self.reserve = reserve
+        self.lock = threading.Lock()
+        # Held across every save, so they reach the store in order
+        self.save_lock = threading.Lock()
+        self.values = None
+        self.sequence = 0
+        # The end of the block of sequence numbers saved last, and how many
+        # of them can still be handed out
+        self.reserved = 0
+        self.remaining = 0
+        self.dirty_since = None
+        self.changes = 0
+        self.writes = 0
+
+    def restore(self, data):
+        """
+        Set the state from saved data, if it was not loaded yet
+        """
+        values, sequence = parse(data)
+        with self.lock:
+            if self.values is None:
+                self.values = values
+                self.sequence = self.reserved = sequence
+
+    def _loaded(self):
+        if self.values is None:
+            self.restore(self._load())
+        return self.values
+
+    def _dirty(self):
+        self.changes += 1
+        if self.dirty_since is None:
+            self.dirty_since = self.clock()
+
+    def get(self, key, default=None):
+        return self._loaded().get(key, default)
+
+    def update(self, key, value):
+        """
+        Record the value last emitted for key, True when it changed
+        """
+        values = self._loaded()
+        with self.lock:
+            if values.get(key) == value:
+                return False
+            values[key] = value
+            self._dirty()
+        return True
+
+    def next_sequence(self):
+        """
+        The next sequence number, saving the end of a new block first when
+        the current one is used up
+        """
+        self._loaded()
+        while True:
+            with self.lock:
+                if self.remaining > 0:
+                    self.remaining -= 1
+                    self.sequence = (self.sequence + 1) & UINT32_MASK
+                    self._dirty()
+                    return self.sequence
+            self._write(reserve=True)
+
+    def next_unreserved(self):
+        """
+        The next sequence number without a block saved for it, for when the
+        store cannot be written: it may be handed out again after a crash
+        """
+        self._loaded()
+        with self.lock:
+            self.sequence = (self.sequence + 1) & UINT32_MASK
+            if self.remaining > 0:
+                self.remaining -= 1
+            self._dirty()
+            return self.sequence
+
+    def _dump(self):
+        return json.dumps({'sequence': self.sequence, 'reserved': self.reserved,
+                           'values': self.values}, sort_keys=True, separators=(',', ':'))
+
+    def _write(self, reserve=False, release=False):
+        """
+        Save the state. With reserve, a new block of sequence numbers ending
+        after whatever the store holds, in case it was restored from an older
+        copy; with release, the end of the current block is given back.
+        Nothing changes when save raises but that the state stays dirty.
+        """
+        with self.save_lock:
+            with self.lock:
+                if reserve:
+                    if self.remaining > 0:
+                        return
+                    self.sequence = later(self.sequence, parse(self._load())[1])
+                    self.reserved = (self.sequence + self.reserve) & UINT32_MASK
+                elif release:
+                    self.reserved = self.sequence
+                    self.remaining = 0
+                data = self._dump()
+                changes = self.changes
+            self._save(data)
+            with self.lock:
+                self.writes += 1
+                if reserve:
+                    self.remaining = self.reserve
+                if self.changes == changes:
+                    self.dirty_since = None
+
+    def flush(self, force=False):
+        """
+        Save the state if it changed delay seconds ago, or at all when forced
+        on shutdown, which also gives back the sequence numbers reserved and
+        not handed out
+        """
+        with self.lock:
+            if self.values is None or self.dirty_since is None:
+                return False
+            if not force and self.clock() - self.dirty_since < self.delay:
+                return False
+        self._write(release=force)
+        return True
+
+    def stats(self):
+        return {
+            'sequence': self.sequence,
+            'reserved': self.reserved,
+            'keys': len(self.values or {}),
+            'dirty': self.dirty_since is not None,
+            'writes': self.writes,
+        }
@@ -0,0 +1,492 @@
+"""
+Sorted OID index backing the SNMP agent tables.
+
+Every object instance is stored under a packed key where each sub-identifier
+is a big-endian 32 bit word. Comparing two packed keys as byte strings gives
+the same ordering as comparing the OIDs themselves, so the whole MIB view is
+a sorted list of keys searched with bisect. GETNEXT is a single bisection and
+GETBULK or a table walk is a contiguous slice of the arrays.
+
+Once built, a store is encoded: every varbind is BER encoded once and laid out
+in OID order in a single buffer, so the varbinds of a table walk are a single
+memoryview slice of that buffer.
+
+Columns which are expensive to compute can be declared lazy: they hold LAZY
+placeholders, take no room in that buffer and are computed from the store
+source, then encoded, block by block the first time a request reaches them.
+A store belongs to one snapshot generation, so is what it computes.
+
+An encoded store can also be dumped to a file and served from a memory map by
+another process (see MappedStore and agentworker.py).
+"""
+import array
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from ber import encode_varbind
+
+
+def pack_oid(oid):
+    return struct.pack('>%dI' % len(oid), *oid)
+
+
+def unpack_oid(key):
+    return struct.unpack('>%dI' % (len(key) // 4), key)
+
+
+#
+# Snapshot file layout, in native byte order as it never leaves the host:
+#   header      magic, generation, object count, size of the key area
+#   key offsets (count + 1) x uint32
+#   syntaxes    count x uint8
+#   keys        packed OIDs back to back
+#   offsets     (count + 1) x uint32 into the varbind area
+#   varbinds    the encoded varbinds back to back
+#
+SNAPSHOT_MAGIC = b'SNMPHDL1'
+SNAPSHOT_HEADER = struct.Struct('=8sQII')
+
+#
+# Raw value of the objects of a lazy column until it is computed
+#
+LAZY = object()
+
+#
+# Number of objects of a lazy column computed and encoded together
+#
+LAZY_BLOCK = 512
+
+
+def _array_bytes(a):
+    if hasattr(a, 'tobytes'):
+        return a.tobytes()
+    return a.tostring()
+
+
+def _array_from(data):
+    a = array.array('I')
+    if hasattr(a, 'frombytes'):
+        a.frombytes(data)
+    else:
+        a.fromstring(data)
+    return a
+
+
+class OidStore(object):
+    """
+    An immutable, sorted view of (OID, value) pairs.
+
+    Values are opaque to the store. The agent uses (syntax, raw value)
+    tuples as produced by the builders in mibtables, with LAZY as the raw
+    value of the objects of lazy columns.
+    """
+
+    def __init__(self, items=()):
+        by_key = {}
+        for oid, value in items:
+            oid = tuple(oid)
+            by_key[pack_oid(oid)] = (oid, value)
+
+        self._keys = sorted(by_key)
+        self._oids = [by_key[k][0] for k in self._keys]
+        self._values = [by_key[k][1] for k in self._keys]
+        self._init_lazy(())
+
+    def _init_lazy(self, columns, source=None):
+        """
+        columns are (start, end, compute) ranges of positions whose values
+        are compute(source), a list of raw values for the whole range
+        """
+        self._blob = None
+        self._offsets = None
+        self._lazy_columns = list(columns)
+        self._lazy = []
+        for column, (start, end, compute) in enumerate(self._lazy_columns):
+            for block in range(start, end, LAZY_BLOCK):
+                self._lazy.append((block, min(end, block + LAZY_BLOCK), column))
+        self._lazy_starts = [block[0] for block in self._lazy]
+        self._source = source
+        self._computed = {}
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_sorted(cls, oids, values, keys=None, lazy=()):
+        """
+        Build a store from unique OIDs already in lexicographic order,
+        skipping the sort. Used by the table builders which emit column after
+        column and may pass the packed keys and lazy columns along.
+        """
+        store = cls.__new__(cls)
+        store._oids = [tuple(o) for o in oids]
+        if keys is None:
+            keys = [pack_oid(o) for o in store._oids]
+        store._keys = list(keys)
+        store._values = list(values)
+        store._init_lazy(lazy)
+        return store
+
+    @classmethod
+    def join(cls, stores):
+        """
+        Concatenate stores holding consecutive, non overlapping OID ranges
+        """
+        oids, keys, values, lazy = [], [], [], []
+        for store in stores:
+            base = len(oids)
+            lazy += [(start + base, end + base, compute)
+                     for start, end, compute in store._lazy_columns]
+            oids += store._oids
+            keys += store._keys
+            values += store._values
+        return cls.from_sorted(oids, values, keys, lazy)
+
+    def with_source(self, source):
+        """
+        A store sharing everything with this one but computing its lazy
+        columns afresh from source
+        """
+        store = self.__class__.__new__(self.__class__)
+        store._oids = self._oids
+        store._keys = self._keys
+        store._values = self._values
+        store._init_lazy(self._lazy_columns, source)
+        store._blob = self._blob
+        store._offsets = self._offsets
+        return store
+
+    def share_computed(self, previous):
+        """
+        Take over the lazy columns previous already computed from the same
+        view of its source, previous being a store this one was made from
+        with with_source. A compute function names the view of the source it
+        reads in its view attribute, one without it is computed every time.
+        """
+        if previous is None or previous._lazy_columns != self._lazy_columns:
+            return
+        with self._lock:
+            shared = set()
+            for column, (start, end, compute) in enumerate(self._lazy_columns):
+                view = getattr(compute, 'view', None)
+                if view is not None and column not in self._computed and \
+                        column in previous._computed and \
+                        getattr(self._source, view, None) is getattr(previous._source, view, None):
+                    self._computed[column] = previous._computed[column]
+                    shared.add(column)
+            for k, (start, end, column) in enumerate(self._lazy):
+                if column in shared and k in previous._blocks:
+                    self._blocks[k] = previous._blocks[k]
+
+    def encode(self, previous=None):
+        """
+        Encode every varbind into one contiguous buffer.
+
+        Varbinds already encoded by the previous store with the same value
+        are copied over instead of being encoded again, so a new map epoch
+        only pays for the rows that changed. Returns how many varbinds had
+        to be encoded.
+        """
+        if previous is None or previous._blob is None:
+            previous = OidStore()
+            previous._blob = b''
+            previous._offsets = array.array('I', [0])
+        pkeys = previous._keys
+        pvalues = previous._values
+        poffsets = previous._offsets
+        pview = memoryview(previous._blob)
+
+        blob = bytearray()
+        offsets = array.array('I', [0])
+        encoded = 0
+        j = 0
+        for i, key in enumerate(self._keys):
+            value = self._values[i]
+            if value[1] is LAZY:
+                offsets.append(len(blob))
+                continue
+            while j < len(pkeys) and pkeys[j] < key:
+                j += 1
+            if j < len(pkeys) and pkeys[j] == key and pvalues[j] == value:
+                blob += pview[poffsets[j]:poffsets[j + 1]]
+            else:
+                blob += encode_varbind(self._oids[i], *value)
+                encoded += 1
+            offsets.append(len(blob))
+
+        self._blob = bytes(blob)
+        self._offsets = offsets
+        return encoded
+
+    def _block(self, k):
+        """
+        The encoded varbinds of lazy block k and their offsets, computing
+        them on first use
+        """
+        block = self._blocks.get(k)
+        if block is not None:
+            return block
+        with self._lock:
+            block = self._blocks.get(k)
+            if block is None:
+                start, end, column = self._lazy[k]
+                first, last, compute = self._lazy_columns[column]
+                raw = self._computed.get(column)
+                if raw is None:
+                    raw = self._computed[column] = compute(self._source)
+                blob = bytearray()
+                offsets = array.array('I', [0])
+                for i in range(start, end):
+                    blob += encode_varbind(self._oids[i], self._values[i][0], raw[i - first])
+                    offsets.append(len(blob))
+                block = self._blocks[k] = (bytes(blob), offsets)
+        return block
+
+    def _pieces(self, i, j):
+        """
+        Split positions [i, j) in runs of eager and lazy objects, yields
+        (start, end, blob, offsets, base) where the varbinds of position p
+        are blob[offsets[p - base]:offsets[p - base + 1]]
+        """
+        k = max(0, bisect.bisect_right(self._lazy_starts, i) - 1)
+        while k < len(self._lazy) and self._lazy[k][0] < j:
+            start, end, column = self._lazy[k]
+            if end > i:
+                if i < start:
+                    yield i, start, self._blob, self._offsets, 0
+                    i = start
+                blob, offsets = self._block(k)
+                yield i, min(end, j), blob, offsets, start
+                i = min(end, j)
+            k += 1
+        if i < j:
+            yield i, j, self._blob, self._offsets, 0
+
+    def _eager(self, i, j):
+        """
+        True when no lazy column crosses positions [i, j)
+        """
+        k = bisect.bisect_right(self._lazy_starts, j - 1) - 1
+        return k < 0 or self._lazy[k][1] <= i
+
+    def varbinds(self, i, j):
+        """
+        The encoded varbinds of positions [i, j), a memoryview of the store
+        buffer unless lazy columns are involved
+        """
+        if not self._lazy or self._eager(i, j):
+            return memoryview(self._blob)[self._offsets[i]:self._offsets[j]]
+        return b''.join(bytes(blob[offsets[start - base]:offsets[end - base]])
+                        for start, end, blob, offsets, base in self._pieces(i, j))
+
+    def dump(self, path, generation=0):
+        """
+        Write the encoded store to path for MappedStore readers. The file is
+        written aside and renamed over path so readers never see it partial.
+        """
+        tmp = self.dump_aside(path, generation)
+        try:
+            os.rename(tmp, path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def dump_aside(self, path, generation=0):
+        """
+        Write the encoded store to a new file next to path and return its
+        name, for the caller to rename over path
+        """
+        key_offsets = array.array('I', [0])
+        for key in self._keys:
+            key_offsets.append(key_offsets[-1] + len(key))
+        syntaxes = bytearray(value[0] for value in self._values)
+        blob, offsets = self._blob, self._offsets
+        if self._lazy:
+            # The readers cannot compute anything, every column goes in
+            blob = bytearray()
+            offsets = array.array('I', [0])
+            for start, end, piece, piece_offsets, base in self._pieces(0, len(self._keys)):
+                for p in range(start - base, end - base):
+                    offsets.append(len(blob) + piece_offsets[p + 1] - piece_offsets[start - base])
+                blob += piece[piece_offsets[start - base]:piece_offsets[end - base]]
+
+        # A file of its own next to path, two writers never share one
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                   prefix=os.path.basename(path) + '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, generation,
+                                             len(self._keys), key_offsets[-1]))
+                f.write(_array_bytes(key_offsets))
+                f.write(bytes(syntaxes))
+                f.write(b''.join(self._keys))
+                f.write(_array_bytes(offsets))
+                f.write(bytes(blob))
+        except Exception:
+            os.unlink(tmp)
+            raise
+        return tmp
+
+    def span(self, i, count, budget):
+        """
+        End position of up to count varbinds starting at i whose encoding
+        fits in budget bytes
+        """
+        j = min(i + count, len(self._keys))
+        if not self._lazy or i >= j or self._eager(i, j):
+            limit = bisect.bisect_right(self._offsets, self._offsets[i] + budget, i) - 1
+            return max(i, min(j, limit))
+        for start, end, blob, offsets, base in self._pieces(i, j):
+            size = offsets[end - base] - offsets[start - base]
+            if size > budget:
+                limit = bisect.bisect_right(offsets, offsets[start - base] + budget,
+                                            start - base) - 1
+                return max(i, limit + base)
+            budget -= size
+        return j
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(zip(self._oids, self._values))
+
+    def index(self, oid):
+        """
+        Position of an exact OID or -1
+        """
+        key = pack_oid(oid)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return -1
+
+    def index_after(self, oid):
+        """
+        Position of the first OID strictly greater than oid
+        """
+        return bisect.bisect_right(self._keys, pack_oid(oid))
+
+    def item(self, i):
+        return self._oids[i], self._values[i]
+
+    def get(self, oid):
+        i = self.index(oid)
+        if i < 0:
+            return None
+        return self._oids[i], self._values[i]
+
+    def get_next(self, oid):
+        i = self.index_after(oid)
+        if i >= len(self._keys):
+            return None
+        return self._oids[i], self._values[i]
+
+    def get_bulk(self, oid, max_repetitions):
+        """
+        Up to max_repetitions successors of oid, as a contiguous slice
+        """
+        i = self.index_after(oid)
+        j = i + max(0, max_repetitions)
+        return list(zip(self._oids[i:j], self._values[i:j]))
+
+    def range(self, start, stop=None):
+        """
+        All OIDs in [start, stop). With no stop, everything under the
+        start prefix.
+        """
+        i = bisect.bisect_left(self._keys, pack_oid(start))
+        if stop is None:
+            # Every descendant of start sorts before start with its
+            # last sub-identifier incremented.
+            stop = tuple(start[:-1]) + (start[-1] + 1,)
+        j = bisect.bisect_left(self._keys, pack_oid(stop), i)
+        return list(zip(self._oids[i:j], self._values[i:j]))
+
+
+class MappedStore(object):
+    """
+    Read-only view of a store dumped with OidStore.dump, answering the same
+    lookups as an encoded OidStore straight out of a memory map.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.identity = (st.st_ino, st.st_mtime)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._view = memoryview(self._mm)
+        except TypeError:
+            # Python 2 cannot take a memoryview of a mmap, slices are copies
+            self._view = self._mm
+
+        magic, self.generation, count, keys_size = \
+            SNAPSHOT_HEADER.unpack(self._mm[:SNAPSHOT_HEADER.size])
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("{0} is not an agent snapshot".format(path))
+        pos = SNAPSHOT_HEADER.size
+        self._count = count
+        self._key_offsets = _array_from(self._mm[pos:pos + 4 * (count + 1)])
+        pos += 4 * (count + 1)
+        self._syntaxes = bytearray(self._mm[pos:pos + count])
+        pos += count
+        self._keys_pos = pos
+        pos += keys_size
+        self._offsets = _array_from(self._mm[pos:pos + 4 * (count + 1)])
+        pos += 4 * (count + 1)
+        self._blob_pos = pos
+
+    def changed(self):
+        """
+        True once the snapshot file has been replaced
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        return (st.st_ino, st.st_mtime) != self.identity
+
+    def __len__(self):
+        return self._count
+
+    def _key(self, i):
+        return self._mm[self._keys_pos + self._key_offsets[i]:
+                        self._keys_pos + self._key_offsets[i + 1]]
+
+    def _bisect(self, key, right):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k = self._key(mid)
+            if k < key or (right and k == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def index(self, oid):
+        key = pack_oid(oid)
+        i = self._bisect(key, False)
+        if i < self._count and self._key(i) == key:
+            return i
+        return -1
+
+    def index_after(self, oid):
+        return self._bisect(pack_oid(oid), True)
+
+    def item(self, i):
+        return unpack_oid(self._key(i)), (self._syntaxes[i], None)
+
+    def varbinds(self, i, j):
+        return self._view[self._blob_pos + self._offsets[i]:
+                          self._blob_pos + self._offsets[j]]
+
+    def span(self, i, count, budget):
+        j = min(i + count, self._count)
+        limit = bisect.bisect_right(self._offsets, self._offsets[i] + budget, i) - 1
+        return max(i, min(j, limit))
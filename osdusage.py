@@ -0,0 +1,128 @@
+"""
+OSD utilization outliers, computed with NumPy over every OSD at once after
+each OSD stats refresh.
+
+Utilization is compared within each device class, since an SSD pool and an
+HDD pool filling at different paces is no imbalance. An OSD is an outlier
+when its z-score in its class or its distance to the class mean, in
+percentage points, goes past the configured limits. It stays one until both
+drop below a fraction of these limits, so an OSD hovering around a limit
+does not come and go on every refresh.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+#
+# Fraction of the limits an outlier must go back under to be cleared
+#
+CLEAR_RATIO = 0.8
+#
+# Classes with fewer OSDs have no meaningful standard deviation
+#
+MIN_CLASS_SIZE = 3
+
+
+class Outlier(namedtuple('Outlier', ['osd_id', 'device_class', 'utilization',
+                                     'mean', 'zscore'])):
+    """
+    An OSD and its utilization against the mean of its device class, both
+    in percent
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return "osd.{0} ({1}) {2:.1f}% mean {3:.1f}% z {4:.1f}".format(
+            self.osd_id, self.device_class, self.utilization, self.mean, self.zscore)
+
+
+def device_classes(osd_map, ids):
+    """
+    CRUSH device class of every OSD, guessed from the rotational flag of its
+    metadata when the tree has none
+    """
+    nodes = osd_map.osd_tree_node_by_id
+    metadata = osd_map.data.get('osd_metadata') or {}
+    classes = []
+    for osd_id in ids:
+        device_class = nodes.get(osd_id, {}).get('device_class')
+        if not device_class:
+            rotational = (metadata.get(str(osd_id)) or {}).get('rotational')
+            device_class = {'1': 'hdd', '0': 'ssd'}.get(str(rotational), 'unknown')
+        classes.append(device_class)
+    return classes
+
+
+def utilization(osd_map, osd_stats):
+    """
+    IDs, device classes and utilization in percent of the OSDs which are in
+    and report a size
+    """
+    ids, used, total = [], [], []
+    for osd_id, stats in osd_stats.stats_by_id.items():
+        osd = osd_map.osds_by_id.get(osd_id)
+        if osd is None or not osd.get('in') or not stats.get('kb'):
+            continue
+        ids.append(osd_id)
+        used.append(stats.get('kb_used', 0))
+        total.append(stats['kb'])
+    percent = 100.0 * np.array(used, dtype=np.float64) / np.array(total, dtype=np.float64)
+    return ids, device_classes(osd_map, ids), percent
+
+
+class OutlierDetector(object):
+    def __init__(self, zscore=3.0, deviation=20.0, worst=5):
+        self.zscore = zscore
+        self.deviation = deviation
+        self.worst = worst
+        # Outliers of the last check by OSD ID
+        self.outliers = {}
+
+    def check(self, osd_map, osd_stats):
+        """
+        Update the outliers from new OSD stats and return the worst of them,
+        by distance to their class mean, when some OSD became one, or None
+        """
+        if osd_map is None or osd_map.data is None or osd_stats is None:
+            return None
+        ids, classes, percent = utilization(osd_map, osd_stats)
+        if not ids:
+            self.outliers = {}
+            return None
+
+        names, group = np.unique(classes, return_inverse=True)
+        counts = np.bincount(group).astype(np.float64)
+        means = np.bincount(group, percent) / counts
+        variances = np.bincount(group, percent * percent) / counts - means * means
+        stds = np.sqrt(np.maximum(variances, 0.0))
+        stds[counts < MIN_CLASS_SIZE] = 0.0
+
+        mean = means[group]
+        std = stds[group]
+        distance = np.abs(percent - mean)
+        zscores = np.zeros(len(ids), dtype=np.float64)
+        spread = std > 0
+        zscores[spread] = distance[spread] / std[spread]
+
+        def beyond(ratio):
+            flagged = np.zeros(len(ids), dtype=bool)
+            if self.zscore > 0:
+                flagged |= zscores > self.zscore * ratio
+            if self.deviation > 0:
+                flagged |= distance > self.deviation * ratio
+            return flagged
+
+        raised = beyond(1.0)
+        # Known outliers are kept until they are back under the clear limits
+        known = np.array([osd_id in self.outliers for osd_id in ids], dtype=bool)
+        flagged = raised | (known & beyond(CLEAR_RATIO))
+
+        outliers = {}
+        for i in np.flatnonzero(flagged).tolist():
+            outliers[ids[i]] = Outlier(ids[i], classes[i], float(percent[i]),
+                                       float(mean[i]), float(zscores[i]))
+        new = set(outliers) - set(self.outliers)
+        self.outliers = outliers
+        if not new:
+            return None
+        return sorted(outliers.values(), key=lambda o: -abs(o.utilization - o.mean))[:self.worst]
@@ -0,0 +1,84 @@
+"""
+OSD performance counters sampled in bulk from the mgr on the serve loop.
+
+The counters of every OSD go into a PoolStatsRing keyed by OSD ID, one row
+per OSD, so the rates and average latencies of the last interval come out
+of a few array operations whatever the number of OSDs. Latencies are long
+running averages, kept as their sum and count, and averaged over the
+interval from the change of both.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from poolstats import PoolStatsRing
+
+#
+# Counters read from every OSD, the latencies are (sum, count) pairs
+#
+OSD_PERF_COUNTERS = ('osd.op_r', 'osd.op_w', 'osd.op_in_bytes', 'osd.op_out_bytes')
+OSD_PERF_LATENCIES = ('osd.op_r_latency', 'osd.op_w_latency')
+OSD_PERF_STATS = OSD_PERF_COUNTERS + tuple(
+    name + suffix for name in OSD_PERF_LATENCIES for suffix in ('.sum', '.count'))
+
+NANOSECONDS_PER_MICROSECOND = 1000.0
+
+
+class OsdPerf(namedtuple('OsdPerf', ['stamp', 'rates', 'latencies'])):
+    """
+    Performance of every OSD over the last interval: rates maps an OSD ID to
+    its read and write operations and bytes in and out per second, and
+    latencies to its average read and write latencies in microseconds
+    """
+    __slots__ = ()
+
+
+def osd_counters(perf_counters):
+    """
+    (OSD IDs, values in OSD_PERF_STATS order) out of get_all_perf_counters()
+    """
+    ids, values = [], []
+    for service, counters in perf_counters.items():
+        if not service.startswith('osd.'):
+            continue
+        try:
+            osd_id = int(service[4:])
+        except ValueError:
+            continue
+        row = [counters.get(name, {}).get('value', 0) for name in OSD_PERF_COUNTERS]
+        for name in OSD_PERF_LATENCIES:
+            counter = counters.get(name, {})
+            row.append(counter.get('value', 0))
+            row.append(counter.get('count', 0))
+        ids.append(osd_id)
+        values.append(row)
+    return ids, values
+
+
+class OsdPerfSampler(object):
+    def __init__(self, samples=10, osds=1024):
+        self.ring = PoolStatsRing(samples, osds, OSD_PERF_STATS)
+
+    def sample(self, perf_counters, now):
+        ids, values = osd_counters(perf_counters)
+        self.ring.record(ids, values, now)
+
+    def current(self):
+        """
+        OsdPerf of the OSDs of the last sample, over the interval between
+        the last two samples
+        """
+        ring = self.ring
+        if ring.count == 0 or not ring.ids:
+            return OsdPerf(0.0, {}, {})
+        rates = ring.rates(ring.ids_rows, 2)
+        counters = len(OSD_PERF_COUNTERS)
+        sums = rates[:, counters::2]
+        counts = rates[:, counters + 1::2]
+        latencies = np.zeros(sums.shape, dtype=np.float64)
+        ops = counts > 0
+        latencies[ops] = sums[ops] / counts[ops] / NANOSECONDS_PER_MICROSECOND
+        latest = (ring.count - 1) % ring.samples
+        return OsdPerf(float(ring.stamps[latest]),
+                       dict(zip(ring.ids, map(tuple, rates[:, :counters].tolist()))),
+                       dict(zip(ring.ids, map(tuple, latencies.tolist()))))
@@ -0,0 +1,130 @@
+"""
+PG state counters aggregated from pg_summary, cluster wide and per pool.
+
+pg_summary reports the number of PGs of every pool in every state string
+("active+clean", "active+undersized+degraded", ...). Each state string is
+parsed once into a row of 0/1 flags, one per counter, and cached; counting a
+summary is then one weighted sum of those rows per pool with NumPy, instead
+of walking the states of every pool with dicts.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+#
+# Counters in the order of PgCounters and of the pgMap objects. A PG is
+# counted in a state when its state string holds one of the tokens.
+#
+PG_COUNTERS = ('total', 'active', 'clean', 'degraded', 'misplaced', 'undersized',
+               'peering', 'stale', 'down', 'inconsistent', 'recovering',
+               'backfilling', 'inactive')
+PG_STATE_TOKENS = {
+    'active': ('active',),
+    'clean': ('clean',),
+    'degraded': ('degraded',),
+    'misplaced': ('remapped',),
+    'undersized': ('undersized',),
+    'peering': ('peering',),
+    'stale': ('stale',),
+    'down': ('down',),
+    'inconsistent': ('inconsistent',),
+    'recovering': ('recovering', 'recovery_wait'),
+    'backfilling': ('backfilling', 'backfill_wait'),
+}
+
+
+class PgCounters(namedtuple('PgCounters', ['stamp', 'counts', 'by_pool', 'inactive_since'])):
+    """
+    PG counts in PG_COUNTERS order for the cluster (counts) and by pool ID
+    (by_pool), and since when some PGs are inactive, or None
+    """
+    __slots__ = ()
+
+    def count(self, name):
+        return self.counts[PG_COUNTERS.index(name)]
+
+    def inactive_seconds(self):
+        if self.inactive_since is None:
+            return 0
+        return self.stamp - self.inactive_since
+
+
+def state_flags(state):
+    """
+    The PG_COUNTERS flags of a pg_summary state string
+    """
+    tokens = set(state.split('+'))
+    flags = [1]
+    for name in PG_COUNTERS[1:-1]:
+        flags.append(1 if tokens.intersection(PG_STATE_TOKENS[name]) else 0)
+    flags.append(0 if 'active' in tokens else 1)
+    return flags
+
+
+class PgSummaryCounter(object):
+    def __init__(self):
+        # Flags of every state string seen so far
+        self.flags = {}
+        self.inactive_since = None
+
+    def _flags(self, state):
+        flags = self.flags.get(state)
+        if flags is None:
+            flags = self.flags[state] = state_flags(state)
+        return flags
+
+    def count(self, summary, now):
+        """
+        PgCounters of a pg_summary
+        """
+        pools, rows, weights = [], [], []
+        for pool_id, states in (summary.get('by_pool') or {}).items():
+            for state, count in states.items():
+                pools.append(int(pool_id))
+                rows.append(self._flags(state))
+                weights.append(count)
+
+        if pools:
+            ids, index = np.unique(pools, return_inverse=True)
+            weighted = np.array(rows, dtype=np.int64) * np.array(weights, dtype=np.int64)[:, np.newaxis]
+            per_pool = np.zeros((len(ids), len(PG_COUNTERS)), dtype=np.int64)
+            np.add.at(per_pool, index, weighted)
+            counts = tuple(per_pool.sum(axis=0).tolist())
+            by_pool = dict(zip(ids.tolist(), map(tuple, per_pool.tolist())))
+        else:
+            counts = (0,) * len(PG_COUNTERS)
+            by_pool = {}
+
+        if counts[-1] == 0:
+            self.inactive_since = None
+        elif self.inactive_since is None:
+            self.inactive_since = now
+        return PgCounters(now, counts, by_pool, self.inactive_since)
+
+
+class Sustained(object):
+    """
+    A value staying above a limit for some duration, reported once until it
+    drops back to the limit
+    """
+
+    def __init__(self, limit, duration):
+        self.limit = limit
+        self.duration = duration
+        self.since = None
+        self.fired = False
+
+    def update(self, value, now):
+        """
+        True the first time value has been above the limit for duration
+        """
+        if value <= self.limit:
+            self.since = None
+            self.fired = False
+            return False
+        if self.since is None:
+            self.since = now
+        if self.fired or now - self.since < self.duration:
+            return False
+        self.fired = True
+        return True
@@ -0,0 +1,160 @@
+"""
+Short history of the pool statistics reported by df, kept in a preallocated
+NumPy ring buffer of pools x stats x samples with one timestamp per sample
+shared by every pool.
+
+Each pool owns a row of the buffer for as long as it exists. Taking a sample
+writes one column of the buffer and the rates of every pool over the whole
+window come out of a few array operations, instead of walking a deque per
+pool and per stat. So does the least-squares trend of a stat over the window,
+which the pool full forecast projects forward.
+"""
+from collections import namedtuple
+from operator import itemgetter
+
+import numpy as np
+
+#
+# df pool stats kept in the ring, in buffer order
+#
+POOL_STATS = ('bytes_used', 'objects', 'rd', 'wr', 'rd_bytes', 'wr_bytes')
+
+
+class PoolStats(namedtuple('PoolStats', ['stamp', 'counters', 'rates'])):
+    """
+    The latest sample of every pool: counters maps a pool ID to its
+    POOL_STATS values and rates to their change per second over the window,
+    or zeros until a pool has two samples.
+    """
+    __slots__ = ()
+
+
+class PoolStatsRing(object):
+    def __init__(self, samples=10, pools=64, stats=POOL_STATS):
+        self.stats = stats
+        self.samples = samples
+        self.values = np.zeros((pools, len(stats), samples), dtype=np.int64)
+        self.stamps = np.zeros(samples, dtype=np.float64)
+        # Sample number of the first sample of the pool of each row
+        self.first = np.zeros(pools, dtype=np.int64)
+        self.rows = {}
+        self.free = list(range(pools - 1, -1, -1))
+        # Pools of the last sample and their rows
+        self.ids = []
+        self.ids_rows = np.zeros(0, dtype=np.intp)
+        self.count = 0
+        self._get = itemgetter(*stats)
+
+    def _grow(self):
+        pools = len(self.first)
+        self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+        self.first = np.concatenate([self.first, np.zeros_like(self.first)])
+        self.free = list(range(2 * pools - 1, pools - 1, -1))
+
+    def _row(self, pool_id):
+        row = self.rows.get(pool_id)
+        if row is None:
+            if not self.free:
+                self._grow()
+            row = self.rows[pool_id] = self.free.pop()
+            self.first[row] = self.count
+        return row
+
+    def sample(self, pools, now):
+        """
+        Record the stats of every pool, pools being a list of (pool ID, df
+        stats) pairs. Rows of the pools which are gone are released.
+        """
+        try:
+            values = [self._get(stats) for pool_id, stats in pools]
+        except KeyError:
+            values = [tuple(stats.get(name, 0) for name in self.stats)
+                      for pool_id, stats in pools]
+        self.record([pool_id for pool_id, stats in pools], values, now)
+
+    def record(self, ids, values, now):
+        """
+        Record a sample already laid out as one tuple of stats per pool ID
+        """
+        if ids != self.ids:
+            for pool_id in set(self.rows) - set(ids):
+                self.free.append(self.rows.pop(pool_id))
+            self.ids = ids
+            self.ids_rows = np.array([self._row(pool_id) for pool_id in ids], dtype=np.intp)
+        slot = self.count % self.samples
+        if ids:
+            self.values[self.ids_rows, :, slot] = np.array(values, dtype=np.int64)
+        self.stamps[slot] = now
+        self.count += 1
+
+    def rates(self, rows, samples=None):
+        """
+        Change per second of every stat of the given rows between their
+        oldest and latest samples, or over the last samples only, as a rows
+        x stats array
+        """
+        latest = (self.count - 1) % self.samples
+        window = np.minimum(self.count - self.first[rows], min(self.samples, samples or self.samples))
+        oldest = (self.count - window) % self.samples
+        elapsed = self.stamps[latest] - self.stamps[oldest]
+        delta = self.values[rows, :, latest] - self.values[rows, :, oldest]
+        rates = np.zeros(delta.shape, dtype=np.float64)
+        ready = (window > 1) & (elapsed > 0)
+        rates[ready] = delta[ready] / elapsed[ready, np.newaxis]
+        return rates
+
+    def current(self):
+        """
+        PoolStats of the pools of the last sample
+        """
+        ids = self.ids
+        if self.count == 0 or not ids:
+            return PoolStats(0.0, {}, {})
+        latest = (self.count - 1) % self.samples
+        counters = self.values[self.ids_rows, :, latest].tolist()
+        rates = self.rates(self.ids_rows).tolist()
+        return PoolStats(float(self.stamps[latest]),
+                         dict(zip(ids, map(tuple, counters))),
+                         dict(zip(ids, map(tuple, rates))))
+
+    def trend(self, stat=0):
+        """
+        Least-squares slope per second of a stat over the samples of the
+        window, for the pools of the last sample in their order, or zero
+        until a pool has two samples
+        """
+        rows = self.ids_rows
+        if self.count < 2 or not len(rows):
+            return np.zeros(len(rows), dtype=np.float64)
+        latest = (self.count - 1) % self.samples
+        # Sample number held by each slot, and which of them every row owns
+        numbers = self.count - 1 - (latest - np.arange(self.samples)) % self.samples
+        oldest = np.maximum(self.first[rows], self.count - self.samples)
+        mask = (numbers >= 0)[np.newaxis, :] & (numbers[np.newaxis, :] >= oldest[:, np.newaxis])
+        # Centered on the latest sample to keep the sums small
+        x = np.where(mask, self.stamps - self.stamps[latest], 0.0)
+        y = self.values[rows, stat, :]
+        y = np.where(mask, y - y[:, latest, np.newaxis], 0).astype(np.float64)
+        n = mask.sum(axis=1)
+        sx = x.sum(axis=1)
+        sy = y.sum(axis=1)
+        sxx = (x * x).sum(axis=1)
+        sxy = (x * y).sum(axis=1)
+        denominator = n * sxx - sx * sx
+        slopes = np.zeros(len(rows), dtype=np.float64)
+        ready = (n > 1) & (denominator > 0)
+        slopes[ready] = (n * sxy - sx * sy)[ready] / denominator[ready]
+        return slopes
+
+    def time_to_full(self, available, stat=0):
+        """
+        Seconds until each pool of the last sample fills the space still
+        available to it, given in the same order, at the trend of stat
+        (bytes_used), or inf for the pools which are not growing
+        """
+        slopes = self.trend(stat)
+        available = np.asarray(available, dtype=np.float64)
+        seconds = np.full(len(slopes), np.inf)
+        growing = slopes > 0
+        seconds[growing] = np.maximum(available[growing], 0) / slopes[growing]
+        return seconds
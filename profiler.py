@@ -0,0 +1,152 @@
+"""
+Sampling profiler of the module threads.
+
+While started, a thread wakes up every interval and walks the stacks of all
+the threads with sys._current_frames(). Only the threads running the code of
+the module, whatever started them, are kept: the stack of such a thread is
+cut above the outermost frame of a module file, so the notify handler of the
+mgr is sampled while it is in notify() and not while it calls the other
+modules. The stacks are counted in a table of at most max_stacks entries,
+the samples of any new stack past that are only counted as dropped.
+
+dump() returns the table in the collapsed stack format of flamegraph.pl, one
+"thread;outer frame;...;inner frame count" line per stack. Nothing of the
+profiler runs while it is stopped, and it stops by itself after duration
+seconds so it cannot be left running by mistake.
+"""
+import os
+import sys
+import threading
+import time
+
+#
+# Code objects whose frame label is remembered, past that they are labelled
+# again on every sample
+#
+MAX_LABELS = 10000
+
+
+class Profiler(object):
+    def __init__(self, root, interval=0.01, max_stacks=10000, duration=600.0,
+                 clock=time.time):
+        # Directory of the module files
+        self.root = os.path.abspath(root)
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.duration = duration
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.thread = None
+        self.labels = {}
+        self.reset()
+
+    def reset(self):
+        self.stacks = {}
+        self.samples = 0
+        self.dropped = 0
+        self.sample_time = 0.0
+        self.started = None
+        self.stopped = None
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def start(self):
+        """
+        Clear the table and start sampling, False when already started
+        """
+        if self.thread is not None:
+            return False
+        with self.lock:
+            self.reset()
+            self.started = self.clock()
+        self.event.clear()
+        self.thread = threading.Thread(target=self._loop, name='snmp-profiler')
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """
+        Stop sampling and keep the table, False when not started
+        """
+        thread = self.thread
+        if thread is None:
+            return False
+        self.event.set()
+        if thread is not threading.current_thread():
+            thread.join()
+        return True
+
+    def _loop(self):
+        end = self.clock() + self.duration
+        while not self.event.wait(self.interval) and self.clock() < end:
+            self.sample()
+        self.stopped = self.clock()
+        self.thread = None
+
+    def _label(self, code):
+        # (frame of a module file, "file:function")
+        label = self.labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            label = (os.path.dirname(os.path.abspath(filename)) == self.root,
+                     '{0}:{1}'.format(os.path.basename(filename), code.co_name))
+            if len(self.labels) < MAX_LABELS:
+                self.labels[code] = label
+        return label
+
+    def sample(self):
+        """
+        Count the current stack of every thread running the module code
+        """
+        start = time.time()
+        names = dict((thread.ident, thread.name) for thread in threading.enumerate())
+        me = threading.current_thread().ident
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            labels = []
+            outer = 0
+            while frame is not None:
+                own, label = self._label(frame.f_code)
+                labels.append(label)
+                if own:
+                    outer = len(labels)
+                frame = frame.f_back
+            if not outer:
+                continue
+            labels = labels[outer - 1::-1]
+            labels.insert(0, names.get(ident, str(ident)).replace(';', '_').replace(' ', '_'))
+            stack = ';'.join(labels)
+            with self.lock:
+                if stack in self.stacks:
+                    self.stacks[stack] += 1
+                elif len(self.stacks) < self.max_stacks:
+                    self.stacks[stack] = 1
+                else:
+                    self.dropped += 1
+        self.samples += 1
+        self.sample_time += time.time() - start
+
+    def dump(self):
+        """
+        The stacks in collapsed format, the most sampled first
+        """
+        with self.lock:
+            stacks = sorted(self.stacks.items(), key=lambda item: -item[1])
+        return ''.join('{0} {1}\n'.format(stack, count) for stack, count in stacks)
+
+    def stats(self):
+        end = self.stopped if self.thread is None and self.stopped else self.clock()
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'elapsed': end - self.started if self.started else 0.0,
+            'samples': self.samples,
+            'stacks': len(self.stacks),
+            'dropped': self.dropped,
+            'sample_time': self.sample_time,
+        }
@@ -0,0 +1,95 @@
+"""
+Recorder of the notify stream of the module and of what get() returned.
+
+While recording, every notify() of the mgr and every get() payload is
+written to a capture file, one JSON object per line, with the seconds since
+the recording started:
+
+    {"recorder": 1, "start": 1514764800.0, "fsid": "..."}
+    {"t": 0.0021, "notify": "osd_map", "id": ""}
+    {"t": 0.0023, "get": "osd_map", "data": {...}}
+    {"t": 0.5007, "get": "osd_map"}
+
+A payload equal to the previous one of the same name is written without its
+data. The capture is gzipped when its path ends with .gz. tests/mgrharness.py
+replays such captures against the module outside of the mgr.
+"""
+import gzip
+import json
+import threading
+import time
+
+VERSION = 1
+
+
+class Recorder(object):
+    def __init__(self, path, fsid=None, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.lock = threading.Lock()
+        if path.endswith('.gz'):
+            self.file = gzip.open(path, 'wb')
+        else:
+            self.file = open(path, 'wb')
+        self.start = clock()
+        self.last = {}
+        self.events = 0
+        self.unchanged = 0
+        self.written = 0
+        self._write({'recorder': VERSION, 'start': self.start, 'fsid': fsid})
+
+    def _write(self, event, data=None):
+        # data is the JSON text of the payload, added to the event as is
+        line = json.dumps(event, sort_keys=True, separators=(',', ':'))
+        if data is not None:
+            line = line[:-1] + ',"data":' + data + '}'
+        line = (line + '\n').encode('utf-8')
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(line)
+            self.written += len(line)
+            self.events += 1
+
+    def _time(self, now):
+        return round((now if now is not None else self.clock()) - self.start, 6)
+
+    def notify(self, notify_type, notify_id, now=None):
+        self._write({'t': self._time(now), 'notify': notify_type, 'id': notify_id})
+
+    def get(self, data_name, data, now=None):
+        text = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+        if self.last.get(data_name) == text:
+            self.unchanged += 1
+            text = None
+        else:
+            self.last[data_name] = text
+        self._write({'t': self._time(now), 'get': data_name}, text)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'recording': self.file is not None,
+            'elapsed': self.clock() - self.start,
+            'events': self.events,
+            'unchanged': self.unchanged,
+            'bytes': self.written,
+        }
+
+
+def load(path):
+    """
+    The header and the events of a capture
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        lines = [json.loads(line.decode('utf-8')) for line in f if line.strip()]
+    if not lines or lines[0].get('recorder') != VERSION:
+        raise ValueError("{0} is not a capture of the recorder".format(path))
+    return lines[0], lines[1:]
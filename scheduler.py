@@ -0,0 +1,126 @@
+"""
+Periodic tasks of the serve loop, run from a min-heap of due times.
+
+Each task has its own interval, randomized by its jitter so tasks sharing an
+interval spread out instead of firing together. A task raising an exception
+is retried after an exponential backoff instead of its interval. A task
+given an epoch function is skipped while the epoch it returns, typically
+the epochs of the maps the task depends on, is the one of its last
+successful run.
+"""
+import heapq
+import random
+import time
+
+
+class Task(object):
+    def __init__(self, name, function, interval, jitter=0.1, backoff=2.0,
+                 max_backoff=None, epoch=None):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.jitter = jitter
+        self.backoff = backoff
+        self.max_backoff = max_backoff if max_backoff is not None else 10 * interval
+        self.epoch = epoch
+        self.last_epoch = None
+        self.failures = 0
+        self.runs = 0
+        self.skips = 0
+        self.errors = 0
+        self.last_duration = 0.0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def delay(self, rand):
+        """
+        Seconds until the next run of the task
+        """
+        if self.failures:
+            return min(self.interval * self.backoff ** self.failures, self.max_backoff)
+        return self.interval * (1.0 + self.jitter * (2 * rand() - 1))
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'skips': self.skips,
+            'errors': self.errors,
+            'failures': self.failures,
+            'last_duration': self.last_duration,
+            'last_lateness': self.last_lateness,
+            'max_lateness': self.max_lateness,
+        }
+
+
+class Scheduler(object):
+    def __init__(self, log, clock=time.time, rand=random.random):
+        self.log = log
+        self.clock = clock
+        self.rand = rand
+        self.heap = []
+        self.tasks = {}
+        self.count = 0
+
+    def add(self, task, delay=0.0):
+        """
+        Schedule a task, first run after delay seconds
+        """
+        self.tasks[task.name] = task
+        self._push(task, self.clock() + delay)
+        return task
+
+    def _push(self, task, due):
+        # The count breaks ties so tasks themselves are never compared
+        self.count += 1
+        heapq.heappush(self.heap, (due, self.count, task))
+
+    def run_due(self):
+        """
+        Run the tasks which are due and return the seconds until the next
+        one, or None when there is no task
+        """
+        while self.heap:
+            due, _, task = self.heap[0]
+            now = self.clock()
+            if due > now:
+                return due - now
+            heapq.heappop(self.heap)
+            # How long the task waited past its due time for the loop
+            task.last_lateness = now - due
+            task.max_lateness = max(task.max_lateness, task.last_lateness)
+            self._run(task)
+            self._push(task, self.clock() + task.delay(self.rand))
+        return None
+
+    def _run(self, task):
+        epoch = task.epoch() if task.epoch is not None else None
+        if epoch is not None and epoch == task.last_epoch and not task.failures:
+            task.skips += 1
+            return
+        start = self.clock()
+        try:
+            task.function()
+        except Exception as e:
+            task.failures += 1
+            task.errors += 1
+            self.log.error("Task {0} failed ({1} in a row): {2}".format(
+                task.name, task.failures, e))
+        else:
+            task.failures = 0
+            task.last_epoch = epoch
+            task.runs += 1
+        task.last_duration = self.clock() - start
+
+    def run(self, event, running):
+        """
+        Run the tasks until running() is false. Setting event wakes the loop
+        up early, to stop it or after adding a task.
+        """
+        while running():
+            delay = self.run_due()
+            event.wait(delay if delay is not None else 1.0)
+            event.clear()
+
+    def stats(self):
+        return dict((name, task.stats()) for name, task in self.tasks.items())
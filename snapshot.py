@@ -0,0 +1,96 @@
+"""
+Immutable snapshots of the map-derived views shared between the notify
+thread, the serve loop and the SNMP agent.
+
+Writers build a complete new snapshot and publish it with a single reference
+assignment, readers just take SnapshotBuilder.current() and keep using that
+object for as long as they need a consistent view. Readers never lock; the
+only lock serializes writers so two concurrent updates cannot lose a view,
+nor hand their snapshots on out of order.
+"""
+from collections import namedtuple
+import threading
+import time
+
+
+class MapSnapshot(namedtuple('MapSnapshot', [
+        'generation', 'stamp', 'health', 'mon_map', 'mon_status', 'osd_map',
+        'fs_map', 'service_map', 'osd_stats', 'pool_stats', 'osd_perf',
+        'pg_counters', 'store'])):
+    """
+    One generation of the cluster views. The map fields hold the DataWrapper
+    objects from types (Health, MonMap, OsdMap, ...) or None when the map has
+    not been received yet, osd_stats is a Deferred OsdStats, pool_stats the
+    latest poolstats.PoolStats, osd_perf the latest perfstats.OsdPerf,
+    pg_counters the latest pgstats.PgCounters and store holds the encoded
+    agent view if any.
+
+    Nothing reachable from a published snapshot may be modified.
+    """
+    __slots__ = ()
+
+    @property
+    def age(self):
+        return time.time() - self.stamp
+
+
+class Deferred(object):
+    """
+    A view fetched the first time it is needed and then kept, for the views
+    too expensive to fetch on every notification, such as the OSD stats out
+    of the PG map. It stays the same view once fetched.
+    """
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._fetched = False
+        self._value = None
+
+    def get(self):
+        if not self._fetched:
+            with self._lock:
+                if not self._fetched:
+                    self._value = self._fetch()
+                    self._fetched = True
+        return self._value
+
+
+EMPTY_SNAPSHOT = MapSnapshot(0, 0.0, None, None, None, None, None, None, None, None, None,
+                             None, None)
+
+
+class SnapshotBuilder(object):
+    def __init__(self):
+        self._current = EMPTY_SNAPSHOT
+        self._lock = threading.Lock()
+
+    def current(self):
+        return self._current
+
+    @property
+    def generation(self):
+        return self._current.generation
+
+    def update(self, derive=None, publish=None, **views):
+        """
+        Publish a new generation with the given views replaced.
+
+        derive, when given, is called with the new snapshot and the one it
+        replaces and returns a dict of further fields to set, such as the
+        agent store built from the new maps.
+
+        publish, when given, is called with the new snapshot before the next
+        update may start, so whatever it hands the snapshot to, such as the
+        agent, gets the generations in order.
+        """
+        with self._lock:
+            previous = self._current
+            snapshot = previous._replace(generation=previous.generation + 1,
+                                         stamp=time.time(), **views)
+            if derive is not None:
+                snapshot = snapshot._replace(**derive(snapshot, previous))
+            self._current = snapshot
+            if publish is not None:
+                publish(snapshot)
+        return snapshot
@@ -0,0 +1,67 @@
+"""
+Import setup shared by the scripts of this directory, imported first by each
+of them:
+
+    import _path
+    from _path import here, load_types, import_module
+
+The module directory holds a types.py which would shadow the standard
+library module of the same name, so it is only looked into after everything
+else. load_types() adds that types.py to the standard library module, and
+import_module() imports module.py on top of the mgr stand-ins of mockmgr.
+"""
+import os
+import sys
+
+here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOCK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mockmgr')
+
+sys.path = [p for p in sys.path if os.path.abspath(p or '.') != here] + [here]
+
+
+def load_types():
+    """
+    The types.py of the module, loaded into the standard library types
+    module: module.py imports its OsdMap, MonMap, ... from types, and
+    everything else still finds there what it imports from types
+    """
+    import types
+    if not hasattr(types, 'OsdMap'):
+        combined = type(sys)('types')
+        combined.__dict__.update(types.__dict__)
+        combined.__file__ = os.path.join(here, 'types.py')
+        with open(combined.__file__) as f:
+            code = compile(f.read(), combined.__file__, 'exec')
+        exec(code, combined.__dict__)
+        sys.modules['types'] = types = combined
+    return types
+
+
+def _install_commands():
+    """
+    module.py runs snmptrap with the commands module of Python 2, which
+    Python 3 has as subprocess.getstatusoutput
+    """
+    try:
+        import commands
+    except ImportError:
+        import subprocess
+        commands = type(sys)('commands')
+        commands.getstatusoutput = subprocess.getstatusoutput
+        sys.modules['commands'] = commands
+
+
+def import_module(backend=None):
+    """
+    module.py on top of the mgr_module stand-in, its instances answered by
+    backend from now on
+    """
+    if MOCK not in sys.path:
+        sys.path.insert(0, MOCK)
+    import mgr_module
+    if backend is not None:
+        mgr_module.install(backend)
+    load_types()
+    _install_commands()
+    import module
+    return module
@@ -0,0 +1,84 @@
+"""
+Benchmark the first notification after a failover, cold and warm.
+
+    python tests/benchhandover.py [SNMP version ...]
+
+Cold is what an active module starting from nothing pays before its first
+trap goes out without the local tools: localizing the SNMP v3 keys, resolving
+the destination and encoding the constant parts of the notifications. Warm
+is what is left once the standby module prepared all that: encoding and
+sending the trap. The snmptrap command line is timed too when it is
+installed, as it is what sends the traps with trap_using_tools.
+"""
+import sys
+
+import _path
+
+import socket
+import subprocess
+import time
+
+from notification import Notifier
+from usm import Usm, LEVELS
+
+PASSES = 20
+FSID = '5a0d6e16-7b2a-4a5e-9d4e-8c1f2b3a4d5e'
+USERS = [{'name': 'ceph', 'level': 'authPriv', 'auth': 'SHA:cephpassword',
+          'priv': 'AES:cephpassword'}]
+
+
+def prepare(port, version):
+    """
+    What the standby module prepares: users, Usm and Notifier
+    """
+    usm = None
+    if version == '3':
+        config = {'engine': '0x8000000001020304', 'boots': 1, 'start': time.time(),
+                  'users': USERS}
+        usm = Usm.from_config(config, Usm.users_from_config(config))
+    return Notifier('127.0.0.1', port, version, 'public', FSID, usm=usm, user='ceph',
+                    level=LEVELS['authPriv'])
+
+
+def bench(sink, version):
+    port = sink.getsockname()[1]
+    cold = warm = 0.0
+    for _ in range(PASSES):
+        start = time.time()
+        notifier = prepare(port, version)
+        middle = time.time()
+        notifier.send_trap('clusterCheck', 3, 'Ceph Manager SNMP Handler - Active Starting')
+        cold += time.time() - start
+        warm += time.time() - middle
+        sink.recv(65536)
+        notifier.close()
+    print("SNMP v{0:<3} cold {1:8.3f} ms  warm {2:8.3f} ms".format(
+        version, cold * 1000 / PASSES, warm * 1000 / PASSES))
+
+
+def bench_tools(sink):
+    command = ['snmptrap', '-m', '+SNMPHANDLER-MIB', '-v', '2c', '-c', 'public',
+               'localhost:{0}'.format(sink.getsockname()[1]), '0', 'clusterCheck',
+               'fsId', 's', FSID, 'statusDetail', 'i', '3', 'statusMsg', 's', 'Active Starting']
+    try:
+        start = time.time()
+        subprocess.call(command)
+    except OSError:
+        print("snmptrap not installed")
+        return
+    print("snmptrap   {0:8.3f} ms".format((time.time() - start) * 1000))
+
+
+def main(argv):
+    versions = argv[1:] or ['1', '2c', '3']
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(('127.0.0.1', 0))
+    sink.settimeout(5)
+    for version in versions:
+        bench(sink, version)
+    bench_tools(sink)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,179 @@
+"""
+Benchmark loading SNMPHANDLER-MIB and what the MIB costs every trap, as JSON.
+
+    python tests/benchmib.py [--runs N] [--traps N] [--source DIR|URL ...]
+                             [--output FILE]
+
+cold: fresh interpreters, --runs times each, only importing mib.py and the
+MIB builder of pysnmp, loading SNMPHANDLER-MIB from mibs/ (see mib.py), and, when pysmi
+is installed and the MIBs SNMPHANDLER-MIB imports are found in --source
+(see mibbuild.py), attaching the MIB compiler and compiling
+SNMPHANDLER-MIB.txt before loading it, as was needed before mibs/.
+
+trap: per trap, resolving the trap and objects of a notification by name
+through the MIB against taking their OIDs from SNMPTRAP_OIDS, and, when
+snmptrap is installed, running snmptrap with -m +SNMPHANDLER-MIB and the
+names against -m "" and the OIDs, --traps times each, into a TrapSink (see
+trapsink.py).
+"""
+import os
+import sys
+
+from _path import here
+
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+
+from benchsuite import measure
+from synthmaps import FSID
+
+OBJECTS = ('fsId', 'statusDetail', 'statusMsg', 'notificationSequence')
+MESSAGE = 'Ceph Manager SNMP Handler - Cluster status changed to HEALTH_WARN'
+
+
+def child(mode, sources):
+    """
+    What a fresh interpreter of the cold benchmark does
+    """
+    from pysnmp.smi import builder
+    from mib import MIB_NAME, mib_builder
+    if mode == 'load':
+        mib_builder()
+    elif mode == 'compile':
+        from pysnmp.smi import compiler
+        dest = tempfile.mkdtemp()
+        try:
+            loaded = builder.MibBuilder()
+            compiler.addMibCompiler(loaded, sources=[here] + sources, destination=dest)
+            loaded.loadModules(MIB_NAME)
+        finally:
+            shutil.rmtree(dest)
+    return 0
+
+
+def bench_cold(runs, sources):
+    results = {}
+    skipped = {}
+    modes = ['import', 'load']
+    try:
+        import pysmi
+        modes.append('compile')
+    except ImportError as e:
+        skipped['cold.compile'] = str(e)
+    for mode in modes:
+        command = [sys.executable, os.path.abspath(__file__), '--child', mode]
+        command += ['--source=' + source for source in sources]
+        if subprocess.call(command) != 0:
+            skipped['cold.' + mode] = 'failed, see above'
+            continue
+        results['cold.' + mode] = measure(runs, lambda _: subprocess.check_call(command))
+    return results, skipped
+
+
+def bench_resolve(traps):
+    from pysnmp.smi.rfc1902 import ObjectIdentity
+    from mib import MIB_NAME, SNMPTRAP_OIDS, mib_view
+
+    view = mib_view()
+
+    def by_name(_):
+        for name in ('clusterWarn',) + OBJECTS:
+            ObjectIdentity(MIB_NAME, name).resolveWithMib(view)
+
+    def by_oid(_):
+        for name in ('clusterWarn',) + OBJECTS:
+            SNMPTRAP_OIDS[name]
+
+    return {
+        'trap.resolve.names': measure(traps, by_name),
+        'trap.resolve.oids': measure(traps, by_oid),
+    }
+
+
+def bench_snmptrap(traps):
+    from mib import SNMPTRAP_OIDS
+    from trapsink import TrapSink
+
+    sink = TrapSink('127.0.0.1', 0)
+    sink.start()
+    # A MIB directory holding SNMPHANDLER-MIB only, where snmptrap finds it
+    mibs = tempfile.mkdtemp()
+    shutil.copy(os.path.join(here, 'SNMPHANDLER-MIB.txt'), mibs)
+    target = '127.0.0.1:{0}'.format(sink.address[1])
+    sequence = [0]
+
+    def send(names):
+        sequence[0] += 1
+        oid = lambda name: name if names else SNMPTRAP_OIDS[name]
+        if names:
+            command = 'snmptrap -M +' + mibs + ' -m +SNMPHANDLER-MIB'
+        else:
+            command = 'snmptrap -m ""'
+        command += ' -v 2c -c public '+target+' 0 '+oid('clusterWarn')+' '+oid('fsId')+' s '+FSID+' '+oid('statusDetail')+' i 1 '+oid('statusMsg')+' s "'+MESSAGE+'" '+oid('notificationSequence')+' c '+str(sequence[0])
+        subprocess.check_call(command, shell=True)
+
+    try:
+        results = {
+            'trap.snmptrap.names': measure(traps, lambda _: send(True)),
+            'trap.snmptrap.oids': measure(traps, lambda _: send(False)),
+        }
+        deadline = time.time() + 2.0
+        while sink.received + sink.errors < 2 * traps and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        sink.stop()
+        shutil.rmtree(mibs)
+    results['trap.snmptrap.received'] = sink.received
+    return results
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark loading SNMPHANDLER-MIB')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--traps', type=int, default=100)
+    parser.add_argument('--source', action='append', default=[])
+    parser.add_argument('--output')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv[1:])
+    if args.child:
+        return child(args.child, args.source)
+
+    import pysnmp
+    report = {
+        'python': platform.python_version(),
+        'pysnmp': pysnmp.__version__,
+        'time': time.time(),
+        'runs': args.runs,
+        'traps': args.traps,
+    }
+    results, skipped = bench_cold(args.runs, args.source or ['/usr/share/snmp/mibs'])
+    results.update(bench_resolve(args.traps))
+    if which('snmptrap'):
+        results.update(bench_snmptrap(args.traps))
+    else:
+        skipped['trap.snmptrap'] = 'snmptrap not installed'
+    report['results'] = results
+    report['skipped'] = skipped
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write('\n')
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,62 @@
+"""
+Benchmark the OSD perf counter sampler on synthetic perf counters.
+
+    python tests/benchosdperf.py [osd count ...]
+
+Builds the get_all_perf_counters() output of 1,000 and 10,000 OSDs by default
+and reports the time of one sampling pass: reading the counters into the
+ring, then computing the rates and latencies of every OSD.
+"""
+import sys
+
+import _path
+
+import random
+import time
+
+from perfstats import OsdPerfSampler, OSD_PERF_COUNTERS, OSD_PERF_LATENCIES
+
+PASSES = 10
+
+
+def make_counters(count, step):
+    counters = {}
+    for osd_id in range(count):
+        osd = {}
+        for name in OSD_PERF_COUNTERS:
+            osd[name] = {'value': step * random.randint(100, 10000),
+                         'description': '', 'nick': '', 'type': 10, 'priority': 10}
+        for name in OSD_PERF_LATENCIES:
+            ops = step * random.randint(100, 10000)
+            osd[name] = {'value': ops * random.randint(100000, 5000000), 'count': ops,
+                         'description': '', 'nick': '', 'type': 5, 'priority': 10}
+        counters['osd.{0}'.format(osd_id)] = osd
+    return counters
+
+
+def bench(count):
+    sampler = OsdPerfSampler()
+    samples = [make_counters(count, step + 1) for step in range(PASSES)]
+    sample = current = 0.0
+    for step, counters in enumerate(samples):
+        start = time.time()
+        sampler.sample(counters, 30.0 * step)
+        middle = time.time()
+        osd_perf = sampler.current()
+        sample += middle - start
+        current += time.time() - middle
+    print("{0:>7} OSDs  sample {1:8.2f} ms  rates and latencies {2:8.2f} ms  "
+          "pass {3:8.2f} ms".format(count, sample * 1000 / PASSES, current * 1000 / PASSES,
+                                     (sample + current) * 1000 / PASSES))
+    return osd_perf
+
+
+def main(argv):
+    counts = [int(a) for a in argv[1:]] or [1000, 10000]
+    for count in counts:
+        bench(count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
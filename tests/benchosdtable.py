@@ -0,0 +1,107 @@
+"""
+Benchmark the snmpOsdMapTable builder on synthetic clusters.
+
+    python tests/benchosdtable.py [osd count ...]
+
+Builds the table for 1,000, 10,000 and 50,000 OSDs by default and reports
+the time to build it, to encode every varbind and to encode it again after a
+single OSD changed, then what the lazy space and PG columns cost: a first
+GET in one of them and a walk of all of them.
+"""
+import sys
+
+from _path import load_types
+
+import copy
+import random
+import time
+
+from mibtables import build_osd_table, OSD_MAP_ENTRY
+from oidstore import OidStore
+from snapshot import Deferred, EMPTY_SNAPSHOT
+
+
+def make_cluster(types, count, osds_per_host=20):
+    osds = []
+    nodes = [{'id': -1, 'name': 'default', 'type': 'root', 'children': []}]
+    metadata = {}
+    osd_stats = []
+    pg_stats = []
+    for host in range(count // osds_per_host + 1):
+        ids = list(range(host * osds_per_host, min(count, (host + 1) * osds_per_host)))
+        if not ids:
+            break
+        name = 'node{0}'.format(host)
+        nodes[0]['children'].append(-2 - host)
+        nodes.append({'id': -2 - host, 'name': name, 'type': 'host', 'children': ids})
+        ip = '10.{0}.{1}.{2}'.format(host // 65536, (host // 256) % 256, host % 256)
+        for osd_id in ids:
+            osds.append({
+                'osd': osd_id,
+                'uuid': '6905e6ea-a2e8-41e5-9651-{0:012x}'.format(osd_id),
+                'up': 1,
+                'in': 1,
+                'weight': 1.0,
+                'public_addr': '{0}:{1}/1234'.format(ip, 6800 + osd_id % osds_per_host * 2),
+                'cluster_addr': '{0}:{1}/1234'.format(ip, 6801 + osd_id % osds_per_host * 2),
+            })
+            nodes.append({'id': osd_id, 'name': 'osd.{0}'.format(osd_id), 'type': 'osd',
+                          'device_class': random.choice(['hdd', 'ssd'])})
+            metadata[str(osd_id)] = {'hostname': name, 'osd_objectstore': 'bluestore'}
+            used = random.randint(0, 4 << 30)
+            osd_stats.append({'osd': osd_id, 'kb': 4 << 30, 'kb_used': used,
+                              'kb_avail': (4 << 30) - used})
+    for pg in range(count * 100 // 3):
+        acting = random.sample(range(count), min(3, count))
+        pg_stats.append({'pgid': '1.{0:x}'.format(pg), 'acting': acting,
+                         'acting_primary': acting[0]})
+
+    osd_map = types.OsdMap({'osds': osds, 'pools': [], 'tree': {'nodes': nodes},
+                            'osd_metadata': metadata})
+    stats = types.OsdStats({'osd_stats': osd_stats, 'pg_stats': pg_stats})
+    return osd_map, stats
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return result, (time.time() - start) * 1000
+
+
+def bench(types, count):
+    osd_map, osd_stats = make_cluster(types, count)
+
+    store, build = timed(build_osd_table, osd_map)
+    _, resort = timed(OidStore, list(store))
+    source = EMPTY_SNAPSHOT._replace(osd_stats=Deferred(lambda: osd_stats))
+    store = store.with_source(source)
+    encoded, encode = timed(store.encode)
+
+    data = copy.deepcopy(osd_map.data)
+    data['osds'][count // 2]['up'] = 0
+    changed = build_osd_table(types.OsdMap(data)).with_source(source)
+    reencoded, reencode = timed(changed.encode, store)
+
+    used = store.index(OSD_MAP_ENTRY + (14, count // 2))
+    _, first_get = timed(store.varbinds, used, used + 1)
+    start = store.index(OSD_MAP_ENTRY + (13, 0))
+    end = store.index(OSD_MAP_ENTRY + (18, 0))
+    _, lazy_walk = timed(store.varbinds, start, end)
+
+    print("{0:>7} OSDs {1:>8} objects  build {2:8.1f} ms  (sorted build {3:8.1f} ms)  "
+          "encode {4:8.1f} ms  re-encode {5:8.1f} ms ({6} varbinds)  "
+          "lazy get {7:6.1f} ms  lazy walk {8:8.1f} ms".format(
+              count, len(store), build, resort, encode, reencode, reencoded,
+              first_get, lazy_walk))
+
+
+def main(argv):
+    types = load_types()
+    counts = [int(a) for a in argv[1:]] or [1000, 10000, 50000]
+    for count in counts:
+        bench(types, count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,59 @@
+"""
+Benchmark the cost of the perf probes against the 1 microsecond target.
+
+    python tests/benchperf.py [probe count]
+
+Times one million probes by default: a counter increment, and a clock pair
+around nothing followed by an observe() into a histogram, which is what the
+probes in the module do.
+"""
+import sys
+
+import _path
+
+import time
+
+from perf import PerfCounters, clock
+
+TARGET = 1000.0
+
+
+def bench_loop(count):
+    start = time.time()
+    for _ in range(count):
+        pass
+    return time.time() - start
+
+
+def bench_inc(perf, count):
+    start = time.time()
+    for _ in range(count):
+        perf.inc('traps.clusterCheck')
+    return time.time() - start
+
+
+def bench_observe(perf, count):
+    start = time.time()
+    for _ in range(count):
+        probe = clock()
+        perf.observe('get.osd_map', clock() - probe)
+    return time.time() - start
+
+
+def report(name, elapsed, loop, count):
+    ns = (elapsed - loop) * 1e9 / count
+    print("{0:<16} {1:8.1f} ns per probe{2}".format(
+        name, ns, '' if ns < TARGET else '  ABOVE TARGET'))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 1000000
+    perf = PerfCounters()
+    loop = bench_loop(count)
+    report('inc', bench_inc(perf, count), loop, count)
+    report('clock+observe', bench_observe(perf, count), loop, count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,239 @@
+"""
+Benchmark the hot paths of the module on a synthetic cluster, as JSON.
+
+    python tests/benchsuite.py [--osds N ...] [--runs N] [--output FILE]
+                               [--compare BASELINE] [benchmark ...]
+
+Builds a SyntheticCluster (see synthmaps.py) of every requested size, 1,000
+and 10,000 OSDs by default, and times the OsdMap construction,
+osds_by_rule_id, osds_by_pool, osd_pools, process_health of module.py on top
+of the mgr stand-in (see _path.py), and the encoding of the traps and of the
+heartbeat in every SNMP version. Every benchmark runs --runs times and
+reports its best, median and mean time in milliseconds, or the error it
+failed with, which makes the exit status 1.
+
+The report is written as JSON to stdout or --output. Given the report of a
+previous run with --compare, the ratio of every median to the baseline one
+is added, and the benchmarks more than 10% slower are listed on stderr.
+"""
+import sys
+
+from _path import load_types, import_module
+
+import argparse
+import json
+import platform
+import time
+
+from synthmaps import SyntheticCluster, FSID
+
+REGRESSION = 1.10
+MESSAGE = '2018-01-01 00:00:00 Ceph Manager SNMP Handler - Cluster status changed to HEALTH_WARN'
+
+
+def osd_map_data(cluster):
+    """
+    The data get_sync_object(OsdMap) builds from the mgr
+    """
+    data = cluster.get('osd_map')
+    data['tree'] = cluster.get('osd_map_tree')
+    data['crush'] = cluster.get('osd_map_crush')
+    data['crush_map_text'] = cluster.get('osd_map_crush_map_text')
+    data['osd_metadata'] = cluster.get('osd_metadata')
+    return data
+
+
+def measure(runs, function, setup=None):
+    """
+    Milliseconds of every run of function(setup())
+    """
+    times = []
+    for _ in range(runs):
+        arg = setup() if setup is not None else None
+        start = time.time()
+        function(arg)
+        times.append((time.time() - start) * 1000)
+    times.sort()
+    return {'runs': runs, 'best_ms': times[0], 'median_ms': times[len(times) // 2],
+            'mean_ms': sum(times) / len(times)}
+
+
+def bench_osd_map(types, cluster, runs):
+    data = osd_map_data(cluster)
+    fresh = lambda: types.OsdMap(data)
+
+    def by_pool_setup():
+        osd_map = fresh()
+        osd_map.osds_by_rule_id
+        return osd_map
+
+    def pools_setup():
+        osd_map = fresh()
+        osd_map.osds_by_pool
+        return osd_map
+
+    return {
+        'osdmap.build': measure(runs, lambda _: types.OsdMap(data)),
+        'osdmap.osds_by_rule_id': measure(runs, lambda osd_map: osd_map.osds_by_rule_id, fresh),
+        'osdmap.osds_by_pool': measure(runs, lambda osd_map: osd_map.osds_by_pool, by_pool_setup),
+        'osdmap.osd_pools': measure(runs, lambda osd_map: osd_map.osd_pools, pools_setup),
+    }
+
+
+def bench_process_health(cluster, runs):
+    """
+    process_health of a Module answering get() from the cluster, on every
+    run from an OK cluster to a degraded one
+    """
+    try:
+        module = import_module()
+    except ImportError as e:
+        return {'process_health': {'error': 'module.py cannot be imported: {0}'.format(e)}}
+
+    class SyntheticModule(module.Module):
+        def get(self, data_name):
+            return cluster.get(data_name)
+
+        def send_health_trap(self, status):
+            pass
+
+    try:
+        instance = SyntheticModule('snmphandler', None, None)
+        module._global_instance['plugin'] = instance
+
+        def setup():
+            instance.clusterHealth = {'status': 'HEALTH_OK'}
+            cluster.health_status = 'HEALTH_WARN' if cluster.health_status == 'HEALTH_OK' \
+                else 'HEALTH_OK'
+        return {'process_health': measure(runs, lambda _: instance.process_health(), setup)}
+    except Exception as e:
+        return {'process_health': {'error': '{0}: {1}'.format(type(e).__name__, e)}}
+
+
+def bench_traps(runs):
+    from heartbeat import Heartbeat
+    from notification import Notifier
+    import usm
+
+    results = {}
+    level = usm.LEVELS['authPriv'] if usm.AES is not None else usm.LEVELS['authNoPriv']
+    config = {'engine': '0x8000000001020304', 'boots': 1, 'start': time.time(),
+              'users': [{'name': 'ceph', 'level': 'authPriv', 'auth': 'SHA:cephpassword',
+                         'priv': 'AES:cephpassword'}]}
+    engine = usm.Usm.from_config(config)
+    for version in ('1', '2c', '3'):
+        notifier = Notifier('127.0.0.1', 162, version, 'public', FSID,
+                            usm=engine if version == '3' else None, user='ceph', level=level)
+        heartbeat = Heartbeat(notifier)
+        # Encoding many of them per run, one takes a few microseconds
+        results['trap.encode.v' + version] = measure(runs, lambda _: [
+            notifier.encode('clusterWarn', notifier.trap_varbinds(1, MESSAGE, 42))
+            for _ in range(1000)])
+        results['trap.encode.v' + version]['per'] = 1000
+        results['heartbeat.encode.v' + version] = measure(runs, lambda _: [
+            heartbeat.encode(0) for _ in range(1000)])
+        results['heartbeat.encode.v' + version]['per'] = 1000
+        notifier.close()
+    return results
+
+
+def run(args):
+    types = load_types()
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.time(),
+        'runs': args.runs,
+        'clusters': [],
+    }
+    wanted = lambda name: not args.benchmarks or any(name.startswith(b) for b in args.benchmarks)
+    for osds in args.osds:
+        cluster = SyntheticCluster(osds, pools=args.pools, rules=args.rules)
+        results = {}
+        results.update(bench_osd_map(types, cluster, args.runs))
+        if wanted('process_health'):
+            results.update(bench_process_health(cluster, args.runs))
+        report['clusters'].append({'scale': cluster.scale(), 'results': dict(
+            (name, result) for name, result in results.items() if wanted(name))})
+    if wanted('trap') or wanted('heartbeat'):
+        report['traps'] = dict((name, result) for name, result in bench_traps(args.runs).items()
+                               if wanted(name))
+    return report
+
+
+def results_of(report):
+    """
+    (benchmark, OSD count or None) to result
+    """
+    results = {}
+    for cluster in report.get('clusters', []):
+        for name, result in cluster['results'].items():
+            results[(name, cluster['scale']['osds'])] = result
+    for name, result in report.get('traps', {}).items():
+        results[(name, None)] = result
+    return results
+
+
+def compare(report, baseline):
+    """
+    Add the ratio of every median to the baseline one, and return the
+    benchmarks slower than REGRESSION times the baseline
+    """
+    before = results_of(baseline)
+    slower = []
+    for key, result in results_of(report).items():
+        old = before.get(key)
+        if not old or 'median_ms' not in old or 'median_ms' not in result or not old['median_ms']:
+            continue
+        result['baseline_ratio'] = result['median_ms'] / old['median_ms']
+        if result['baseline_ratio'] > REGRESSION:
+            slower.append((key, result['baseline_ratio']))
+    return sorted(slower)
+
+
+def errors_of(report):
+    """
+    (benchmark, OSD count or None) to the error of every failed benchmark
+    """
+    return dict((key, result['error']) for key, result in results_of(report).items()
+                if 'error' in result)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the module hot paths')
+    parser.add_argument('--osds', type=int, action='append')
+    parser.add_argument('--pools', type=int, default=8)
+    parser.add_argument('--rules', type=int, default=2)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    parser.add_argument('benchmarks', nargs='*')
+    args = parser.parse_args(argv[1:])
+    args.osds = args.osds or [1000, 10000]
+
+    report = run(args)
+    errors = errors_of(report)
+    for (name, osds), error in sorted(errors.items()):
+        sys.stderr.write("{0}{1} failed: {2}\n".format(
+            name, ' ({0} OSDs)'.format(osds) if osds else '', error))
+    status = 1 if errors else 0
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(report, json.load(f))
+        for (name, osds), ratio in slower:
+            sys.stderr.write("{0}{1} {2:.2f}x slower than the baseline\n".format(
+                name, ' ({0} OSDs)'.format(osds) if osds else '', ratio))
+        status = 1 if slower or errors else 0
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write('\n')
+    finally:
+        if args.output:
+            output.close()
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
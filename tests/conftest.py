@@ -0,0 +1,5 @@
+#
+# The unit tests import the files of the module by their plain names, see
+# _path.py
+#
+import _path
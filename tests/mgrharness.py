@@ -0,0 +1,185 @@
+"""
+Replay a notify stream against the module outside of the mgr.
+
+    python tests/mgrharness.py (--capture FILE | --synthetic OSDS [--events N]
+                               [--interval SECONDS] [--save FILE])
+                               [--speed X] [--no-serve] [--option NAME=VALUE ...]
+
+The module is imported with the mgr_module stand-in of tests/mockmgr, whose
+get() answers from the payloads of the capture. A capture is what
+`ceph snmp record start` writes on a live module (see recorder.py), or one
+synthesized from a SyntheticCluster (see synthmaps.py): a PG summary every
+--interval seconds and OSDs going down and back up every 10 of them.
+
+Every notification is delivered at its recorded time divided by --speed (1
+to 1000 times faster, or as fast as possible with 0), after the payloads the
+module fetched until the next one are made available. Unless --no-serve, the
+serve loop of the module runs meanwhile, with its traps sent without the
+tools to a TrapSink (see trapsink.py). The report printed as JSON has the
+latency of notify() by notification type, how late the replay fell behind
+the schedule, the perf counters of the module and what the sink received.
+"""
+import os
+import sys
+
+from _path import import_module
+
+import argparse
+import json
+import logging
+import tempfile
+import threading
+import time
+
+
+def synthesize(path, osds, events, interval):
+    """
+    Write the capture of a SyntheticCluster of osds OSDs
+    """
+    from recorder import Recorder
+    from synthmaps import SyntheticCluster, DATA_NAMES, FSID
+
+    cluster = SyntheticCluster(osds)
+    recorder = Recorder(path, FSID, clock=lambda: 0.0)
+    for name in DATA_NAMES:
+        recorder.get(name, cluster.get(name), 0.0)
+    for tick in range(events):
+        now = tick * interval
+        if tick % 10 in (5, 9):
+            if tick % 10 == 5:
+                cluster.change(down=max(1, osds // 100), degraded=osds)
+            else:
+                cluster.change(up=osds)
+            recorder.notify('osd_map', '', now)
+            for name in ('osd_map', 'osd_map_tree', 'osd_map_crush', 'osd_map_crush_map_text',
+                         'osd_metadata'):
+                recorder.get(name, cluster.get(name), now + 0.001)
+            recorder.notify('health', '', now + 0.002)
+            recorder.get('health', cluster.health(), now + 0.003)
+        recorder.notify('pg_summary', '', now + 0.004)
+        for name in ('pg_summary', 'df', 'osd_stats'):
+            recorder.get(name, cluster.get(name), now + 0.005)
+    recorder.close()
+    return path
+
+
+class Replay(object):
+    def __init__(self, instance, backend, events, speed=1.0, clock=time.time, sleep=time.sleep):
+        self.instance = instance
+        self.backend = backend
+        self.speed = speed
+        self.clock = clock
+        self.sleep = sleep
+        # The payloads as JSON text, so a get() costs what it costs in the mgr
+        self.events = [dict(event, data=json.dumps(event['data'])) if 'data' in event else event
+                       for event in events]
+        self.latencies = {}
+        self.errors = {}
+        self.max_lag = 0.0
+        self.elapsed = 0.0
+
+    def run(self):
+        events = self.events
+        notifies = [index for index, event in enumerate(events) if 'notify' in event]
+        applied = 0
+        first = events[notifies[0]]['t'] if notifies else 0.0
+        start = self.clock()
+        for position, index in enumerate(notifies):
+            event = events[index]
+            if self.speed:
+                delay = start + (event['t'] - first) / self.speed - self.clock()
+                if delay > 0:
+                    self.sleep(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+            end = notifies[position + 1] if position + 1 < len(notifies) else len(events)
+            while applied < end:
+                if 'data' in events[applied]:
+                    self.backend.set_text(events[applied]['get'], events[applied]['data'])
+                applied += 1
+            begin = self.clock()
+            try:
+                self.instance.notify(event['notify'], event.get('id'))
+            except Exception as e:
+                self.errors.setdefault(event['notify'], '{0}: {1}'.format(type(e).__name__, e))
+            self.latencies.setdefault(event['notify'], []).append(self.clock() - begin)
+        self.elapsed = self.clock() - start
+        return self.elapsed
+
+    def report(self):
+        notifies = {}
+        for notify_type, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            at = lambda fraction: latencies[min(len(latencies) - 1,
+                                                int(fraction * len(latencies)))] * 1000
+            notifies[notify_type] = {'count': len(latencies), 'p50_ms': at(0.5),
+                                     'p99_ms': at(0.99), 'max_ms': latencies[-1] * 1000,
+                                     'error': self.errors.get(notify_type)}
+        return {'elapsed': self.elapsed, 'speed': self.speed, 'max_lag': self.max_lag,
+                'gets': self.backend.gets, 'notifies': notifies}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Replay a notify stream against the module')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--capture')
+    source.add_argument('--synthetic', type=int, metavar='OSDS')
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--save')
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--no-serve', dest='serve', action='store_false')
+    parser.add_argument('--option', action='append', default=[])
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv[1:])
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.CRITICAL)
+
+    from recorder import load
+    from trapsink import TrapSink
+
+    path = args.capture
+    if path is None:
+        path = args.save or os.path.join(tempfile.mkdtemp(), 'synthetic.capture.gz')
+        synthesize(path, args.synthetic, args.events, args.interval)
+    header, events = load(path)
+
+    sink = TrapSink('127.0.0.1', 0)
+    sink.start()
+    config = {'trap_addr': '127.0.0.1', 'trap_port': str(sink.address[1]),
+              'trap_using_tools': '0', 'snmp_version': '2c'}
+    config.update(option.split('=', 1) for option in args.option)
+
+    module = import_module()
+    import mgr_module
+    backend = mgr_module.install(mgr_module.Backend(config))
+    instance = module.Module('snmphandler', None, None)
+
+    serve = None
+    if args.serve:
+        serve = threading.Thread(target=instance.serve, name='mgr-serve')
+        serve.daemon = True
+        serve.start()
+    replay = Replay(instance, backend, events, args.speed)
+    replay.run()
+    if serve is not None:
+        # Let the PG summary thread take the last one before stopping
+        deadline = time.time() + 5.0
+        while instance.pg_summary_pending.is_set() and time.time() < deadline:
+            time.sleep(0.05)
+        instance.shutdown()
+        serve.join(5.0)
+    sink.stop()
+
+    report = replay.report()
+    report['capture'] = {'path': path, 'events': len(events), 'start': header.get('start'),
+                         'duration': events[-1]['t'] - events[0]['t'] if events else 0.0}
+    report['perf'] = instance.perf.dump()
+    report['pg_summaries'] = dict(instance.pg_summaries)
+    report['sink'] = sink.report()
+    json.dump(report, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
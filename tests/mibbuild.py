@@ -0,0 +1,111 @@
+"""
+Regenerate mibs/SNMPHANDLER-MIB.py from SNMPHANDLER-MIB.txt.
+
+    python tests/mibbuild.py [--source DIR|URL ...] [--check]
+
+Compiles SNMPHANDLER-MIB.txt with pysmi into the pysnmp form the module
+loads from mibs/ (see mib.py), to be run whenever the MIB changes. pysmi
+needs the ASN.1 source of the MIBs SNMPHANDLER-MIB imports to resolve its
+symbols, looked for in every --source, /usr/share/snmp/mibs by default, a
+directory or an URL such as http://mibs.snmplabs.com/asn1/@mib@. Only
+SNMPHANDLER-MIB is written, pysnmp ships the MIBs it imports.
+
+With --check nothing is written: the exit status is 1 when mibs/ is not what
+SNMPHANDLER-MIB.txt compiles into, or when the OIDs snmptrap is given (see
+mib.py) are not those of the MIB.
+"""
+import os
+import sys
+
+from _path import here
+
+import argparse
+import shutil
+import tempfile
+
+from pysmi.codegen import PySnmpCodeGen
+from pysmi.compiler import MibCompiler
+from pysmi.parser import SmiStarParser
+from pysmi.reader import FileReader, getReadersFromUrls
+from pysmi.searcher import StubSearcher
+from pysmi.writer import PyFileWriter
+from pysnmp.smi import builder
+
+from mib import MIB_NAME, MIB_DIR, SNMPTRAP_OIDS, mib_builder
+
+DEFAULT_SOURCES = ['/usr/share/snmp/mibs']
+
+
+def compile_mib(sources, dest):
+    """
+    Compile SNMPHANDLER-MIB.txt into dest, returns the status of every MIB
+    pysmi looked at
+    """
+    compiler = MibCompiler(SmiStarParser(), PySnmpCodeGen(),
+                           PyFileWriter(dest).setOptions(pyCompile=False))
+    compiler.addSources(FileReader(here, recursive=False))
+    compiler.addSources(*getReadersFromUrls(*sources))
+    compiler.addSearchers(StubSearcher(*PySnmpCodeGen.baseMibs))
+    return compiler.compile(MIB_NAME, rebuild=True, noDeps=True, genTexts=False)
+
+
+def symbols_of(directory):
+    """
+    The class, OID and syntax of every symbol of the SNMPHANDLER-MIB in
+    directory, which pysmi does not always write in the same order
+    """
+    loaded = builder.MibBuilder()
+    loaded.addMibSources(builder.DirMibSource(directory))
+    loaded.loadModules(MIB_NAME)
+    return dict((name, (type(symbol).__name__, getattr(symbol, 'name', None),
+                        repr(getattr(symbol, 'syntax', None))))
+                for name, symbol in loaded.mibSymbols[MIB_NAME].items())
+
+
+def check_oids():
+    """
+    The names in SNMPTRAP_OIDS with another OID in the MIB
+    """
+    loaded = mib_builder()
+    wrong = []
+    for name, oid in sorted(SNMPTRAP_OIDS.items()):
+        node, = loaded.importSymbols(MIB_NAME, name)
+        if oid != '.' + '.'.join(str(n) for n in node.getName()):
+            wrong.append(name)
+    return wrong
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Regenerate mibs/SNMPHANDLER-MIB.py')
+    parser.add_argument('--source', action='append')
+    parser.add_argument('--check', action='store_true')
+    args = parser.parse_args(argv[1:])
+
+    dest = tempfile.mkdtemp()
+    try:
+        status = compile_mib(args.source or DEFAULT_SOURCES, dest)
+        if status.get(MIB_NAME) != 'compiled':
+            error = getattr(status.get(MIB_NAME), 'error', None)
+            sys.stderr.write("{0} not compiled: {1}\n".format(MIB_NAME, error or status))
+            return 1
+        compiled = os.path.join(dest, MIB_NAME + '.py')
+        shipped = os.path.join(MIB_DIR, MIB_NAME + '.py')
+        if not args.check:
+            shutil.copyfile(compiled, shipped)
+            sys.stdout.write("{0} written\n".format(shipped))
+        elif not os.path.exists(shipped) or symbols_of(dest) != symbols_of(MIB_DIR):
+            sys.stderr.write("{0} is not what {1}.txt compiles into\n".format(shipped, MIB_NAME))
+            return 1
+    finally:
+        shutil.rmtree(dest)
+
+    wrong = check_oids()
+    if wrong:
+        sys.stderr.write("OIDs given to snmptrap not those of {0}: {1}\n".format(
+            MIB_NAME, ', '.join(wrong)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,130 @@
+"""
+Stand-in for the mgr_module of ceph-mgr, to run the module outside of it.
+
+Only what the module uses is there. Everything a MgrModule asks the mgr for,
+the options, the KV store and the get() payloads, comes from a Backend, the
+one given to install() when the module instance is built. get() returns a
+fresh copy of the payload on every call, like the mgr converting its maps.
+See tests/mgrharness.py.
+"""
+import json
+import logging
+
+
+class Backend(object):
+    def __init__(self, config=None):
+        self.config = dict(config or {})
+        self.store = {}
+        # The JSON text of the payloads of get()
+        self.payloads = {}
+        self.servers = []
+        self.perf_counters = {}
+        self.mon_connection = True
+        self.gets = 0
+
+    def set(self, data_name, data):
+        self.payloads[data_name] = json.dumps(data)
+
+    def set_text(self, data_name, text):
+        self.payloads[data_name] = text
+
+    def get(self, data_name):
+        self.gets += 1
+        text = self.payloads.get(data_name)
+        return json.loads(text) if text is not None else None
+
+
+_backend = {'current': Backend()}
+
+
+def install(backend):
+    """
+    Answer the calls of the instances built from now on from backend
+    """
+    _backend['current'] = backend
+    return backend
+
+
+class _MgrBase(object):
+    COMMANDS = []
+    MODULE_OPTIONS = []
+
+    def __init__(self, module_name='snmphandler', py_modules_ptr=None, this_ptr=None):
+        self.module_name = module_name
+        self.backend = _backend['current']
+        self.log = logging.getLogger(module_name)
+
+    def get_localized_config(self, key, default=None):
+        return self.backend.config.get(key, default)
+
+    def get_config(self, key, default=None):
+        return self.backend.config.get(key, default)
+
+    def set_config(self, key, value):
+        self.backend.config[key] = value
+
+    def get_store(self, key, default=None):
+        return self.backend.store.get(key, default)
+
+    def set_store(self, key, value):
+        self.backend.store[key] = value
+
+    def get_mgr_id(self):
+        return 'x'
+
+
+class MgrModule(_MgrBase):
+    def get(self, data_name):
+        return self.backend.get(data_name)
+
+    def have_mon_connection(self):
+        return self.backend.mon_connection
+
+    def list_servers(self):
+        return list(self.backend.servers)
+
+    def get_server(self, hostname):
+        for server in self.backend.servers:
+            if server.get('hostname') == hostname:
+                return server
+        return None
+
+    def get_all_perf_counters(self):
+        return self.backend.perf_counters
+
+    def notify(self, notify_type, notify_id):
+        pass
+
+    def serve(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class MgrStandbyModule(_MgrBase):
+    def get_active_uri(self):
+        return ''
+
+    def serve(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class CommandResult(object):
+    def __init__(self, tag=None):
+        self.tag = tag
+        self.result = (0, '', '')
+
+    def complete(self, r, outb, outs):
+        self.result = (r, outb, outs)
+
+    def wait(self):
+        return self.result
+
+
+class CRUSHMap(object):
+    def __init__(self, ceph_crushmap=None):
+        self.data = {}
@@ -0,0 +1,272 @@
+"""
+Synthetic cluster maps for the benchmarks.
+
+    python tests/synthmaps.py [--osds N] [--hosts N] [--racks N] [--pools N]
+                              [--rules N] [--seed N] [data name ...]
+
+A SyntheticCluster builds what the mgr get() returns for osd_map,
+osd_map_tree, osd_map_crush, osd_map_crush_map_text, osd_metadata, health,
+mon_map, pg_summary, df and osd_stats, for a cluster of the given size: OSDs
+spread over hosts spread over racks under a default root, replicated rules
+choosing hosts or racks, and pools using them. It is seeded, so the same
+arguments always give the same cluster. Run on its own it prints the payloads
+as JSON.
+"""
+import sys
+
+import _path
+
+import argparse
+import copy
+import json
+import random
+
+FSID = '5a0d6e16-7b2a-4a5e-9d4e-8c1f2b3a4d5e'
+DEVICE_CLASSES = ('hdd', 'ssd')
+PG_STATES = ('active+clean', 'active+clean+scrubbing', 'active+undersized+degraded',
+             'active+remapped+backfilling', 'peering')
+HEALTH_CHECKS = {
+    'OSD_DOWN': ('HEALTH_WARN', '{0} osds down'),
+    'PG_DEGRADED': ('HEALTH_WARN', 'Degraded data redundancy: {0} pgs degraded'),
+    'POOL_FULL': ('HEALTH_ERR', '{0} pool(s) full'),
+}
+DATA_NAMES = ('osd_map', 'osd_map_tree', 'osd_map_crush', 'osd_map_crush_map_text',
+              'osd_metadata', 'health', 'mon_map', 'pg_summary', 'df', 'osd_stats')
+
+
+class SyntheticCluster(object):
+    def __init__(self, osds=1000, hosts=None, racks=None, pools=8, rules=2, mons=3,
+                 pgs_per_osd=100, seed=0):
+        self.osd_count = osds
+        self.host_count = hosts or max(1, osds // 20)
+        self.rack_count = racks or max(1, self.host_count // 10)
+        self.pool_count = pools
+        self.rule_count = rules
+        self.mon_count = mons
+        self.pg_count = max(pools, osds * pgs_per_osd // 3)
+        self.random = random.Random(seed)
+        self.epoch = 1
+        self.health_status = 'HEALTH_OK'
+        self.build()
+
+    def scale(self):
+        return {'osds': self.osd_count, 'hosts': self.host_count, 'racks': self.rack_count,
+                'pools': self.pool_count, 'rules': self.rule_count, 'pgs': self.pg_count}
+
+    def build(self):
+        rand = self.random
+        nodes = [{'id': -1, 'name': 'default', 'type': 'root', 'type_id': 10, 'children': []}]
+        racks = []
+        for rack in range(self.rack_count):
+            node = {'id': -2 - rack, 'name': 'rack{0}'.format(rack), 'type': 'rack',
+                    'type_id': 3, 'children': []}
+            nodes[0]['children'].append(node['id'])
+            racks.append(node)
+            nodes.append(node)
+        self.osds = []
+        self.metadata = {}
+        first_host = -2 - self.rack_count
+        for host in range(self.host_count):
+            name = 'node{0}'.format(host)
+            ids = list(range(host * self.osd_count // self.host_count,
+                             (host + 1) * self.osd_count // self.host_count))
+            node = {'id': first_host - host, 'name': name, 'type': 'host', 'type_id': 1,
+                    'children': ids}
+            racks[host % self.rack_count]['children'].append(node['id'])
+            nodes.append(node)
+            ip = '10.{0}.{1}.{2}'.format(host // 65536, (host // 256) % 256, host % 256)
+            for index, osd_id in enumerate(ids):
+                device_class = rand.choice(DEVICE_CLASSES)
+                self.osds.append({
+                    'osd': osd_id,
+                    'uuid': '6905e6ea-a2e8-41e5-9651-{0:012x}'.format(osd_id),
+                    'up': 1,
+                    'in': 1,
+                    'weight': 1.0,
+                    'primary_affinity': 1.0,
+                    'up_from': 1,
+                    'up_thru': 1,
+                    'down_at': 0,
+                    'public_addr': '{0}:{1}/1234'.format(ip, 6800 + index * 2),
+                    'cluster_addr': '{0}:{1}/1234'.format(ip, 6801 + index * 2),
+                    'state': ['exists', 'up'],
+                })
+                nodes.append({'id': osd_id, 'name': 'osd.{0}'.format(osd_id), 'type': 'osd',
+                              'type_id': 0, 'device_class': device_class,
+                              'crush_weight': 3.6, 'depth': 3, 'exists': 1, 'status': 'up',
+                              'reweight': 1.0, 'primary_affinity': 1.0})
+                self.metadata[str(osd_id)] = {
+                    'id': osd_id, 'hostname': name, 'osd_objectstore': 'bluestore',
+                    'osd_data': '/var/lib/ceph/osd/ceph-{0}'.format(osd_id),
+                    'ceph_version': 'ceph version 12.2.13 luminous (stable)',
+                    'default_device_class': device_class,
+                    'front_addr': '{0}:{1}/1234'.format(ip, 6800 + index * 2),
+                }
+        self.nodes = nodes
+
+        self.rules = []
+        for rule_id in range(self.rule_count):
+            failure_domain = 'host' if rule_id % 2 == 0 else 'rack'
+            self.rules.append({
+                'rule_id': rule_id, 'rule_name': 'replicated_{0}'.format(failure_domain),
+                'ruleset': rule_id, 'type': 1, 'min_size': 1, 'max_size': 10,
+                'steps': [{'op': 'take', 'item': -1, 'item_name': 'default'},
+                          {'op': 'chooseleaf_firstn', 'num': 0, 'type': failure_domain},
+                          {'op': 'emit'}],
+            })
+
+        self.pools = []
+        for pool_id in range(1, self.pool_count + 1):
+            rule_id = (pool_id - 1) % self.rule_count
+            self.pools.append({
+                'pool': pool_id, 'pool_name': 'pool{0}'.format(pool_id), 'size': 3,
+                'min_size': 2, 'crush_rule': rule_id, 'crush_ruleset': rule_id,
+                'pg_num': self.pg_count // self.pool_count,
+                'pg_placement_num': self.pg_count // self.pool_count, 'type': 1,
+                'flags_names': 'hashpspool', 'application_metadata': {'rbd': {}},
+            })
+
+    def change(self, down=0, degraded=0, up=0):
+        """
+        Take down OSDs, bring some back up and degrade PGs, the next payloads
+        reflect it
+        """
+        running = [osd for osd in self.osds if osd['up']]
+        for osd in self.random.sample(running, min(down, len(running))):
+            osd['up'] = 0
+            osd['state'] = ['exists']
+        stopped = [osd for osd in self.osds if not osd['up']]
+        for osd in self.random.sample(stopped, min(up, len(stopped))):
+            osd['up'] = 1
+            osd['state'] = ['exists', 'up']
+        self.degraded = degraded
+        self.epoch += 1
+        down = len(self.osds) - len([osd for osd in self.osds if osd['up']])
+        self.health_status = 'HEALTH_WARN' if down or degraded else 'HEALTH_OK'
+
+    def osd_map(self):
+        return {'epoch': self.epoch, 'fsid': FSID, 'flags': 'sortbitwise,recovery_deletes',
+                'max_osd': self.osd_count, 'osds': copy.deepcopy(self.osds),
+                'pools': copy.deepcopy(self.pools), 'osd_xinfo': [], 'pg_upmap': [],
+                'pg_upmap_items': [], 'pg_temp': [], 'primary_temp': [], 'blacklist': {},
+                'erasure_code_profiles': {}}
+
+    def osd_map_tree(self):
+        return {'nodes': copy.deepcopy(self.nodes), 'stray': []}
+
+    def osd_map_crush(self):
+        buckets = [{'id': node['id'], 'name': node['name'], 'type_name': node['type'],
+                    'type_id': node['type_id'], 'alg': 'straw2', 'hash': 'rjenkins1',
+                    'items': [{'id': child, 'weight': 235929, 'pos': pos}
+                              for pos, child in enumerate(node['children'])]}
+                   for node in self.nodes if node['id'] < 0]
+        return {'devices': [{'id': osd['osd'], 'name': 'osd.{0}'.format(osd['osd'])}
+                            for osd in self.osds],
+                'types': [{'type_id': 0, 'name': 'osd'}, {'type_id': 1, 'name': 'host'},
+                          {'type_id': 3, 'name': 'rack'}, {'type_id': 10, 'name': 'root'}],
+                'buckets': buckets, 'rules': copy.deepcopy(self.rules), 'tunables': {},
+                'choose_args': {}}
+
+    def osd_map_crush_map_text(self):
+        lines = ['# devices']
+        lines.extend('device {0} osd.{0}'.format(osd['osd']) for osd in self.osds)
+        return '\n'.join(lines) + '\n'
+
+    def osd_metadata(self):
+        return copy.deepcopy(self.metadata)
+
+    def health(self):
+        checks = {}
+        if self.health_status != 'HEALTH_OK':
+            down = len([osd for osd in self.osds if not osd['up']])
+            for name, count in (('OSD_DOWN', down), ('PG_DEGRADED', getattr(self, 'degraded', 0))):
+                if count:
+                    severity, message = HEALTH_CHECKS[name]
+                    checks[name] = {'severity': severity,
+                                    'summary': {'message': message.format(count)}}
+        return {'json': json.dumps({'status': self.health_status, 'checks': checks})}
+
+    def mon_map(self):
+        return {'epoch': 1, 'fsid': FSID, 'modified': '2018-01-01 00:00:00.000000',
+                'created': '2018-01-01 00:00:00.000000',
+                'mons': [{'rank': rank, 'name': 'mon{0}'.format(rank),
+                          'addr': '10.255.0.{0}:6789/0'.format(rank + 1),
+                          'public_addr': '10.255.0.{0}:6789/0'.format(rank + 1)}
+                         for rank in range(self.mon_count)]}
+
+    def pg_summary(self):
+        rand = self.random
+        degraded = getattr(self, 'degraded', 0)
+        by_pool = {}
+        everything = {}
+        for pool in self.pools:
+            states = {}
+            count = pool['pg_num']
+            for state in PG_STATES[1:]:
+                share = rand.randint(0, count // 50) if state != 'active+undersized+degraded' \
+                    else min(count, degraded // self.pool_count)
+                states[state] = share
+                count -= share
+            states[PG_STATES[0]] = count
+            states = dict((state, n) for state, n in states.items() if n > 0)
+            by_pool[str(pool['pool'])] = states
+            for state, n in states.items():
+                everything[state] = everything.get(state, 0) + n
+        by_osd = dict((str(osd['osd']), {'active+clean': self.pg_count * 3 // self.osd_count})
+                      for osd in self.osds)
+        return {'by_pool': by_pool, 'all': everything, 'by_osd': by_osd}
+
+    def df(self):
+        # The pools fill up by 1% of their space on every change()
+        pools = []
+        for pool in self.pools:
+            size = 100 << 40
+            used = (size // 10 + self.epoch * size // 100) % size
+            objects = used // (4 << 20)
+            pools.append({'id': pool['pool'], 'name': pool['pool_name'], 'stats': {
+                'bytes_used': used, 'kb_used': used >> 10, 'max_avail': size - used,
+                'objects': objects, 'rd': objects * 3, 'wr': objects * 2,
+                'rd_bytes': used * 3, 'wr_bytes': used * 2, 'percent_used': float(used) / size}})
+        total = (4 << 40) * self.osd_count
+        used = sum(pool['stats']['bytes_used'] for pool in pools) * 3
+        return {'stats': {'total_bytes': total, 'total_used_bytes': used,
+                          'total_avail_bytes': total - used}, 'pools': pools}
+
+    def osd_stats(self):
+        rand = self.random
+        stats = []
+        for osd in self.osds:
+            used = rand.randint(1 << 30, 3 << 30)
+            stats.append({'osd': osd['osd'], 'kb': 4 << 30, 'kb_used': used,
+                          'kb_avail': (4 << 30) - used, 'hb_peers': [], 'num_pgs': 100})
+        return {'osd_stats': stats}
+
+    def get(self, data_name):
+        """
+        The payload of data_name, as the mgr get() returns it
+        """
+        if data_name not in DATA_NAMES:
+            raise KeyError(data_name)
+        return getattr(self, data_name)()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Print synthetic cluster map payloads')
+    parser.add_argument('--osds', type=int, default=1000)
+    parser.add_argument('--hosts', type=int)
+    parser.add_argument('--racks', type=int)
+    parser.add_argument('--pools', type=int, default=8)
+    parser.add_argument('--rules', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('names', nargs='*', default=list(DATA_NAMES))
+    args = parser.parse_args(argv[1:])
+    cluster = SyntheticCluster(args.osds, args.hosts, args.racks, args.pools, args.rules,
+                               seed=args.seed)
+    json.dump(dict((name, cluster.get(name)) for name in args.names), sys.stdout,
+              indent=1, sort_keys=True)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
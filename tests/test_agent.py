@@ -0,0 +1,156 @@
+"""
+agent.respond: GET, GETNEXT and GETBULK against a small store, in SNMPv1 and
+SNMPv2c, and the snapshots the WorkerPool dumps for its workers.
+"""
+import logging
+import os
+
+import pytest
+
+pytest.importorskip('pysnmp')
+
+import ber
+from ber import INTEGER, OCTET_STRING, COUNTER64, GAUGE32, NULL, END_OF_MIB_VIEW, \
+    NO_SUCH_INSTANCE, NO_ERROR, NO_SUCH_NAME, GET_REQUEST, GET_NEXT_REQUEST, \
+    GET_BULK_REQUEST
+from agent import respond, WorkerPool
+from oidstore import OidStore, MappedStore
+from snapshot import EMPTY_SNAPSHOT
+
+BASE = (1, 3, 6, 1, 4, 1, 50495)
+A = BASE + (1, 0)
+B = BASE + (2, 0)
+C = BASE + (3, 0)
+D = BASE + (4, 0)
+E = BASE + (5, 0)
+
+
+@pytest.fixture
+def store():
+    store = OidStore([(A, (INTEGER, 1)), (B, (COUNTER64, 2 ** 40)), (C, (OCTET_STRING, b'c')),
+                      (D, (GAUGE32, 4)), (E, (COUNTER64, 5))])
+    store.encode()
+    return store
+
+
+def varbinds(chunks):
+    """
+    (OID, syntax, raw value) of the encoded varbinds
+    """
+    data = bytearray(b''.join(chunk.tobytes() if isinstance(chunk, memoryview) else bytes(chunk)
+                              for chunk in chunks))
+    result = []
+    pos = 0
+    while pos < len(data):
+        _, start, pos = ber.decode_tlv(data, pos)
+        _, oid_start, oid_end = ber.decode_tlv(data, start)
+        tag, value_start, value_end = ber.decode_tlv(data, oid_end)
+        result.append((ber.decode_oid(data[oid_start:oid_end]), tag,
+                       bytes(data[value_start:value_end])))
+    return result
+
+
+def tags(chunks):
+    return [(oid, tag) for oid, tag, value in varbinds(chunks)]
+
+
+def test_get(store):
+    status, index, chunks = respond(store, False, GET_REQUEST, [A, BASE + (9, 0), B])
+    assert (status, index) == (NO_ERROR, 0)
+    assert tags(chunks) == [(A, INTEGER), (BASE + (9, 0), NO_SUCH_INSTANCE), (B, COUNTER64)]
+
+
+def test_getnext_end_of_view(store):
+    status, index, chunks = respond(store, False, GET_NEXT_REQUEST, [D, E, BASE + (9,)])
+    assert (status, index) == (NO_ERROR, 0)
+    assert tags(chunks) == [(E, COUNTER64), (E, END_OF_MIB_VIEW), (BASE + (9,), END_OF_MIB_VIEW)]
+
+
+def test_getnext_end_of_view_v1(store):
+    # SNMPv1 has no endOfMibView, the request fails on the OID past the end
+    status, index, chunks = respond(store, True, GET_NEXT_REQUEST, [A, BASE + (9,)])
+    assert (status, index) == (NO_SUCH_NAME, 2)
+    assert tags(chunks) == [(A, NULL), (BASE + (9,), NULL)]
+
+
+def test_v1_skips_counter64(store):
+    # Nothing but a Counter64 after D
+    status, index, chunks = respond(store, True, GET_NEXT_REQUEST, [A, D])
+    assert (status, index) == (NO_SUCH_NAME, 2)
+    status, index, chunks = respond(store, True, GET_NEXT_REQUEST, [A])
+    assert (status, tags(chunks)) == (NO_ERROR, [(C, OCTET_STRING)])
+    status, index, chunks = respond(store, True, GET_NEXT_REQUEST, [BASE])
+    assert tags(chunks) == [(A, INTEGER)]
+    # The same objects are there in SNMPv2c
+    status, index, chunks = respond(store, False, GET_NEXT_REQUEST, [A])
+    assert tags(chunks) == [(B, COUNTER64)]
+
+
+def test_v1_get_counter64(store):
+    status, index, chunks = respond(store, True, GET_REQUEST, [A, B])
+    assert (status, index) == (NO_SUCH_NAME, 2)
+
+
+def test_getbulk_walk(store):
+    status, index, chunks = respond(store, False, GET_BULK_REQUEST, [BASE], 0, 3)
+    assert tags(chunks) == [(A, INTEGER), (B, COUNTER64), (C, OCTET_STRING)]
+    status, index, chunks = respond(store, False, GET_BULK_REQUEST, [C], 0, 10)
+    assert tags(chunks) == [(D, GAUGE32), (E, COUNTER64), (E, END_OF_MIB_VIEW)]
+
+
+def test_getbulk_non_repeaters(store):
+    status, index, chunks = respond(store, False, GET_BULK_REQUEST, [A, D, BASE, B], 2, 2)
+    assert status == NO_ERROR
+    # The non-repeaters once, then the repeaters row by row
+    assert tags(chunks) == [
+        (B, COUNTER64), (E, COUNTER64),
+        (A, INTEGER), (C, OCTET_STRING),
+        (B, COUNTER64), (D, GAUGE32),
+    ]
+
+
+def test_getbulk_repeaters_end_of_view(store):
+    status, index, chunks = respond(store, False, GET_BULK_REQUEST, [C, D], 0, 5)
+    # Stops on the row where every repeater is past the end
+    assert tags(chunks) == [
+        (D, GAUGE32), (E, COUNTER64),
+        (E, COUNTER64), (E, END_OF_MIB_VIEW),
+    ]
+    status, index, chunks = respond(store, False, GET_BULK_REQUEST, [D, E], 0, 5)
+    assert tags(chunks) == [(E, COUNTER64), (E, END_OF_MIB_VIEW)]
+
+
+def test_getbulk_bounds(store):
+    # More non-repeaters than OIDs, no repetitions
+    status, index, chunks = respond(store, False, GET_BULK_REQUEST, [A, E], 5, 3)
+    assert tags(chunks) == [(B, COUNTER64), (E, END_OF_MIB_VIEW)]
+    status, index, chunks = respond(store, False, GET_BULK_REQUEST, [A], 0, 0)
+    assert chunks == []
+    status, index, chunks = respond(store, False, GET_BULK_REQUEST, [A], -1, -1)
+    assert chunks == []
+
+
+def snapshot_of(generation, value):
+    store = OidStore([(A, (INTEGER, value))])
+    store.encode()
+    return EMPTY_SNAPSHOT._replace(generation=generation, store=store)
+
+
+def test_worker_pool_flush(tmpdir):
+    path = str(tmpdir.join('snapshot'))
+    pool = WorkerPool(logging.getLogger('test'), 'public', 1, path, 'python')
+    # Taken note of under the lock of the snapshots, written by flush
+    pool.publish(snapshot_of(2, 2))
+    pool.publish(snapshot_of(1, 1))
+    assert not os.path.exists(path)
+    pool.flush()
+    assert MappedStore(path).generation == 2
+    # An older generation flushed last does not replace the newer one
+    pool.publish(snapshot_of(1, 1))
+    pool.flush()
+    assert MappedStore(path).generation == 2
+    pool.publish(snapshot_of(3, 3))
+    pool.flush().flush()
+    assert MappedStore(path).generation == 3
+    assert pool.stats()['generation'] == 3
+    assert os.listdir(str(tmpdir)) == ['snapshot']
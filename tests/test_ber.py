@@ -0,0 +1,117 @@
+"""
+ber: encodings decoded back, and the split of requests for the response
+cache.
+"""
+import pytest
+
+import ber
+from ber import INTEGER, OCTET_STRING, NULL, COUNTER32, COUNTER64, GET_REQUEST, \
+    GET_NEXT_REQUEST, GET_BULK_REQUEST, SET_REQUEST
+
+OID = (1, 3, 6, 1, 4, 1, 50495, 1, 2)
+
+
+def value_of(encoded):
+    data = bytearray(encoded)
+    tag, start, end = ber.decode_tlv(data, 0)
+    assert end == len(data)
+    return tag, data[start:end]
+
+
+@pytest.mark.parametrize('value', [
+    0, 1, -1, 127, 128, -128, -129, 255, 256, -256, 2 ** 31 - 1, -2 ** 31, 2 ** 63 - 1, -2 ** 63])
+def test_integer(value):
+    tag, data = value_of(ber.encode_integer(value))
+    assert tag == INTEGER
+    assert ber.decode_integer(data) == value
+
+
+@pytest.mark.parametrize('value, size', [(0, 1), (127, 1), (128, 2), (2 ** 32 - 1, 5),
+                                         (2 ** 63, 9), (2 ** 64 - 1, 9)])
+def test_counter64(value, size):
+    tag, data = value_of(ber.encode_unsigned(value, COUNTER64))
+    assert tag == COUNTER64
+    assert len(data) == size
+    # Unsigned: a leading zero keeps the top bit from reading as a sign
+    assert ber.decode_integer(data) == value
+
+
+def test_counter64_pyasn1():
+    decoder = pytest.importorskip('pyasn1.codec.ber.decoder')
+    rfc1902 = pytest.importorskip('pysnmp.proto.rfc1902')
+    for value in (0, 2 ** 32, 2 ** 64 - 1):
+        decoded, rest = decoder.decode(ber.encode_unsigned(value, COUNTER64),
+                                       asn1Spec=rfc1902.Counter64())
+        assert int(decoded) == value and not rest
+
+
+@pytest.mark.parametrize('length', [0, 1, 127, 128, 255, 256, 65535, 65536, 70000])
+def test_length(length):
+    encoded = bytearray(ber.encode_length(length))
+    assert len(encoded) == (1 if length < 0x80 else 2 + (length > 0xff) + (length > 0xffff))
+    assert ber.decode_length(encoded, 0) == (length, len(encoded))
+
+
+def test_long_value():
+    payload = b'x' * 70000
+    tag, data = value_of(ber.encode_octets(payload))
+    assert tag == OCTET_STRING
+    assert bytes(data) == payload
+    with pytest.raises(ValueError):
+        ber.decode_tlv(bytearray(ber.encode_octets(payload))[:-1], 0)
+
+
+@pytest.mark.parametrize('oid', [(1, 3), (1, 3, 6, 1, 4, 1, 50495, 0),
+                                 (1, 3, 6, 1, 127, 128, 16383, 16384, 2 ** 32 - 1),
+                                 (2, 5, 3)])
+def test_oid(oid):
+    tag, data = value_of(ber.encode_oid(oid))
+    assert tag == ber.OBJECT_IDENTIFIER
+    assert ber.decode_oid(data) == oid
+
+
+def test_varbind():
+    tag, data = value_of(ber.encode_varbind(OID, COUNTER32, 42))
+    assert tag == ber.SEQUENCE
+    _, oid_start, oid_end = ber.decode_tlv(data, 0)
+    assert ber.decode_oid(data[oid_start:oid_end]) == OID
+    tag, start, end = ber.decode_tlv(data, oid_end)
+    assert (tag, ber.decode_integer(data[start:end])) == (COUNTER32, 42)
+
+
+def request(tag, request_id, oids, version=1, community='public', a=0, b=0):
+    varbinds = [ber.encode_varbind(oid, NULL) for oid in oids]
+    return ber.encode_message(version, community,
+                              ber.encode_pdu(tag, request_id, a, b, varbinds))
+
+
+def test_decode_pdu():
+    msg = bytearray(request(GET_BULK_REQUEST, 1234, [OID, OID + (1,)], a=1, b=10))
+    _, start, _ = ber.decode_tlv(msg, 0)
+    _, _, pos = ber.decode_tlv(msg, start)
+    _, _, pos = ber.decode_tlv(msg, pos)
+    tag, request_id, non_repeaters, max_repetitions, oids, key = ber.decode_pdu(msg, pos)
+    assert (tag, request_id, non_repeaters, max_repetitions) == (GET_BULK_REQUEST, 1234, 1, 10)
+    assert oids == [OID, OID + (1,)]
+
+
+@pytest.mark.parametrize('tag', [GET_REQUEST, GET_NEXT_REQUEST, GET_BULK_REQUEST])
+def test_split_request(tag):
+    key, request_id = ber.split_request(request(tag, 1234, [OID]))
+    assert request_id == 1234
+    # Requests differing only by their request ID share their key
+    assert ber.split_request(request(tag, 70000, [OID])) == (key, 70000)
+    assert ber.split_request(request(tag, -5, [OID])) == (key, -5)
+    assert ber.split_request(request(tag, 1234, [OID + (1,)]))[0] != key
+    assert ber.split_request(request(tag, 1234, [OID], community='private'))[0] != key
+    assert ber.split_request(request(tag, 1234, [OID], version=0))[0] != key
+
+
+def test_split_request_others():
+    # SET, SNMPv3 and anything else go through the full decoder
+    assert ber.split_request(request(SET_REQUEST, 1, [OID])) is None
+    assert ber.split_request(request(GET_REQUEST, 1, [OID], version=3)) is None
+    assert ber.split_request(b'') is None
+    assert ber.split_request(b'\x04\x00') is None
+    # Cut in the middle of the request ID
+    assert ber.split_request(request(GET_REQUEST, 1, [OID])[:16]) is None
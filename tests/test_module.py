@@ -0,0 +1,188 @@
+"""
+Module on top of the mgr stand-in: the health traps around an outage of the
+Monitors, send_generic_trap when the sequence cannot be reserved and the
+SNMPv1 traps it sends, how a publish builds the store of the agent, and the
+PG summaries coalesced.
+"""
+import threading
+import time
+
+import pytest
+
+for dependency in ('numpy', 'pysnmp', 'six'):
+    pytest.importorskip(dependency)
+
+from _path import import_module
+from synthmaps import SyntheticCluster
+from watchdog import MonWatchdog
+
+
+@pytest.fixture
+def module():
+    module = import_module()
+    import mgr_module
+    backend = mgr_module.install(mgr_module.Backend())
+    cluster = SyntheticCluster(osds=10)
+    sent = []
+
+    class TrapModule(module.Module):
+        def get(self, data_name):
+            return cluster.get(data_name)
+
+        def send_generic_trap(self, statusDetail, statusMsg, trapName=None):
+            sent.append(trapName or self.ceph_trap_mapping[statusDetail])
+            return self
+
+    instance = TrapModule('snmphandler', None, None)
+    instance.backend = backend
+    module._global_instance['plugin'] = instance
+    instance.cluster = cluster
+    instance.sent = sent
+    return instance
+
+
+def test_same_status_after_outage(module):
+    now = [0.0]
+    up = [True]
+    module.mon_watchdog = MonWatchdog(module.log, lambda: up[0], module.mon_connection_lost,
+                                      module.mon_connection_restored, clock=lambda: now[0])
+    module.mon_watchdog.poll()
+    module.process_health()
+    assert module.sent == ['clusterOk']
+
+    up[0] = False
+    now[0] = 1.0
+    module.mon_watchdog.poll()
+    up[0] = True
+    now[0] = 5.0
+    module.mon_watchdog.poll()
+    assert module.sent == ['clusterOk', 'clusterCheck', 'clusterCheck']
+
+    # The cluster is still OK, but the receiver was left at unknown
+    module.process_health()
+    assert module.sent == ['clusterOk', 'clusterCheck', 'clusterCheck', 'clusterOk']
+    module.process_health()
+    assert len(module.sent) == 4
+
+
+def test_resumed_without_outage(module):
+    module.process_health()
+    # A new active module finds the status it sent last
+    module.clusterHealth = None
+    module.process_health()
+    assert module.sent == ['clusterOk']
+
+
+@pytest.fixture
+def sender(module, monkeypatch):
+    import module as module_py
+    sent = []
+    commands = []
+
+    class Notifier(object):
+        def send_trap(self, trapName, statusDetail, statusMsg, sequence):
+            sent.append((trapName, sequence))
+
+    monkeypatch.setattr(module_py.Module, 'get_notifier', lambda self: Notifier())
+    monkeypatch.setattr(module_py.commands, 'getstatusoutput',
+                        lambda command: commands.append(command) or (0, ''))
+    instance = module_py.Module('snmphandler', None, None)
+    instance.trap_using_tools = False
+    instance.sent = sent
+    instance.commands = commands
+    return instance
+
+
+def test_sequence_not_reserved(sender, monkeypatch):
+    def fail(key, value):
+        raise IOError('store unavailable')
+    monkeypatch.setattr(sender, 'set_store', fail)
+    sender.send_generic_trap(1, 'warn')
+    sender.send_generic_trap(0, 'ok')
+    assert sender.sent == [('clusterWarn', 1), ('clusterOk', 2)]
+
+
+def test_invalid_level(sender):
+    sender.trap_using_tools = True
+    sender.snmp_version = '3'
+    sender.snmpv3_level = 'everything'
+    sender.send_generic_trap(1, 'warn')
+    assert sender.commands == []
+
+
+@pytest.mark.parametrize('views, derive', [
+    ({'osd_stats': None, 'pg_counters': None}, 'refresh_agent_store'),
+    ({'osd_stats': None, 'osd_map': None}, 'derive_agent_store'),
+    # Nothing was missing when the agent started, the store is still built
+    ({}, 'derive_agent_store'),
+])
+def test_publish_derive(module, monkeypatch, views, derive):
+    called = []
+    for name in ('refresh_agent_store', 'derive_agent_store'):
+        monkeypatch.setattr(module, name, lambda snapshot, previous, name=name:
+                            called.append(name) or {})
+
+    class Agent(object):
+        def publish(self, snapshot):
+            pass
+
+        def flush(self):
+            pass
+
+    module.agent = Agent()
+    module.publish(**views)
+    assert called == [derive]
+
+
+def test_v1_encoding(sender):
+    from mibtables import CLUSTER_TRAPS
+    from notification import Notifier, v1_trap
+    from trapsink import TrapSink
+    sender.trap_using_tools = True
+    sender.snmp_version = '1'
+    sender.fsId = 'fsid'
+    sender.send_generic_trap(1, 'warn')
+    # The enterprise, agent, generic trap, specific trap and uptime
+    args = sender.commands[0].split()[8:13]
+    assert args[:1] + args[2:] == ['.1.3.6.1.4.1.50495.10', '6', '2', '0']
+    assert v1_trap(CLUSTER_TRAPS + (2,)) == (CLUSTER_TRAPS, 2)
+    # The same as the Notifier sends
+    notifier = Notifier('127.0.0.1', 162, '1', 'public', 'fsid')
+    sink = TrapSink(port=0)
+    try:
+        assert sink.decode(notifier.encode('clusterWarn', []))['trap'] == 'clusterWarn'
+    finally:
+        notifier.close()
+        sink.sock.close()
+
+
+def test_pg_summary_coalesced(module, monkeypatch):
+    processing = threading.Event()
+    release = threading.Event()
+    processed = []
+
+    def process():
+        processed.append(module.pg_summaries['received'])
+        processing.set()
+        release.wait(5.0)
+    monkeypatch.setattr(module, 'process_pg_summary', process)
+    module.pg_summary_interval = 0.0
+    thread = threading.Thread(target=module.pg_summary_loop)
+    thread.start()
+    try:
+        module.notify('pg_summary', None)
+        assert processing.wait(5.0)
+        # Received while the first one is processed, a single pass over them
+        for _ in range(20):
+            module.notify('pg_summary', None)
+        release.set()
+        for _ in range(500):
+            if module.pg_summaries['processed'] == 2:
+                break
+            time.sleep(0.01)
+    finally:
+        module.run = False
+        release.set()
+        thread.join()
+    assert module.pg_summaries == {'received': 21, 'processed': 2}
+    assert processed == [1, 21]
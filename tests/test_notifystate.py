@@ -0,0 +1,107 @@
+"""
+NotificationState: batched writes and sequence numbers never handed out twice.
+"""
+import json
+
+import pytest
+
+from notifystate import NotificationState, UINT32_MASK
+
+
+class Store(object):
+    def __init__(self, data=None):
+        self.data = data
+        self.fail = False
+
+    def load(self):
+        return self.data
+
+    def save(self, data):
+        if self.fail:
+            raise IOError('store unavailable')
+        self.data = data
+
+
+def state_of(store, now, reserve=10):
+    return NotificationState(store.load, store.save, delay=1.0, clock=lambda: now[0],
+                             reserve=reserve)
+
+
+def test_reserved_before_handed_out():
+    store = Store()
+    state = state_of(store, [0.0])
+    assert state.next_sequence() == 1
+    # The block end is saved before the first number of the block
+    assert json.loads(store.data)['reserved'] == 10
+    assert [state.next_sequence() for _ in range(9)] == list(range(2, 11))
+    assert state.writes == 1
+    assert state.next_sequence() == 11
+    assert json.loads(store.data)['reserved'] == 20
+    assert state.writes == 2
+
+
+def test_crash_starts_after_reserved():
+    store = Store()
+    state = state_of(store, [0.0])
+    for _ in range(3):
+        state.next_sequence()
+    # Stopped before any flush: the successor starts after the block
+    successor = state_of(store, [0.0])
+    assert successor.next_sequence() == 11
+
+
+def test_restored_from_older_copy():
+    store = Store()
+    state = state_of(store, [0.0])
+    older = store.data
+    for _ in range(15):
+        state.next_sequence()
+    successor = state_of(store, [0.0])
+    successor.restore(older)
+    assert successor.next_sequence() == 21
+
+
+def test_shutdown_gives_back_block():
+    store = Store()
+    state = state_of(store, [0.0])
+    for _ in range(3):
+        state.next_sequence()
+    assert state.flush(force=True)
+    assert json.loads(store.data)['reserved'] == 3
+    assert state_of(store, [0.0]).next_sequence() == 4
+
+
+def test_failed_save_hands_nothing_out():
+    store = Store()
+    store.fail = True
+    state = state_of(store, [0.0])
+    with pytest.raises(IOError):
+        state.next_sequence()
+    store.fail = False
+    assert state.next_sequence() == 1
+
+
+def test_flush_delay_and_failure():
+    store = Store()
+    now = [0.0]
+    state = state_of(store, now)
+    assert state.update('health', 'HEALTH_WARN')
+    assert not state.update('health', 'HEALTH_WARN')
+    assert not state.flush()
+    now[0] = 1.5
+    store.fail = True
+    with pytest.raises(IOError):
+        state.flush()
+    # Still dirty, the next flush saves it
+    assert state.stats()['dirty']
+    store.fail = False
+    assert state.flush()
+    assert not state.stats()['dirty']
+    assert json.loads(store.data)['values'] == {'health': 'HEALTH_WARN'}
+
+
+def test_wraps_around():
+    store = Store(json.dumps({'sequence': UINT32_MASK - 1, 'values': {}}))
+    state = state_of(store, [0.0])
+    assert [state.next_sequence() for _ in range(3)] == [UINT32_MASK, 0, 1]
+    assert json.loads(store.data)['reserved'] == 8
@@ -0,0 +1,99 @@
+"""
+OidStore: lookups, and dumps served by MappedStore.
+"""
+from collections import namedtuple
+import os
+import threading
+
+from ber import INTEGER, OCTET_STRING, GAUGE32
+from oidstore import OidStore, MappedStore, LAZY
+
+BASE = (1, 3, 6, 1, 4, 1, 50495)
+Source = namedtuple('Source', ['stats', 'perf'])
+
+
+def raw(varbinds):
+    return varbinds.tobytes() if isinstance(varbinds, memoryview) else bytes(varbinds)
+
+
+def store_of(count, value=0):
+    store = OidStore([(BASE + (1, i), (INTEGER, value + i)) for i in range(1, count + 1)] +
+                     [(BASE + (2, 0), (OCTET_STRING, b'ceph'))])
+    store.encode()
+    return store
+
+
+def test_lookups():
+    store = store_of(3)
+    assert len(store) == 4
+    assert store.get(BASE + (1, 2)) == (BASE + (1, 2), (INTEGER, 2))
+    assert store.get(BASE + (1, 4)) is None
+    assert store.get_next(BASE + (1,))[0] == BASE + (1, 1)
+    assert store.get_next(BASE + (1, 3))[0] == BASE + (2, 0)
+    assert store.get_next(BASE + (2, 0)) is None
+
+
+def test_dump_mapped(tmpdir):
+    path = str(tmpdir.join('snapshot'))
+    store = store_of(3)
+    store.dump(path, 7)
+    mapped = MappedStore(path)
+    assert mapped.generation == 7
+    assert len(mapped) == len(store)
+    for i in range(len(store)):
+        assert mapped.item(i)[0] == store.item(i)[0]
+        assert raw(mapped.varbinds(i, i + 1)) == raw(store.varbinds(i, i + 1))
+    assert mapped.index(BASE + (2, 0)) == 3
+    assert mapped.index_after(BASE + (1, 3)) == 3
+
+
+def test_concurrent_dumps(tmpdir):
+    path = str(tmpdir.join('snapshot'))
+    stores = [store_of(200, value=n * 1000) for n in range(4)]
+    errors = []
+
+    def writer(n):
+        try:
+            for generation in range(20):
+                stores[n].dump(path, generation)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    # Every dump wrote a file of its own, the one left is whole
+    assert os.listdir(str(tmpdir)) == ['snapshot']
+    mapped = MappedStore(path)
+    assert len(mapped) == 201
+    values = set(raw(store.varbinds(0, len(store))) for store in stores)
+    assert raw(mapped.varbinds(0, len(mapped))) in values
+
+
+def test_share_computed():
+    computed = []
+
+    def column(view):
+        def compute(source):
+            computed.append(view)
+            return [getattr(source, view)] * 3
+        compute.view = view
+        return compute
+
+    oids = [BASE + (3, c, i) for c in (1, 2) for i in range(3)]
+    store = OidStore.from_sorted(oids, [(GAUGE32, LAZY)] * 6,
+                                 lazy=[(0, 3, column('stats')), (3, 6, column('perf'))])
+    store.encode()
+    first = store.with_source(Source(1, 2))
+    first.varbinds(0, 6)
+    assert sorted(computed) == ['perf', 'stats']
+
+    # Only the perf counters changed, the stats column is taken over
+    second = first.with_source(Source(1, 3))
+    second.share_computed(first)
+    assert raw(second.varbinds(0, 3)) == raw(first.varbinds(0, 3))
+    assert raw(second.varbinds(3, 6)) != raw(first.varbinds(3, 6))
+    assert sorted(computed) == ['perf', 'perf', 'stats']
@@ -0,0 +1,66 @@
+"""
+OutlierDetector: OSD utilization compared within each device class, and the
+classes too small for a standard deviation.
+"""
+import pytest
+
+pytest.importorskip('numpy')
+
+from osdusage import OutlierDetector
+
+
+class OsdMap(object):
+    def __init__(self, classes):
+        self.data = {}
+        self.osds_by_id = dict((osd_id, {'in': 1}) for osd_id in classes)
+        self.osd_tree_node_by_id = dict((osd_id, {'device_class': device_class})
+                                        for osd_id, device_class in classes.items())
+
+
+class OsdStats(object):
+    def __init__(self, used):
+        self.stats_by_id = dict((osd_id, {'kb': 1000, 'kb_used': int(percent * 10)})
+                                for osd_id, percent in used.items())
+
+
+def check(detector, classes, used):
+    return detector.check(OsdMap(classes), OsdStats(used))
+
+
+def test_single_osd_class():
+    classes = dict((osd_id, 'hdd') for osd_id in range(10))
+    classes[10] = 'nvme'
+    used = dict((osd_id, 50.0 + osd_id % 2) for osd_id in range(10))
+    # The only NVMe OSD is far from the HDDs, but it is its own class mean
+    used[10] = 95.0
+    detector = OutlierDetector(zscore=3.0, deviation=20.0)
+    assert check(detector, classes, used) is None
+    assert detector.outliers == {}
+
+
+def test_small_class_deviation():
+    classes = {0: 'ssd', 1: 'ssd', 2: 'hdd', 3: 'hdd', 4: 'hdd'}
+    used = {0: 10.0, 1: 60.0, 2: 50.0, 3: 50.0, 4: 50.0}
+    # No z-score below MIN_CLASS_SIZE OSDs, only the distance to the mean
+    detector = OutlierDetector(zscore=0.1, deviation=20.0)
+    worst = check(detector, classes, used)
+    assert sorted(o.osd_id for o in worst) == [0, 1]
+    assert all(o.zscore == 0.0 for o in worst)
+    assert check(detector, classes, used) is None
+    # Both kept while above 80% of the deviation limit, cleared under it
+    used.update({0: 18.0, 1: 52.0})
+    assert check(detector, classes, used) is None
+    assert sorted(detector.outliers) == [0, 1]
+    used.update({0: 20.0, 1: 50.0})
+    check(detector, classes, used)
+    assert detector.outliers == {}
+
+
+def test_zscore_outlier():
+    classes = dict((osd_id, 'hdd') for osd_id in range(20))
+    used = dict((osd_id, 50.0 + osd_id % 3) for osd_id in range(20))
+    used[7] = 58.0
+    detector = OutlierDetector(zscore=3.0, deviation=0)
+    worst = check(detector, classes, used)
+    assert [o.osd_id for o in worst] == [7]
+    assert worst[0].zscore > 3.0
@@ -0,0 +1,51 @@
+"""
+OsdPerfSampler: rates and latencies over the last interval, across the ring
+wrapping around and an OSD restarting with its counters at zero.
+"""
+import pytest
+
+pytest.importorskip('numpy')
+
+from mibtables import osd_perf_column
+from perfstats import OsdPerfSampler
+from snapshot import EMPTY_SNAPSHOT
+
+
+def counters(reads, read_ns):
+    return {
+        'osd.op_r': {'value': reads},
+        'osd.op_w': {'value': 0},
+        'osd.op_r_latency': {'value': read_ns, 'count': reads},
+        'osd.op_w_latency': {'value': 0, 'count': 0},
+    }
+
+
+def test_last_interval():
+    sampler = OsdPerfSampler(samples=3, osds=1)
+    assert sampler.current().rates == {}
+    # 100 reads a second, 2 ms each, then 50 reads at 4 ms
+    for now in range(5):
+        sampler.sample({'osd.0': counters(100 * now, 2000000 * 100 * now),
+                        'mon.a': {}}, float(now))
+    sampler.sample({'osd.0': counters(450, 2000000 * 400 + 4000000 * 50)}, 5.0)
+    perf = sampler.current()
+    assert sorted(perf.rates) == [0]
+    assert perf.rates[0][0] == 50.0
+    assert perf.latencies[0] == (4000.0, 0.0)
+
+
+def test_counter_reset():
+    sampler = OsdPerfSampler(samples=4, osds=2)
+    sampler.sample({'osd.0': counters(1000, 10 ** 9), 'osd.1': counters(10, 10 ** 7)}, 0.0)
+    # osd.0 restarted between the samples
+    sampler.sample({'osd.0': counters(20, 2 * 10 ** 7), 'osd.1': counters(20, 2 * 10 ** 7)}, 1.0)
+    perf = sampler.current()
+    assert perf.rates[0][0] < 0
+    assert perf.latencies[0] == (0.0, 0.0)
+    assert perf.latencies[1] == (1000.0, 0.0)
+    snapshot = EMPTY_SNAPSHOT._replace(osd_perf=perf)
+    assert osd_perf_column([0, 1], 0)(snapshot) == [0, 10]
+    assert osd_perf_column([0, 1], 0, True)(snapshot) == [0, 1000]
+    # Back to normal on the next interval
+    sampler.sample({'osd.0': counters(30, 3 * 10 ** 7), 'osd.1': counters(30, 3 * 10 ** 7)}, 2.0)
+    assert sampler.current().latencies[0] == (1000.0, 0.0)
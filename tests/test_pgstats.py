@@ -0,0 +1,56 @@
+"""
+PgSummaryCounter: PG counts by state, cluster wide and per pool, and
+Sustained.
+"""
+import pytest
+
+pytest.importorskip('numpy')
+
+from pgstats import PgSummaryCounter, Sustained, PG_COUNTERS, state_flags
+
+
+def test_state_flags():
+    flags = dict(zip(PG_COUNTERS, state_flags('active+remapped+backfill_wait')))
+    assert [name for name in PG_COUNTERS if flags[name]] == \
+        ['total', 'active', 'misplaced', 'backfilling']
+    flags = dict(zip(PG_COUNTERS, state_flags('peering+down')))
+    assert [name for name in PG_COUNTERS if flags[name]] == \
+        ['total', 'peering', 'down', 'inactive']
+
+
+def test_count():
+    counter = PgSummaryCounter()
+    summary = {'by_pool': {
+        '1': {'active+clean': 100, 'active+undersized+degraded': 4},
+        '2': {'active+clean': 30, 'peering': 2},
+    }}
+    counters = counter.count(summary, 10.0)
+    assert counters.count('total') == 136
+    assert counters.count('clean') == 130
+    assert counters.count('degraded') == 4
+    assert counters.by_pool[2][PG_COUNTERS.index('inactive')] == 2
+    assert counters.inactive_seconds() == 0
+    # Inactive since the first summary with inactive PGs
+    assert counter.count(summary, 25.0).inactive_seconds() == 15.0
+    summary['by_pool']['2'] = {'active+clean': 32}
+    counters = counter.count(summary, 30.0)
+    assert (counters.count('inactive'), counters.inactive_since) == (0, None)
+    assert sorted(counter.flags) == ['active+clean', 'active+undersized+degraded', 'peering']
+
+
+def test_count_empty():
+    counters = PgSummaryCounter().count({}, 1.0)
+    assert counters.counts == (0,) * len(PG_COUNTERS)
+    assert counters.by_pool == {}
+
+
+def test_sustained():
+    sustained = Sustained(10, 60)
+    assert not sustained.update(11, 0)
+    assert not sustained.update(11, 59)
+    assert sustained.update(11, 60)
+    # Reported once until back to the limit
+    assert not sustained.update(50, 200)
+    assert not sustained.update(10, 201)
+    assert not sustained.update(11, 202)
+    assert sustained.update(11, 262)
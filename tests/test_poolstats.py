@@ -0,0 +1,98 @@
+"""
+PoolStatsRing: samples wrapping around the ring, pools coming and going,
+counters going back, and the trend the pool full forecast projects.
+"""
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from mibtables import pool_stats_column, GAUGE32_MAX, INTEGER32_MAX
+from poolstats import PoolStatsRing, POOL_STATS
+from snapshot import EMPTY_SNAPSHOT
+
+
+def stats(bytes_used, rd=0):
+    values = dict((name, 0) for name in POOL_STATS)
+    values.update(bytes_used=bytes_used, rd=rd)
+    return values
+
+
+def test_ring_wrap():
+    ring = PoolStatsRing(samples=3, pools=2)
+    for now, used in enumerate([0, 10, 20, 40, 80]):
+        ring.sample([(1, stats(used))], float(now))
+    current = ring.current()
+    assert current.stamp == 4.0
+    assert current.counters[1][0] == 80
+    # Over the 3 samples still in the ring, 20 at 2s to 80 at 4s
+    assert current.rates[1][0] == 30.0
+    assert ring.rates(ring.ids_rows, 2)[0][0] == 40.0
+
+
+def test_pools_come_and_go():
+    ring = PoolStatsRing(samples=4, pools=1)
+    ring.sample([(1, stats(100)), (2, stats(200)), (3, stats(300))], 0.0)
+    ring.sample([(1, stats(110)), (2, stats(220)), (3, stats(330))], 1.0)
+    assert sorted(ring.current().rates) == [1, 2, 3]
+    assert [ring.current().rates[i][0] for i in (1, 2, 3)] == [10.0, 20.0, 30.0]
+    # Pool 2 is deleted, then a pool takes its ID again and starts over
+    ring.sample([(1, stats(120)), (3, stats(360))], 2.0)
+    ring.sample([(1, stats(130)), (2, stats(5)), (3, stats(390))], 3.0)
+    current = ring.current()
+    assert current.counters[2][0] == 5
+    assert current.rates[2][0] == 0.0
+    assert current.rates[1][0] == 10.0
+    ring.sample([(1, stats(140)), (2, stats(10)), (3, stats(420))], 4.0)
+    assert ring.current().rates[2][0] == 5.0
+
+
+def test_counter_reset():
+    ring = PoolStatsRing(samples=2, pools=1)
+    ring.sample([(1, stats(1000, rd=100))], 0.0)
+    ring.sample([(1, stats(2000, rd=200))], 1.0)
+    # The read counter restarts from zero
+    ring.sample([(1, stats(1500, rd=50))], 2.0)
+    rates = ring.current().rates[1]
+    assert rates[0] == -500.0
+    assert rates[2] == -150.0
+    # bytes_used may shrink, but an operation rate is never served negative
+    snapshot = EMPTY_SNAPSHOT._replace(pool_stats=ring.current())
+    assert pool_stats_column([1], 0, True, -INTEGER32_MAX, INTEGER32_MAX)(snapshot) == [-500]
+    assert pool_stats_column([1], 2, True, 0, GAUGE32_MAX)(snapshot) == [0]
+    ring.sample([(1, stats(1500, rd=80))], 3.0)
+    assert pool_stats_column([1], 2, True, 0, GAUGE32_MAX)(
+        EMPTY_SNAPSHOT._replace(pool_stats=ring.current())) == [30]
+
+
+def test_no_forecast():
+    ring = PoolStatsRing(samples=4, pools=2)
+    # Nothing sampled, or no pool
+    assert len(ring.trend()) == 0
+    assert len(ring.time_to_full([])) == 0
+    ring.sample([], 0.0)
+    ring.sample([], 1.0)
+    assert len(ring.time_to_full([])) == 0
+    # A single sample has no trend yet
+    ring.sample([(1, stats(100)), (2, stats(80))], 2.0)
+    assert ring.trend().tolist() == [0.0, 0.0]
+    assert np.isinf(ring.time_to_full([1000, 1000])).all()
+    # Flat, and shrinking
+    for now, used in enumerate([100, 100, 100], 3):
+        ring.sample([(1, stats(100)), (2, stats(used - 10 * now))], float(now))
+    assert ring.trend()[0] == 0.0
+    assert ring.trend()[1] == -10.0
+    assert np.isinf(ring.time_to_full([1000, 1000])).all()
+
+
+def test_forecast():
+    ring = PoolStatsRing(samples=4, pools=2)
+    # Steady growth before the window, then 50 bytes a second
+    for now in range(10):
+        used = 1000 * now if now < 6 else 5000 + 50 * (now - 5)
+        ring.sample([(1, stats(used)), (2, stats(100))], float(now))
+    assert ring.trend().tolist() == [50.0, 0.0]
+    seconds = ring.time_to_full([500, 500]).tolist()
+    assert seconds[0] == 10.0
+    assert seconds[1] == float('inf')
+    # Already over what is available
+    assert ring.time_to_full([-5, 0]).tolist()[0] == 0.0
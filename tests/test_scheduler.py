@@ -0,0 +1,93 @@
+"""
+Scheduler: tasks run in due order on a fake clock, with their jitter, the
+backoff of failing tasks and the skips of tasks whose epoch did not change.
+"""
+import logging
+
+from scheduler import Scheduler, Task
+
+log = logging.getLogger('test')
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def scheduler(rand=lambda: 0.5):
+    clock = Clock()
+    return Scheduler(log, clock, rand), clock
+
+
+def test_due_order():
+    sched, clock = scheduler()
+    runs = []
+    sched.add(Task('slow', lambda: runs.append(('slow', clock.now)), 10.0), delay=2.0)
+    sched.add(Task('fast', lambda: runs.append(('fast', clock.now)), 3.0), delay=1.0)
+    while len(runs) < 6:
+        clock.now += sched.run_due()
+    assert runs == [('fast', 101.0), ('slow', 102.0), ('fast', 104.0), ('fast', 107.0),
+                    ('fast', 110.0), ('slow', 112.0)]
+    # The loop came late, the next runs are due from then on
+    clock.now += sched.run_due() + 0.5
+    sched.run_due()
+    assert sched.tasks['fast'].last_lateness == 0.5
+    assert sched.run_due() == 3.0
+    assert Scheduler(log, clock).run_due() is None
+
+
+def test_jitter():
+    task = Task('task', None, 10.0, jitter=0.1)
+    assert task.delay(lambda: 0.0) == 9.0
+    assert task.delay(lambda: 0.5) == 10.0
+    assert Task('task', None, 10.0, jitter=0.0).delay(lambda: 0.0) == 10.0
+
+
+def test_backoff():
+    sched, clock = scheduler()
+    failures = [3]
+
+    def function():
+        if failures[0]:
+            failures[0] -= 1
+            raise IOError('down')
+    task = sched.add(Task('task', function, 5.0, max_backoff=30.0))
+    dues = []
+    for _ in range(5):
+        clock.now += sched.run_due()
+        dues.append(clock.now)
+    # Retried after 10, 20 then at most 30 seconds, back to its interval
+    assert dues == [110.0, 130.0, 160.0, 165.0, 170.0]
+    assert (task.errors, task.runs, task.failures) == (3, 2, 0)
+
+
+def test_epoch_skip():
+    sched, clock = scheduler()
+    epoch = [1]
+    runs = []
+    fail = [False]
+
+    def function():
+        runs.append(epoch[0])
+        if fail[0]:
+            raise IOError('down')
+    task = sched.add(Task('task', function, 1.0, jitter=0.0, epoch=lambda: epoch[0]))
+    for step in range(3):
+        sched.run_due()
+        clock.now += 1.0
+    assert (runs, task.skips) == ([1], 2)
+    epoch[0] = 2
+    fail[0] = True
+    sched.run_due()
+    clock.now += 2.0
+    # A failed run is retried at the same epoch
+    fail[0] = False
+    sched.run_due()
+    assert runs == [1, 2, 2]
+    clock.now += 1.0
+    sched.run_due()
+    assert runs == [1, 2, 2]
+    assert task.stats()['skips'] == 3
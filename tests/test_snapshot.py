@@ -0,0 +1,33 @@
+"""
+SnapshotBuilder: concurrent writers hand their generations on in order.
+"""
+import threading
+
+from snapshot import SnapshotBuilder
+
+
+def test_update_generations():
+    builder = SnapshotBuilder()
+    first = builder.update(health='HEALTH_OK')
+    second = builder.update(osd_perf='perf')
+    assert (first.generation, second.generation) == (1, 2)
+    assert second.health == 'HEALTH_OK'
+    assert builder.current() is second
+
+
+def test_publish_in_order():
+    builder = SnapshotBuilder()
+    published = []
+
+    def writer():
+        for _ in range(500):
+            builder.update(publish=lambda snapshot: published.append(snapshot.generation),
+                           health='HEALTH_OK')
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert published == list(range(1, 2001))
+    assert builder.generation == 2000
@@ -0,0 +1,100 @@
+"""
+usm: the RFC 3414 key localization, the privacy ciphers and the security
+levels accepted from a user.
+"""
+import binascii
+
+import pytest
+
+import ber
+from ber import NULL, GET_REQUEST
+import usm
+from usm import Usm, UsmUser, LEVELS, UNSUPPORTED_SEC_LEVELS
+
+PASSWORD = 'maplesyrup'
+RFC_ENGINE = binascii.unhexlify('000000000000000000000002')
+ENGINE = binascii.unhexlify('8000000001020304')
+
+needs_crypto = pytest.mark.skipif(usm.AES is None, reason='privacy needs pycryptodome')
+
+
+#
+# RFC 3414 A.3.1 and A.3.2
+#
+@pytest.mark.parametrize('hash_name, key, localized', [
+    ('md5', '9faf3283884e92834ebc9847d8edd963', '526f5eed9fcce26f8964c2930787d82b'),
+    ('sha1', '9fb5cc0381497b3793528939ff788d5d79145211',
+     '6695febc9288e36282235fc7151f128497b38f3f'),
+])
+def test_key_localization(hash_name, key, localized):
+    master = usm.password_to_key(PASSWORD, hash_name)
+    assert binascii.hexlify(master).decode() == key
+    assert binascii.hexlify(usm.localize_key(master, RFC_ENGINE, hash_name)).decode() == localized
+
+
+def key_of(password):
+    return usm.localize_key(usm.password_to_key(password, 'sha1'), ENGINE, 'sha1')
+
+
+DATA = [b'', b'x', b'0123456789abcde', b'0123456789abcdef', b'0123456789abcdef0',
+        bytes(bytearray(range(256))) * 3]
+
+
+@needs_crypto
+@pytest.mark.parametrize('data', DATA)
+def test_aes_cfb(data):
+    cipher = usm.AesCfb(key_of('aespassword'))
+    encrypted, salt = cipher.encrypt(data, 3, 1234)
+    assert len(encrypted) == len(data)
+    assert cipher.decrypt(encrypted, 3, 1234, salt) == data
+    # The same as CFB-128 with the RFC 3826 IV
+    reference = usm.AES.new(key_of('aespassword')[:16], usm.AES.MODE_CFB,
+                            b'\0\0\0\x03\0\0\x04\xd2' + salt, segment_size=128)
+    assert reference.encrypt(data) == encrypted
+
+
+@needs_crypto
+@pytest.mark.parametrize('data', DATA)
+def test_des_cbc(data):
+    key = key_of('despassword')
+    cipher = usm.DesCbc(key)
+    encrypted, salt = cipher.encrypt(data, 3, 1234)
+    # Padded to the 8 octet block
+    assert len(encrypted) == (len(data) + 7) // 8 * 8
+    assert cipher.decrypt(encrypted, 3, 1234, salt)[:len(data)] == data
+    # The same as CBC with the RFC 3414 8.1.1.1 IV, the pre-IV XOR the salt
+    iv = usm._xor(key[8:16], salt)
+    padded = data + b'\0' * (len(encrypted) - len(data))
+    assert usm.DES.new(key[:8], usm.DES.MODE_CBC, iv).encrypt(padded) == encrypted
+    with pytest.raises(ValueError):
+        cipher.decrypt(encrypted + b'x', 3, 1234, salt)
+
+
+def request(engine, level):
+    tail = ber.encode_pdu_tail(0, 0, [ber.encode_varbind((1, 3, 6, 1, 2, 1, 1, 1, 0), NULL)])
+    return engine.encode(1, LEVELS[level], b'ceph', b'', GET_REQUEST, 42, tail)
+
+
+@pytest.mark.parametrize('user_level, accepted', [
+    ('noAuthNoPriv', ['noAuthNoPriv']),
+    ('authNoPriv', ['authNoPriv']),
+    ('authPriv', ['authNoPriv', 'authPriv']),
+])
+def test_levels(user_level, accepted):
+    if user_level == 'authPriv' and usm.AES is None:
+        pytest.skip('privacy needs pycryptodome')
+    user = UsmUser('ceph', user_level, 'SHA:authpassword', 'AES:privpassword', ENGINE)
+    engine = Usm(ENGINE, 1, 0, [user])
+    answered = []
+
+    def answer(pdu):
+        answered.append(pdu[1])
+        return ber.encode_pdu_tail(0, 0, [])
+
+    # The levels the keys of the user can build a request at
+    levels = [level for level in sorted(LEVELS) if not LEVELS[level] & ~user.flags]
+    for level in levels:
+        response = engine.handle(request(engine, level), answer)
+        assert (response is not None) == (level in accepted), level
+    assert answered == [42] * len(accepted)
+    assert engine.stats[UNSUPPORTED_SEC_LEVELS] == len(levels) - len(accepted)
@@ -0,0 +1,99 @@
+"""
+MonWatchdog: one on_loss and one on_recovery per outage, the outage and
+detection times, and the thread checking at the healthy and degraded
+intervals.
+"""
+import logging
+import time
+
+from watchdog import MonWatchdog
+
+log = logging.getLogger('test')
+
+
+class Connection(object):
+    def __init__(self):
+        self.up = True
+        self.now = 0.0
+        self.events = []
+
+    def watchdog(self, **kwargs):
+        return MonWatchdog(log, lambda: self.up, lambda: self.events.append('loss'),
+                           lambda outage: self.events.append(('recovery', outage)),
+                           clock=lambda: self.now, **kwargs)
+
+
+def test_loss_and_recovery():
+    connection = Connection()
+    watchdog = connection.watchdog()
+    watchdog.poll()
+    connection.now = 0.5
+    watchdog.poll()
+    assert connection.events == []
+    # Lost 0.25s after the last check found it up
+    connection.up = False
+    connection.now = 0.75
+    watchdog.poll()
+    connection.now = 1.0
+    watchdog.poll()
+    assert watchdog.outage() == 0.25
+    connection.up = True
+    connection.now = 2.75
+    watchdog.poll()
+    watchdog.poll()
+    assert connection.events == ['loss', ('recovery', 2.0)]
+    stats = watchdog.stats()
+    assert (stats['losses'], stats['checks'], stats['outage']) == (1, 6, 0.0)
+    assert stats['last_detection'] == 0.25
+    assert stats['last_outage'] == 2.0
+
+
+def test_down_from_start():
+    connection = Connection()
+    connection.up = False
+    watchdog = connection.watchdog()
+    watchdog.poll()
+    watchdog.poll()
+    assert connection.events == ['loss']
+    # Never seen up, no detection time
+    assert watchdog.last_detection is None
+    connection.up = True
+    connection.now = 1.0
+    watchdog.poll()
+    assert connection.events == ['loss', ('recovery', 1.0)]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_thread_intervals():
+    up = [True]
+    events = []
+    watchdog = MonWatchdog(log, lambda: up[0], lambda: events.append('loss'),
+                           lambda outage: events.append('recovery'),
+                           healthy_interval=0.2, degraded_interval=0.01)
+    watchdog.start()
+    try:
+        assert wait_for(lambda: watchdog.checks >= 1)
+        up[0] = False
+        lost = time.time()
+        assert wait_for(lambda: events == ['loss'])
+        # Noticed at the next healthy check at the latest
+        assert time.time() - lost < 0.2 + 0.1
+        assert watchdog.last_detection <= 0.2 + 0.1
+        # Checked every degraded_interval while down
+        checks = watchdog.checks
+        time.sleep(0.1)
+        assert watchdog.checks - checks >= 3
+        up[0] = True
+        assert wait_for(lambda: events == ['loss', 'recovery'])
+        checks = watchdog.checks
+        time.sleep(0.1)
+        assert watchdog.checks - checks <= 1
+    finally:
+        watchdog.stop()
+    assert watchdog.thread is None
@@ -1,4 +1,6 @@
-from pysnmp.smi import builder, view, compiler, error
+import os
+
+from pysnmp.smi import builder, view, error
 from pysnmp import debug
 
 debug.setLogger(debug.Debug('dsp'))
@@ -6,19 +8,15 @@ debug.setLogger(debug.Debug('dsp'))
 # Create MIB loader/builder
 mibBuilder = builder.MibBuilder()
 
-# Optionally attach PySMI MIB compiler (if installed)
-print('Attaching MIB compiler...'),
-compiler.addMibCompiler(mibBuilder, sources=['/usr/share/snmp/mibs/', 'http://mibs.snmplabs.com/asn1/'])
-print('done')
-
-# Optionally set an alternative path to compiled MIBs
+# SNMPHANDLER-MIB as compiled into mibs/ by mibbuild.py, no MIB compiler needed
 print('Setting MIB sources...')
-mibBuilder.addMibSources(builder.DirMibSource('/usr/share/snmp/mibs/'))
+mibBuilder.addMibSources(builder.DirMibSource(os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mibs')))
 print(mibBuilder.getMibSources())
 print('done')
 
 print('Loading MIB modules...'),
-mibBuilder.loadModules('SNMPv2-MIB', 'SNMP-FRAMEWORK-MIB', 'SNMP-COMMUNITY-MIB', 'IP-MIB', 'SNMPHANDLER-MIB')
+mibBuilder.loadModules('SNMPv2-MIB', 'SNMP-FRAMEWORK-MIB', 'SNMP-COMMUNITY-MIB', 'SNMPHANDLER-MIB')
 print('done')
 
 print('Indexing MIB objects...'),
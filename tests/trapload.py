@@ -0,0 +1,145 @@
+"""
+Push health transition traps at a target rate into a local trap sink.
+
+    python tests/trapload.py [--rate N] [--count N] [--version 1|2c|3]
+                             [--level LEVEL] [--sender module|notifier]
+                             [--target ADDR:PORT]
+
+Sends --count traps, cycling the cluster status through HEALTH_OK,
+HEALTH_WARN and HEALTH_ERR, at --rate traps per second (as fast as possible
+with 0), into a TrapSink (see trapsink.py) running in the same process, or
+into the one listening at --target. Every statusMsg carries the time the
+trap was sent, so the sink measures the latency of every trap.
+
+The module sender, the default, goes through Module.send_generic_trap with
+trap_using_tools off on top of the mgr stand-in (see _path.py); a module.py
+which cannot be imported is an error. The notifier sender sends through a
+Notifier what send_generic_trap sends. The report printed as JSON has the
+achieved send rate, the traps per second the sink received, the latency
+percentiles and the traps lost.
+"""
+import sys
+
+from _path import import_module
+
+import argparse
+import json
+import time
+
+from notification import Notifier
+from synthmaps import SyntheticCluster, FSID
+from trapsink import TrapSink
+import usm
+
+STATUSES = ('HEALTH_OK', 'HEALTH_WARN', 'HEALTH_ERR')
+HEALTH_DETAILS = {'HEALTH_OK': 0, 'HEALTH_WARN': 1, 'HEALTH_ERR': 2}
+TRAP_NAMES = {0: 'clusterOk', 1: 'clusterWarn', 2: 'clusterError'}
+ENGINE = '0x8000000001020304'
+USER = {'name': 'ceph', 'level': 'authPriv', 'auth': 'SHA:mypassword',
+        'priv': 'AES:mypassword'}
+
+
+def module_sender(args, addr, port):
+    """
+    send(statusDetail, statusMsg) of a Module
+    """
+    module = import_module()
+    cluster = SyntheticCluster(osds=10)
+
+    class LoadModule(module.Module):
+        def get(self, data_name):
+            return cluster.get(data_name)
+
+    instance = LoadModule('snmphandler', None, None)
+    instance.trap_addr = addr
+    instance.trap_port = str(port)
+    instance.trap_using_tools = False
+    instance.snmp_version = args.version
+    instance.snmp_community = 'public'
+    instance.snmpv3_engine = ENGINE
+    instance.snmpv3_user = USER['name']
+    instance.snmpv3_level = args.level
+    instance.snmpv3_pass = USER['auth']
+    instance.snmpv3_enc = USER['priv']
+    return instance.send_generic_trap
+
+
+def notifier_sender(args, addr, port):
+    """
+    send(statusDetail, statusMsg) of a Notifier, sending what
+    send_generic_trap sends without the tools
+    """
+    engine = None
+    if args.version == '3':
+        config = {'engine': ENGINE, 'boots': 1, 'start': time.time(),
+                  'users': [dict(USER, level=args.level)]}
+        engine = usm.Usm.from_config(config)
+    notifier = Notifier(addr, port, args.version, 'public', FSID, usm=engine,
+                        user=USER['name'], level=usm.LEVELS[args.level])
+    sequence = [0]
+
+    def send(status_detail, status_msg):
+        sequence[0] += 1
+        notifier.send_trap(TRAP_NAMES[status_detail], status_detail, status_msg, sequence[0])
+    return send
+
+
+def run(args, send):
+    """
+    Send the traps at the target rate, returns the seconds it took
+    """
+    start = time.time()
+    for count in range(args.count):
+        if args.rate:
+            delay = start + float(count) / args.rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        status = STATUSES[count % len(STATUSES)]
+        send(HEALTH_DETAILS[status], "Ceph Manager SNMP Handler - {0} sent={1:.6f}".format(
+            status, time.time()))
+    return time.time() - start
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Push health traps into a local trap sink')
+    parser.add_argument('--rate', type=float, default=1000)
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--version', default='2c', choices=['1', '2c', '3'])
+    parser.add_argument('--level', default='authPriv' if usm.AES is not None else 'authNoPriv',
+                        choices=sorted(usm.LEVELS))
+    parser.add_argument('--sender', default='module', choices=['module', 'notifier'])
+    parser.add_argument('--target')
+    args = parser.parse_args(argv[1:])
+
+    sink = None
+    if args.target:
+        addr, port = args.target.rsplit(':', 1)
+    else:
+        sink = TrapSink('127.0.0.1', 0, [dict(USER, level=args.level)])
+        addr, port = sink.address[:2]
+        sink.start()
+
+    if args.sender == 'module':
+        send = module_sender(args, addr, port)
+    else:
+        send = notifier_sender(args, addr, port)
+
+    elapsed = run(args, send)
+    report = {'sender': args.sender, 'version': args.version, 'sent': args.count,
+              'target_rate': args.rate, 'elapsed': elapsed,
+              'send_rate': args.count / elapsed if elapsed else 0.0}
+    if sink is not None:
+        # Give the sink the time to drain its socket
+        deadline = time.time() + 2.0
+        while sink.received + sink.errors < args.count and time.time() < deadline:
+            time.sleep(0.05)
+        sink.stop()
+        report['sink'] = sink.report()
+        report['lost'] = args.count - sink.received
+    json.dump(report, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,344 @@
+"""
+Local trap receiver for SNMPHANDLER-MIB notifications.
+
+    python tests/trapsink.py [--addr ADDR] [--port PORT] [--duration SECONDS]
+                             [--user NAME --level LEVEL --auth PROTO:PASS
+                              --priv CIPHER:PASS] [--quiet]
+
+Listens on UDP, 1162 by default so it needs no privilege, and decodes the
+SNMPv1, SNMPv2c and SNMPv3 notifications the module sends, SNMPv3 ones for
+the given user with its keys localized to the engine of every sender. Every
+trap is printed with its values unless --quiet, and when the sink stops, at
+the end of --duration or on Ctrl-C, its report is printed as JSON.
+
+The report counts the traps received by name, the gaps and duplicates in
+their notificationSequence and heartbeatSequence, and the traps per second
+between the first and the last one. A statusMsg holding "sent=<time.time()>"
+gives the latency of the trap, which is how trapload.py measures it.
+"""
+import sys
+
+import _path
+
+import argparse
+import hmac
+import json
+import re
+import socket
+import threading
+import time
+
+import ber
+from ber import INTEGER, OCTET_STRING, OBJECT_IDENTIFIER, IP_ADDRESS, UNSIGNED_SYNTAXES, \
+    TRAP_V1, TRAP_V2
+from mibtables import FS_ID, STATUS_DETAIL, STATUS_MSG, NOTIFICATION_SEQUENCE, \
+    HEARTBEAT_SEQUENCE, HEARTBEAT_UPTIME, CLUSTER_TRAPS
+from notification import CLUSTER_TRAP_IDS, SNMP_TRAP_OID, SYS_UP_TIME
+from usm import UsmUser, FLAG_AUTH, FLAG_PRIV, AUTH_PARAMS_SIZE
+
+OBJECT_NAMES = {
+    FS_ID: 'fsId',
+    STATUS_DETAIL: 'statusDetail',
+    STATUS_MSG: 'statusMsg',
+    NOTIFICATION_SEQUENCE: 'notificationSequence',
+    HEARTBEAT_SEQUENCE: 'heartbeatSequence',
+    HEARTBEAT_UPTIME: 'heartbeatUptime',
+    SYS_UP_TIME: 'sysUpTime',
+    SNMP_TRAP_OID: 'snmpTrapOID',
+}
+TRAP_NAMES = dict((trap, name) for name, trap in CLUSTER_TRAP_IDS.items())
+SEQUENCES = ('notificationSequence', 'heartbeatSequence')
+SENT = re.compile(r'sent=([0-9]+\.[0-9]+)')
+
+
+def decode_value(tag, data):
+    if tag == INTEGER or tag in UNSIGNED_SYNTAXES:
+        return ber.decode_integer(data)
+    if tag == OCTET_STRING:
+        return bytes(data).decode('utf-8', 'replace')
+    if tag == OBJECT_IDENTIFIER:
+        return ber.decode_oid(data)
+    if tag == IP_ADDRESS:
+        return socket.inet_ntoa(bytes(data))
+    return bytes(data)
+
+
+def decode_varbinds(data, pos, end):
+    """
+    (OID, value) of the varbinds in data[pos:end]
+    """
+    varbinds = []
+    while pos < end:
+        _, vb, pos = ber.decode_tlv(data, pos)
+        _, start, oid_end = ber.decode_tlv(data, vb)
+        tag, start2, value_end = ber.decode_tlv(data, oid_end)
+        varbinds.append((ber.decode_oid(data[start:oid_end]),
+                         decode_value(tag, data[start2:value_end])))
+    return varbinds
+
+
+class Sequence(object):
+    """
+    Gaps and duplicates of a sequence number, starting from the first one
+    received
+    """
+
+    def __init__(self):
+        self.last = None
+        self.missing = set()
+        self.duplicates = 0
+        self.late = 0
+
+    def add(self, number):
+        if self.last is None:
+            self.last = number
+        elif number > self.last:
+            self.missing.update(range(self.last + 1, number))
+            self.last = number
+        elif number in self.missing:
+            self.missing.discard(number)
+            self.late += 1
+        else:
+            self.duplicates += 1
+
+    def stats(self):
+        return {'last': self.last, 'missing': len(self.missing),
+                'duplicates': self.duplicates, 'late': self.late}
+
+
+class TrapSink(object):
+    def __init__(self, addr='127.0.0.1', port=1162, users=(), clock=time.time):
+        # users are dicts of the name, level, auth and priv of SNMPv3 users
+        self.users = dict((user['name'].encode('utf-8'), user) for user in users)
+        self.localized = {}
+        self.clock = clock
+        family, _, _, _, address = socket.getaddrinfo(addr, int(port), 0, socket.SOCK_DGRAM)[0]
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+        except socket.error:
+            pass
+        self.sock.bind(address)
+        self.sock.settimeout(0.2)
+        self.address = self.sock.getsockname()
+        self.thread = None
+        self.running = False
+        self.on_trap = None
+        self.reset()
+
+    def reset(self):
+        self.received = 0
+        self.errors = 0
+        self.last_error = None
+        self.by_trap = {}
+        self.sequences = dict((name, Sequence()) for name in SEQUENCES)
+        self.latencies = []
+        self.first = None
+        self.last = None
+
+    def _user(self, engine_id, name):
+        user = self.localized.get((engine_id, name))
+        if user is None:
+            config = self.users.get(name)
+            if config is None:
+                raise ValueError("Unknown user {0!r}".format(name))
+            user = UsmUser(config['name'], config['level'], config.get('auth'),
+                           config.get('priv'), engine_id)
+            self.localized[(engine_id, name)] = user
+        return user
+
+    def _open_v3(self, data, pos):
+        """
+        Check and decrypt the SNMPv3 message whose globalData is at pos,
+        returns the data and position of its PDU
+        """
+        _, start, global_end = ber.decode_tlv(data, pos)
+        _, start, pos = ber.decode_tlv(data, start)
+        _, start, pos = ber.decode_tlv(data, pos)
+        _, start, pos = ber.decode_tlv(data, pos)
+        flags = data[start] if pos > start else 0
+        _, params, data_pos = ber.decode_tlv(data, global_end)
+        _, pos, _ = ber.decode_tlv(data, params)
+        _, start, pos = ber.decode_tlv(data, pos)
+        engine_id = bytes(data[start:pos])
+        _, start, pos = ber.decode_tlv(data, pos)
+        boots = ber.decode_integer(data[start:pos])
+        _, start, pos = ber.decode_tlv(data, pos)
+        engine_time = ber.decode_integer(data[start:pos])
+        _, start, pos = ber.decode_tlv(data, pos)
+        name = bytes(data[start:pos])
+        _, auth_start, auth_end = ber.decode_tlv(data, pos)
+        _, start, pos = ber.decode_tlv(data, auth_end)
+        salt = bytes(data[start:pos])
+
+        user = self._user(engine_id, name)
+        if flags & (FLAG_AUTH | FLAG_PRIV) != user.flags:
+            raise ValueError("Security level {0} instead of {1}".format(flags & 3, user.flags))
+        if flags & FLAG_AUTH:
+            digest = bytes(data[auth_start:auth_end])
+            data[auth_start:auth_end] = b'\0' * AUTH_PARAMS_SIZE
+            if len(digest) != AUTH_PARAMS_SIZE or \
+                    not hmac.compare_digest(user.auth.sign(bytes(data)), digest):
+                raise ValueError("Wrong digest")
+        if flags & FLAG_PRIV:
+            _, start, end = ber.decode_tlv(data, data_pos)
+            data = bytearray(user.priv.decrypt(bytes(data[start:end]), boots, engine_time, salt))
+            data_pos = 0
+        _, pos, _ = ber.decode_tlv(data, data_pos)
+        _, pos, context_end = ber.decode_tlv(data, pos)
+        _, _, pos = ber.decode_tlv(data, context_end)
+        return data, pos
+
+    def decode(self, msg):
+        """
+        The version, trap name and values of a notification
+        """
+        data = bytearray(msg)
+        _, pos, _ = ber.decode_tlv(data, 0)
+        _, start, pos = ber.decode_tlv(data, pos)
+        version = ber.decode_integer(data[start:pos])
+        if version == 3:
+            data, pos = self._open_v3(data, pos)
+        else:
+            _, _, pos = ber.decode_tlv(data, pos)
+        tag, start, end = ber.decode_tlv(data, pos)
+        if tag == TRAP_V1:
+            _, oid_start, pos = ber.decode_tlv(data, start)
+            enterprise = ber.decode_oid(data[oid_start:pos])
+            _, _, pos = ber.decode_tlv(data, pos)
+            _, _, pos = ber.decode_tlv(data, pos)
+            _, trap_start, pos = ber.decode_tlv(data, pos)
+            specific = ber.decode_integer(data[trap_start:pos])
+            _, _, pos = ber.decode_tlv(data, pos)
+            _, vb_start, vb_end = ber.decode_tlv(data, pos)
+            trap = TRAP_NAMES.get(specific) if enterprise == CLUSTER_TRAPS else None
+            request_id = None
+        elif tag == TRAP_V2:
+            _, id_start, pos = ber.decode_tlv(data, start)
+            request_id = ber.decode_integer(data[id_start:pos])
+            _, _, pos = ber.decode_tlv(data, pos)
+            _, _, pos = ber.decode_tlv(data, pos)
+            _, vb_start, vb_end = ber.decode_tlv(data, pos)
+            trap = None
+        else:
+            raise ValueError("Not a notification PDU: 0x{0:02x}".format(tag))
+        values = {}
+        for oid, value in decode_varbinds(data, vb_start, vb_end):
+            values[OBJECT_NAMES.get(oid, '.'.join(str(sub) for sub in oid))] = value
+        if tag == TRAP_V2:
+            oid = values.pop('snmpTrapOID', ())
+            if oid[:-1] == CLUSTER_TRAPS:
+                trap = TRAP_NAMES.get(oid[-1])
+        return {'version': {0: '1', 1: '2c', 3: '3'}.get(version, str(version)),
+                'trap': trap or 'unknown', 'request_id': request_id, 'values': values}
+
+    def record(self, msg, now):
+        try:
+            trap = self.decode(msg)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = '{0}: {1}'.format(type(e).__name__, e)
+            return None
+        self.received += 1
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.by_trap[trap['trap']] = self.by_trap.get(trap['trap'], 0) + 1
+        values = trap['values']
+        for name in SEQUENCES:
+            if name in values:
+                self.sequences[name].add(values[name])
+        sent = SENT.search(values.get('statusMsg', ''))
+        if sent is not None:
+            self.latencies.append(now - float(sent.group(1)))
+        trap['time'] = now
+        return trap
+
+    def serve(self):
+        while self.running:
+            try:
+                msg = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            except socket.error:
+                break
+            trap = self.record(msg, self.clock())
+            if trap is not None and self.on_trap is not None:
+                self.on_trap(trap)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, name='trap-sink')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.sock.close()
+
+    def report(self):
+        latencies = sorted(self.latencies)
+        percentile = lambda fraction: latencies[min(len(latencies) - 1,
+                                                    int(fraction * len(latencies)))] * 1000
+        elapsed = (self.last - self.first) if self.received > 1 else 0.0
+        report = {
+            'received': self.received,
+            'decode_errors': self.errors,
+            'last_error': self.last_error,
+            'by_trap': dict(self.by_trap),
+            'sequences': dict((name, sequence.stats()) for name, sequence
+                              in self.sequences.items() if sequence.last is not None),
+            'elapsed': elapsed,
+            'traps_per_second': (self.received - 1) / elapsed if elapsed else 0.0,
+        }
+        if latencies:
+            report['latency_ms'] = {
+                'count': len(latencies),
+                'p50': percentile(0.5),
+                'p90': percentile(0.9),
+                'p99': percentile(0.99),
+                'max': latencies[-1] * 1000,
+            }
+        return report
+
+
+def print_trap(trap):
+    values = ' '.join('{0}={1}'.format(name, value) for name, value in sorted(trap['values'].items()))
+    print("{0:.6f} v{1} {2} {3}".format(trap['time'], trap['version'], trap['trap'], values))
+    sys.stdout.flush()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Receive and decode SNMPHANDLER-MIB traps')
+    parser.add_argument('--addr', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1162)
+    parser.add_argument('--duration', type=float)
+    parser.add_argument('--user', default='ceph')
+    parser.add_argument('--level', default='authPriv')
+    parser.add_argument('--auth', default='SHA:mypassword')
+    parser.add_argument('--priv', default='AES:mypassword')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv[1:])
+
+    sink = TrapSink(args.addr, args.port, [{'name': args.user, 'level': args.level,
+                                            'auth': args.auth, 'priv': args.priv}])
+    if not args.quiet:
+        sink.on_trap = print_trap
+    sink.start()
+    try:
+        end = time.time() + args.duration if args.duration else None
+        while end is None or time.time() < end:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    sink.stop()
+    json.dump(sink.report(), sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
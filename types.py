@@ -209,6 +209,27 @@ class PgSummary(DataWrapper):
     str = 'pg_summary'
 
 
+class OsdStats(DataWrapper):
+    """
+    Space and placement group counts of every OSD, from the osd_stats and
+    pg_stats of the PG map (pg_dump)
+    """
+    str = 'osd_stats'
+
+    def __init__(self, data):
+        super(OsdStats, self).__init__(data)
+        self.stats_by_id = {}
+        self.pgs_by_id = {}
+        self.primaries_by_id = {}
+        if data is not None:
+            self.stats_by_id = dict([(s['osd'], s) for s in data.get('osd_stats', [])])
+            for pg in data.get('pg_stats', []):
+                for osd_id in pg.get('acting', []):
+                    self.pgs_by_id[osd_id] = self.pgs_by_id.get(osd_id, 0) + 1
+                primary = pg.get('acting_primary', -1)
+                self.primaries_by_id[primary] = self.primaries_by_id.get(primary, 0) + 1
+
+
 class Health(DataWrapper):
     str = 'health'
 
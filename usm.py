@@ -0,0 +1,429 @@
+"""
+SNMPv3 User-based Security Model (RFC 3414, RFC 3826) for the agent.
+
+Everything that depends only on the configuration is done once when the Usm
+is built: the passwords are turned into keys localized to the engine ID, an
+HMAC object is keyed with each authentication key so that every message only
+copies its inner and outer pad state, and the block cipher of each privacy
+key is set up once and driven in CBC or CFB mode here, so no key schedule is
+computed per message.
+
+Messages are parsed and built with ber, the PDU itself is answered by the
+agent like a SNMPv2c request. Privacy needs pycryptodome (Cryptodome or
+Crypto), which pysnmp already uses.
+"""
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import struct
+import time
+
+import ber
+from ber import OCTET_STRING, SEQUENCE, COUNTER32, REPORT, GET_RESPONSE
+
+try:
+    from Cryptodome.Cipher import AES, DES
+except ImportError:
+    try:
+        from Crypto.Cipher import AES, DES
+    except ImportError:
+        AES = DES = None
+
+SNMP_VERSION_3 = 3
+USM_SECURITY_MODEL = 3
+MAX_MESSAGE_SIZE = 65507
+
+#
+# msgFlags
+#
+FLAG_AUTH = 0x01
+FLAG_PRIV = 0x02
+FLAG_REPORTABLE = 0x04
+
+LEVELS = {
+    'noAuthNoPriv': 0,
+    'authNoPriv': FLAG_AUTH,
+    'authPriv': FLAG_AUTH | FLAG_PRIV,
+}
+
+#
+# HMAC-MD5-96 and HMAC-SHA-96 both send the first 12 octets of the digest
+#
+AUTH_PARAMS_SIZE = 12
+AUTH_HASHES = {'MD5': 'md5', 'SHA': 'sha1'}
+
+#
+# Seconds a message engine time may be off ours (RFC 3414 section 3.2)
+#
+TIME_WINDOW = 150
+
+#
+# usmStats counters sent in reports
+#
+USM_STATS = (1, 3, 6, 1, 6, 3, 15, 1, 1)
+UNSUPPORTED_SEC_LEVELS = USM_STATS + (1, 0)
+NOT_IN_TIME_WINDOWS = USM_STATS + (2, 0)
+UNKNOWN_USER_NAMES = USM_STATS + (3, 0)
+UNKNOWN_ENGINE_IDS = USM_STATS + (4, 0)
+WRONG_DIGESTS = USM_STATS + (5, 0)
+DECRYPTION_ERRORS = USM_STATS + (6, 0)
+
+
+class UsmError(Exception):
+    """
+    A message failed a security check, stat is the usmStats counter to
+    report
+    """
+    def __init__(self, stat, flags=0, request_id=0):
+        super(UsmError, self).__init__(stat)
+        self.stat = stat
+        self.flags = flags
+        self.request_id = request_id
+
+
+def engine_id_from_option(value):
+    """
+    The snmpv3_engine option is the engine ID in hex, with or without 0x
+    """
+    if value.lower().startswith('0x'):
+        value = value[2:]
+    try:
+        return binascii.unhexlify(value)
+    except (TypeError, binascii.Error):
+        raise ValueError("Invalid engine ID {0}".format(value))
+
+
+def _bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
+
+
+def _xor(a, b):
+    """
+    a XOR the first len(a) octets of b
+    """
+    if not a:
+        return b''
+    value = int(binascii.hexlify(a), 16) ^ int(binascii.hexlify(b[:len(a)]), 16)
+    return binascii.unhexlify('%0*x' % (2 * len(a), value))
+
+
+#
+# RFC 3414 A.2: hash 1MB of the repeated password, then localize the key
+# by hashing it around the engine ID
+#
+def password_to_key(password, hash_name):
+    password = _bytes(password)
+    stream = password * (1048576 // len(password) + 1)
+    return hashlib.new(hash_name, stream[:1048576]).digest()
+
+
+def localize_key(key, engine_id, hash_name):
+    return hashlib.new(hash_name, key + engine_id + key).digest()
+
+
+class Authenticator(object):
+    """
+    HMAC-MD5-96 or HMAC-SHA-96 with the pads keyed once
+    """
+
+    def __init__(self, protocol, key):
+        self.keyed = hmac.new(key, digestmod=getattr(hashlib, AUTH_HASHES[protocol]))
+
+    def sign(self, message):
+        digest = self.keyed.copy()
+        digest.update(message)
+        return digest.digest()[:AUTH_PARAMS_SIZE]
+
+
+class AesCfb(object):
+    """
+    AES-128 in CFB-128 mode (RFC 3826) on top of one ECB cipher
+    """
+
+    def __init__(self, key):
+        self.ecb = AES.new(key[:16], AES.MODE_ECB)
+        self.salt = struct.unpack('>Q', os.urandom(8))[0]
+
+    def encrypt(self, data, boots, engine_time):
+        self.salt = (self.salt + 1) & 0xffffffffffffffff
+        salt = struct.pack('>Q', self.salt)
+        previous = struct.pack('>II', boots, engine_time) + salt
+        out = []
+        for pos in range(0, len(data), 16):
+            previous = _xor(data[pos:pos + 16], self.ecb.encrypt(previous))
+            out.append(previous)
+        return b''.join(out), salt
+
+    def decrypt(self, data, boots, engine_time, salt):
+        if len(salt) != 8:
+            raise ValueError("Bad AES salt")
+        # The keystream only depends on the ciphertext, one ECB call does it
+        full = len(data) - (len(data) % 16 or 16)
+        iv = struct.pack('>II', boots, engine_time) + salt
+        return _xor(data, self.ecb.encrypt(iv + data[:full]))
+
+
+class DesCbc(object):
+    """
+    DES in CBC mode (RFC 3414 section 8) on top of one ECB cipher
+    """
+
+    def __init__(self, key):
+        self.ecb = DES.new(key[:8], DES.MODE_ECB)
+        self.pre_iv = key[8:16]
+        self.salt = struct.unpack('>I', os.urandom(4))[0]
+
+    def encrypt(self, data, boots, engine_time):
+        self.salt = (self.salt + 1) & 0xffffffff
+        salt = struct.pack('>II', boots, self.salt)
+        if len(data) % 8:
+            data += b'\0' * (8 - len(data) % 8)
+        previous = _xor(self.pre_iv, salt)
+        out = []
+        for pos in range(0, len(data), 8):
+            previous = self.ecb.encrypt(_xor(data[pos:pos + 8], previous))
+            out.append(previous)
+        return b''.join(out), salt
+
+    def decrypt(self, data, boots, engine_time, salt):
+        if len(salt) != 8 or len(data) % 8:
+            raise ValueError("Bad DES salt or length")
+        return _xor(self.ecb.decrypt(data), _xor(self.pre_iv, salt) + data[:-8])
+
+
+PRIV_CIPHERS = {'AES': AesCfb, 'DES': DesCbc}
+
+
+class UsmUser(object):
+    """
+    One user with its keys localized to the engine.
+
+    auth and priv are the snmpv3_pass and snmpv3_enc option values,
+    PROTOCOL:passphrase.
+    """
+
+    def __init__(self, name, level, auth, priv, engine_id):
+        if level not in LEVELS:
+            raise ValueError("Invalid security level string: {0}".format(level))
+        self.name = _bytes(name)
+        self.flags = LEVELS[level]
+        self.auth = None
+        self.priv = None
+        if self.flags & FLAG_AUTH:
+            protocol, password = auth.split(':', 1)
+            if protocol not in AUTH_HASHES:
+                raise ValueError("Unsupported authentication protocol {0}".format(protocol))
+            hash_name = AUTH_HASHES[protocol]
+            self.auth = Authenticator(protocol, localize_key(
+                password_to_key(password, hash_name), engine_id, hash_name))
+            if self.flags & FLAG_PRIV:
+                cipher, password = priv.split(':', 1)
+                if cipher not in PRIV_CIPHERS:
+                    raise ValueError("Unsupported privacy protocol {0}".format(cipher))
+                if AES is None:
+                    raise ValueError("Privacy needs pycryptodome")
+                # The privacy key is localized with the authentication hash
+                self.priv = PRIV_CIPHERS[cipher](localize_key(
+                    password_to_key(password, hash_name), engine_id, hash_name))
+
+
+class Usm(object):
+    """
+    The authoritative engine of the agent and its users.
+
+    Engine boots is persisted by the module and passed in with the time the
+    engine started, so the agent and its workers all agree on the engine
+    time.
+    """
+
+    def __init__(self, engine_id, boots, start, users=()):
+        self.engine_id = engine_id
+        self.boots = boots
+        self.start = start
+        self.users = dict((user.name, user) for user in users)
+        self.stats = dict((oid, 0) for oid in (
+            UNSUPPORTED_SEC_LEVELS, NOT_IN_TIME_WINDOWS, UNKNOWN_USER_NAMES,
+            UNKNOWN_ENGINE_IDS, WRONG_DIGESTS, DECRYPTION_ERRORS))
+        # The parts of every response which never change
+        self._engine = ber.encode_octets(engine_id)
+        self._engine_boots = self._engine + ber.encode_integer(boots)
+        self._global_tails = dict((level, ber.encode_integer(MAX_MESSAGE_SIZE) +
+                                   ber.encode_octets(struct.pack('B', level)) +
+                                   ber.encode_integer(USM_SECURITY_MODEL))
+                                  for level in LEVELS.values())
+        self._auth_params = {
+            0: ber.encode_octets(b''),
+            FLAG_AUTH: ber.encode_octets(b'\0' * AUTH_PARAMS_SIZE),
+        }
+        self._version = ber.encode_integer(SNMP_VERSION_3)
+
+    @classmethod
+    def from_config(cls, config, users=None):
+        """
+        Build from the dict of config(), as handed to the agent workers.
+        users are the ones of users_from_config(config) when already built.
+        """
+        if users is None:
+            users = cls.users_from_config(config)
+        return cls(engine_id_from_option(config['engine']), config['boots'], config['start'], users)
+
+    @staticmethod
+    def users_from_config(config):
+        """
+        The UsmUser of the dict of config(), their keys localized to its
+        engine, which takes a few milliseconds per key
+        """
+        engine_id = engine_id_from_option(config['engine'])
+        return [UsmUser(user['name'], user['level'], user['auth'], user['priv'], engine_id)
+                for user in config['users']]
+
+    @staticmethod
+    def config(engine, boots, start, users):
+        return json.dumps({'engine': engine, 'boots': boots, 'start': start, 'users': users})
+
+    def engine_time(self):
+        return int(time.time() - self.start) & 0x7fffffff
+
+    #
+    # Check and decode a SNMPv3 request, have answer(pdu) build the PDU tail
+    # of the response from the decoded request PDU (see ber.decode_pdu) and
+    # return the secured response message, a report or None to drop it.
+    #
+    def handle(self, msg, answer):
+        data = bytearray(msg)
+        _, pos, end = ber.decode_tlv(data, 0)
+        _, pos, version_end = ber.decode_tlv(data, pos)
+        _, pos, global_end = ber.decode_tlv(data, version_end)
+        _, start, pos = ber.decode_tlv(data, pos)
+        msg_id = ber.decode_integer(data[start:pos])
+        _, start, pos = ber.decode_tlv(data, pos)
+        _, start, pos = ber.decode_tlv(data, pos)
+        flags = data[start] if pos > start else 0
+        _, start, pos = ber.decode_tlv(data, pos)
+        if ber.decode_integer(data[start:pos]) != USM_SECURITY_MODEL:
+            return None
+
+        _, params, data_pos = ber.decode_tlv(data, global_end)
+        _, pos, _ = ber.decode_tlv(data, params)
+        _, start, pos = ber.decode_tlv(data, pos)
+        engine_id = bytes(data[start:pos])
+        _, start, pos = ber.decode_tlv(data, pos)
+        boots = ber.decode_integer(data[start:pos])
+        _, start, pos = ber.decode_tlv(data, pos)
+        engine_time = ber.decode_integer(data[start:pos])
+        _, start, pos = ber.decode_tlv(data, pos)
+        name = bytes(data[start:pos])
+        _, auth_start, auth_end = ber.decode_tlv(data, pos)
+        _, start, pos = ber.decode_tlv(data, auth_end)
+        salt = bytes(data[start:pos])
+
+        try:
+            pdu, context = self._open(data, flags, msg_id, engine_id, boots, engine_time,
+                                      name, auth_start, auth_end, salt, data_pos)
+        except UsmError as e:
+            self.stats[e.stat] += 1
+            if not flags & FLAG_REPORTABLE:
+                return None
+            tail = ber.encode_pdu_tail(0, 0, [ber.encode_varbind(
+                e.stat, COUNTER32, self.stats[e.stat])])
+            return self.encode(msg_id, e.flags, name, b'', REPORT, e.request_id, tail)
+
+        return self.encode(msg_id, flags & (FLAG_AUTH | FLAG_PRIV), name, context,
+                           GET_RESPONSE, pdu[1], answer(pdu))
+
+    def _open(self, data, flags, msg_id, engine_id, boots, engine_time,
+              name, auth_start, auth_end, salt, data_pos):
+        """
+        Run the RFC 3414 section 3.2 checks, returns the decoded PDU and
+        the context name
+        """
+        level = flags & (FLAG_AUTH | FLAG_PRIV)
+        if engine_id != self.engine_id:
+            raise UsmError(UNKNOWN_ENGINE_IDS, 0, self._request_id(data, flags, data_pos))
+        user = self.users.get(name)
+        if user is None:
+            raise UsmError(UNKNOWN_USER_NAMES, 0, self._request_id(data, flags, data_pos))
+        # Any level the keys of the user support, but a user with a password
+        # is never answered without authentication
+        if level & ~user.flags or (user.flags & FLAG_AUTH and not level & FLAG_AUTH):
+            raise UsmError(UNSUPPORTED_SEC_LEVELS)
+
+        if level & FLAG_AUTH:
+            if auth_end - auth_start != AUTH_PARAMS_SIZE:
+                raise UsmError(WRONG_DIGESTS)
+            digest = bytes(data[auth_start:auth_end])
+            data[auth_start:auth_end] = b'\0' * AUTH_PARAMS_SIZE
+            if not hmac.compare_digest(user.auth.sign(bytes(data)), digest):
+                raise UsmError(WRONG_DIGESTS)
+            if boots != self.boots or abs(engine_time - self.engine_time()) > TIME_WINDOW:
+                raise UsmError(NOT_IN_TIME_WINDOWS, FLAG_AUTH)
+
+        if level & FLAG_PRIV:
+            tag, start, end = ber.decode_tlv(data, data_pos)
+            try:
+                data = bytearray(user.priv.decrypt(bytes(data[start:end]), boots,
+                                                   engine_time, salt))
+                data_pos = 0
+                ber.decode_tlv(data, 0)
+            except (ValueError, IndexError):
+                raise UsmError(DECRYPTION_ERRORS)
+
+        _, pos, _ = ber.decode_tlv(data, data_pos)
+        _, pos, context_end = ber.decode_tlv(data, pos)
+        _, start, pos = ber.decode_tlv(data, context_end)
+        return ber.decode_pdu(data, pos), bytes(data[start:pos])
+
+    def _request_id(self, data, flags, data_pos):
+        """
+        Request ID of a plain text request, for discovery reports
+        """
+        if flags & FLAG_PRIV:
+            return 0
+        try:
+            _, pos, _ = ber.decode_tlv(data, data_pos)
+            _, pos, pos = ber.decode_tlv(data, pos)
+            _, pos, _ = ber.decode_tlv(data, pos)
+            _, pos, _ = ber.decode_tlv(data, pos)
+            _, start, end = ber.decode_tlv(data, pos)
+            return ber.decode_integer(data[start:end])
+        except (ValueError, IndexError):
+            return 0
+
+    #
+    # Build a response or report message with the given security level
+    #
+    def encode(self, msg_id, level, name, context, tag, request_id, tail):
+        user = self.users.get(name) if level else None
+        engine_time = self.engine_time()
+
+        body = ber.encode_integer(request_id) + tail
+        scoped = self._engine + ber.encode_octets(context) + ber.header(tag, len(body)) + body
+        scoped = ber.header(SEQUENCE, len(scoped)) + scoped
+        salt = b''
+        if level & FLAG_PRIV:
+            encrypted, salt = user.priv.encrypt(scoped, self.boots, engine_time)
+            scoped = ber.encode_octets(encrypted)
+
+        params = self._engine_boots + ber.encode_integer(engine_time) + \
+            ber.encode_octets(name) + self._auth_params[level & FLAG_AUTH] + \
+            ber.encode_octets(salt)
+        params = ber.header(SEQUENCE, len(params)) + params
+        params = ber.header(OCTET_STRING, len(params)) + params
+
+        global_data = ber.encode_integer(msg_id) + self._global_tails[level]
+        body = self._version + ber.header(SEQUENCE, len(global_data)) + global_data
+        # The digest goes where the zeroed authentication parameters are
+        auth_pos = len(body) + len(params) - len(salt) - 2 - AUTH_PARAMS_SIZE
+        length = len(body) + len(params) + len(scoped)
+        message = bytearray(ber.header(SEQUENCE, length))
+        auth_pos += len(message)
+        message += body
+        message += params
+        message += scoped
+        if level & FLAG_AUTH:
+            message[auth_pos:auth_pos + AUTH_PARAMS_SIZE] = user.auth.sign(bytes(message))
+        return bytes(message)
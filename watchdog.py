@@ -0,0 +1,103 @@
+"""
+Watchdog of the connection to the Monitors.
+
+A thread checks the connection every healthy_interval while it is up and
+every degraded_interval while it is down, sleeping on an Event in between,
+so a loss is noticed within healthy_interval without busy polling and the
+recovery shortly after it happens. on_loss and on_recovery are called once
+per transition, not on every check.
+
+The time to detect a loss is bounded by the time since the last check which
+found the connection up; it is recorded along with the outage durations.
+"""
+import threading
+import time
+
+
+class MonWatchdog(object):
+    def __init__(self, log, check, on_loss, on_recovery, healthy_interval=0.5,
+                 degraded_interval=0.1, clock=time.time):
+        self.log = log
+        self.check = check
+        self.on_loss = on_loss
+        self.on_recovery = on_recovery
+        self.healthy_interval = healthy_interval
+        self.degraded_interval = degraded_interval
+        self.clock = clock
+        self.connected = None
+        self.last_seen = None
+        self.lost_at = None
+        self.losses = 0
+        self.last_outage = None
+        self.last_detection = None
+        self.max_detection = 0.0
+        self.checks = 0
+        self.event = threading.Event()
+        self.run = False
+        self.thread = None
+
+    def start(self):
+        self.run = True
+        self.thread = threading.Thread(target=self._loop, name='snmp-mon-watchdog')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.run = False
+        self.event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _loop(self):
+        while self.run:
+            try:
+                self.poll()
+            except Exception as e:
+                self.log.error("Monitor watchdog check failed: {0}".format(e))
+            self.event.wait(self.healthy_interval if self.connected else self.degraded_interval)
+
+    def poll(self):
+        """
+        Check the connection once and call on_loss or on_recovery when it
+        changed. The first check only sets the initial state, unless the
+        connection is down from the start.
+        """
+        up = bool(self.check())
+        now = self.clock()
+        self.checks += 1
+        previous = self.connected
+        self.connected = up
+        if up:
+            self.last_seen = now
+            if previous is False:
+                self.last_outage = now - self.lost_at
+                self.lost_at = None
+                self.on_recovery(self.last_outage)
+        elif previous is not False:
+            self.losses += 1
+            self.lost_at = now
+            if self.last_seen is not None:
+                self.last_detection = now - self.last_seen
+                self.max_detection = max(self.max_detection, self.last_detection)
+            self.on_loss()
+        return up
+
+    def outage(self):
+        """
+        Seconds the connection has been down, 0 while it is up
+        """
+        if self.lost_at is None:
+            return 0.0
+        return self.clock() - self.lost_at
+
+    def stats(self):
+        return {
+            'connected': self.connected,
+            'checks': self.checks,
+            'losses': self.losses,
+            'outage': self.outage(),
+            'last_outage': self.last_outage,
+            'last_detection': self.last_detection,
+            'max_detection': self.max_detection,
+        }